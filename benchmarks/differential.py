@@ -0,0 +1,242 @@
+'''
+File for the differential harness, which checks engines against the reference Round / Hand and compares their speed.
+Run from the repository root: python -m benchmarks.differential [games] [range lives players decks ...]
+'''
+
+import contextlib
+import os
+import random
+import sys
+import time
+from collections.abc import Mapping
+
+from logic.core import CoreRound
+from logic.decision import Decider
+from logic.game import Game
+from logic.round import Round
+from players.player import Player
+from utils.card import CardCollection
+from utils.constants import Gameplay
+
+'''
+Player whose decisions are scripted by a generator of its own, seeded by the game seed and its name:
+    Power: accepts with even odds, calls: a uniform legal call, cards: a uniform card from hand
+Its decisions only depend on the seed and the order it is asked in, so any engine asking the same questions
+in the same order gets the same answers.
+'''
+class ScriptedPlayer(Player):
+
+    def __init__(self, name, numLives, history, seed):
+        Player.__init__(self, name, numLives, history)
+        self.rng = random.Random("{}:{}".format(seed, name))
+
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        return Gameplay.POWER_YES if self.rng.random() < .5 else Gameplay.POWER_NO
+
+    def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        call = self.rng.choice([call for call in range(len(self.currHand) + 1) if call != illegal])
+        self.currCall = call
+        self.calls.append(call)
+        return call
+
+    def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
+        return self.currHand.pop(self.rng.randrange(len(self.currHand)))
+
+'''
+Decider which records every decision: who decides, what, everything they were shown and what they answered.
+Arguments are recorded as they are at the time of asking (lists and name-keyed views as plain values).
+'''
+class TracingDecider(Decider):
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def summarize(self, arg):
+        if isinstance(arg, Mapping):
+            return tuple([(name, self.summarize(value)) for (name, value) in arg.items()])
+        if isinstance(arg, (list, CardCollection)):
+            return tuple([str(item) for item in arg])
+        if callable(arg):
+            return None
+        return str(arg)
+
+    def decide(self, player, decision, *args):
+        result = getattr(player, decision)(*args)
+        self.trace.append(("decide", player.name, decision, tuple([self.summarize(arg) for arg in args]), str(result)))
+        return result
+
+'''
+Game which records its state at every step, for comparing engines:
+    After each round: round size, dealer, seating, power, cards shown, calls, wins, differences and every hand's
+    plays and winner
+    After lives are updated, the roster is updated (seating, dealer, eliminations) and the round size moves on
+Counts the rule paths taken, so a run can show it covered the edge cases:
+    All-cancelled hands, wins carried into a later hand, simultaneous eliminations (and overtime), dealers
+    moved past eliminated players, and round sizes bouncing back down
+'''
+class TracedGame(Game):
+
+    def __init__(self, names, cardRange, numLives, powerTries, seed, roundType, trace, coverage, numDecks = 1):
+        self.trace = trace
+        self.coverage = coverage
+        Game.__init__(self, names, cardRange, numLives, powerTries,
+            chooser = lambda name, lives, history: ScriptedPlayer(name, lives, history, seed),
+            decider = TracingDecider(trace), dealRng = random.Random(seed), roundType = roundType, numDecks = numDecks
+        )
+
+    def count(self, event):
+        self.coverage[event] = self.coverage.get(event, 0) + 1
+
+    def startRound(self):
+        diffs = Game.startRound(self)
+        curr = self.rounds[-1]
+        hands = tuple([(tuple([str(play) for play in hand.plays]), hand.getWinner()) for hand in curr.hands])
+        self.trace.append(("round", self.round, self.dealer, tuple(self.names), curr.power, str(curr.shown),
+            tuple(curr.calls), tuple(curr.wins), tuple(diffs), hands
+        ))
+        winners = [winner for (_, winner) in hands]
+        if None in winners:
+            self.count("allCancelled")
+            if winners[-1] is not None:
+                self.count("carriedWins")
+        return diffs
+
+    def updateLives(self, diffs):
+        elims = Game.updateLives(self, diffs)
+        self.trace.append(("lives", tuple([player.lives for player in self.players]), tuple(elims)))
+        return elims
+
+    def updateRoster(self, elims):
+        dealer = (self.dealer + 1) % self.numPlayers
+        simultaneous = len(elims) == self.numPlayers
+        Game.updateRoster(self, elims)
+        self.trace.append(("roster", tuple(self.names), self.dealer, tuple(self.elim)))
+        if simultaneous:
+            self.count("simultaneous")
+            if self.numPlayers > 1:
+                self.count("overtime")
+        if dealer in elims:
+            self.count("dealerSkipped")
+
+    def updateRound(self):
+        previous = self.round
+        Game.updateRound(self)
+        self.trace.append(("next", self.round))
+        if self.round < previous:
+            self.count("bounce")
+
+'''
+Differential plays every engine on the same seeded games and compares each to the reference Round / Hand:
+    Settings:
+        Engines to check (name to round class, the core by default), configurations (card range, lives, players, decks),
+        games per configuration, power tries
+    Every game is played with scripted players and traced (see TracingDecider and TracedGame); an engine passes
+    a game when its trace equals the reference's step for step, and a crash counts as a difference
+Functionalities:
+    Reports, per configuration and engine, how many games were identical and the first step of the first game
+    which wasn't (both engines' state at that step), and how often each edge case came up
+    Times every engine on the same games untraced (games and hands per second, speedup over the reference)
+Settings with fewer than two cards a player after the power draws would deal rounds of no cards, which no
+engine can play, so configurations must leave 4 * range * decks - tries >= 2 * players.
+'''
+class Differential:
+
+    ENGINES = {"core": CoreRound}
+    CONFIGS = [(3, 1, 4, 1), (4, 2, 5, 1), (6, 1, 6, 1), (13, 3, 4, 1), (13, 2, 10, 2), (20, 1, 16, 3)]
+
+    def __init__(self, numGames, configs = CONFIGS, powerTries = 3, engines = ENGINES):
+        self.numGames = numGames
+        self.configs = configs
+        self.powerTries = powerTries
+        self.engines = engines
+
+    def names(self, numPlayers):
+        return ["P{}".format(i + 1) for i in range(numPlayers)]
+
+    def trace(self, roundType, cardRange, numLives, numPlayers, numDecks, seed, coverage):
+        trace = []
+        try:
+            game = TracedGame(self.names(numPlayers), cardRange, numLives, self.powerTries, seed, roundType, trace, coverage,
+                numDecks
+            )
+            game.playGame()
+            trace.append(("standings", tuple(game.standings)))
+        except Exception as e:
+            trace.append(("error", repr(e)))
+        return trace
+
+    def firstDifference(self, reference, other):
+        for (step, (first, second)) in enumerate(zip(reference, other)):
+            if first != second:
+                return step
+        if len(reference) != len(other):
+            return min(len(reference), len(other))
+        return None
+
+    def check(self, config):
+        cardRange, numLives, numPlayers, numDecks = config
+        coverage = {}
+        results = {name: [0, None] for name in self.engines}
+        for seed in range(self.numGames):
+            reference = self.trace(Round, cardRange, numLives, numPlayers, numDecks, seed, coverage)
+            for (name, roundType) in self.engines.items():
+                other = self.trace(roundType, cardRange, numLives, numPlayers, numDecks, seed, {})
+                step = self.firstDifference(reference, other)
+                if step is None:
+                    results[name][0] += 1
+                elif results[name][1] is None:
+                    entry = lambda trace: trace[step] if step < len(trace) else "(ended)"
+                    results[name][1] = (seed, step, entry(reference), entry(other))
+        return results, coverage
+
+    def throughput(self, roundType, cardRange, numLives, numPlayers, numDecks):
+        hands = 0
+        start = time.perf_counter()
+        for seed in range(self.numGames):
+            game = Game(self.names(numPlayers), cardRange, numLives, self.powerTries,
+                chooser = lambda name, lives, history: ScriptedPlayer(name, lives, history, seed),
+                dealRng = random.Random(seed), roundType = roundType, numDecks = numDecks
+            )
+            game.playGame()
+            hands += sum([len(currRound.hands) for currRound in game.rounds])
+        return time.perf_counter() - start, hands
+
+    def run(self):
+        lines = []
+        self.failures = 0
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for config in self.configs:
+                results, coverage = self.check(config)
+                lines.append("Range {}, {} lives, {} players, {} decks: {} games".format(*config, self.numGames))
+                for (name, (identical, failure)) in results.items():
+                    lines.append("\t{}: identical on {} of {} games".format(name, identical, self.numGames))
+                    if failure is not None:
+                        self.failures += 1
+                        lines.append("\t\tgame {} first differs at step {}:\n\t\t\treference {}\n\t\t\t{} {}".format(
+                            failure[0], failure[1], failure[2], name, failure[3]
+                        ))
+                lines.append("\tcovered: {}".format(", ".join([
+                    "{} {}".format(event, coverage.get(event, 0))
+                    for event in ["allCancelled", "carriedWins", "simultaneous", "overtime", "dealerSkipped", "bounce"]
+                ])))
+
+            lines.append("Throughput (scripted players, untraced):")
+            for config in self.configs:
+                timings = {"reference": self.throughput(Round, *config)}
+                for (name, roundType) in self.engines.items():
+                    timings[name] = self.throughput(roundType, *config)
+                lines.append("\tRange {}, {} lives, {} players, {} decks:".format(*config))
+                for (name, (elapsed, hands)) in timings.items():
+                    lines.append("\t\t{}: {:.1f} games/s, {:.0f} hands/s, x{:.2f}".format(
+                        name, self.numGames / elapsed, hands / elapsed, timings["reference"][0] / elapsed
+                    ))
+        return "\n".join(lines)
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    numGames = args[0] if args else 200
+    configs = [tuple(args[i:i + 4]) for i in range(1, len(args) - 3, 4)] or Differential.CONFIGS
+    differential = Differential(numGames, configs)
+    print(differential.run())
+    if differential.failures:
+        sys.exit(1)
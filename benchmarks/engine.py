@@ -0,0 +1,125 @@
+'''
+File for the engine benchmark, which times the reference Round / Hand against the lean core (logic/core.py).
+Run from the repository root: python -m benchmarks.engine [games] [range] [lives] [tries] [names...]
+'''
+
+import contextlib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from logic.core import CoreHand
+from logic.core import CoreRound
+from logic.core import SeatView
+from logic.decision import Decider
+from logic.game import Game
+from logic.hand import Hand
+from logic.round import Round
+from players.player import Player
+from utils.card import CardCollection
+from utils.card import CardUtils
+
+'''
+EngineBenchmark plays the same seeded games with each engine:
+    Settings: names, card range, lives, power tries, number of games, number of decks
+    Every game seeds the random module, numpy and its deal generator, so both engines see the same deals and
+    (for players whose decisions only depend on what they're shown) the same decisions
+Functionalities:
+    Times each engine over the games (game output discarded for both)
+    Times Hand against CoreHand alone, on random deals played by a decider which always plays the first card,
+    so no player logic (or player sleeps) is in the measurement
+    Checks that both engines gave the same standings for every game and the same plays and winner for every hand
+    Reports games and hands per second and the speedup of the core
+'''
+class EngineBenchmark:
+
+    def __init__(self, names, cardRange, numLives, powerTries, numGames, numDecks = 1):
+        self.names = names
+        self.cardRange = cardRange
+        self.numLives = numLives
+        self.powerTries = powerTries
+        self.numGames = numGames
+        self.numDecks = numDecks
+
+    def play(self, roundType):
+        standings = []
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for seed in range(self.numGames):
+                random.seed(seed)
+                np.random.seed(seed)
+                game = Game(list(self.names), self.cardRange, self.numLives, self.powerTries,
+                    dealRng = random.Random(seed), roundType = roundType, numDecks = self.numDecks
+                )
+                game.playGame()
+                standings.append(game.standings)
+            elapsed = time.perf_counter() - start
+        return elapsed, standings
+
+    def playHands(self, handType, numHands):
+        rng = random.Random(0)
+        players = [Player(name, self.numLives, []) for name in self.names]
+        seats = {name: seat for (seat, name) in enumerate(self.names)}
+        calls, wins = [0] * len(players), [0] * len(players)
+        deck = CardCollection(cardRange = self.cardRange, numDecks = self.numDecks)
+        results = []
+        elapsed = 0.0
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(numHands):
+                deck.shuffle(rng)
+                for (player, hand) in zip(players, deck.deal(1, len(players))):
+                    player.setHand(hand)
+                power = rng.randrange(self.cardRange)
+                hand = handType(rng.randrange(len(players)), False, self.names, players, calls, wins, power,
+                    CardUtils.cardRankerGen(power, self.cardRange), CardCollection(cards = []), self.cardRange, FirstCard()
+                )
+                # only playing the hand is timed, not dealing it
+                start = time.perf_counter()
+                if handType is CoreHand:
+                    hand.playHand(seats, SeatView(seats, calls), SeatView(seats, wins))
+                else:
+                    hand.playHand()
+                elapsed += time.perf_counter() - start
+                results.append((tuple([str(play) for play in hand.plays]), hand.getWinner()))
+        return elapsed, results
+
+    def run(self):
+        results = {roundType.__name__: self.play(roundType) for roundType in [Round, CoreRound]}
+        (reference, referenceStandings), (core, coreStandings) = results["Round"], results["CoreRound"]
+        mismatches = sum([first != second for (first, second) in zip(referenceStandings, coreStandings)])
+        numHands = self.numGames * 100
+        referenceHands, referenceResults = self.playHands(Hand, numHands)
+        coreHands, coreResults = self.playHands(CoreHand, numHands)
+        handMismatches = sum([first != second for (first, second) in zip(referenceResults, coreResults)])
+        return "\n".join([
+            "Games: {} ({}, range {}, {} lives, {} tries)".format(
+                self.numGames, " ".join(self.names), self.cardRange, self.numLives, self.powerTries
+            ),
+            "Round: {:.3f}s, {:.1f} games/s".format(reference, self.numGames / reference),
+            "CoreRound: {:.3f}s, {:.1f} games/s".format(core, self.numGames / core),
+            "Speedup: x{:.2f}, games with different standings: {}".format(reference / core, mismatches),
+            "Hands (first card played): {}".format(numHands),
+            "Hand: {:.3f}s, {:.0f} hands/s".format(referenceHands, numHands / referenceHands),
+            "CoreHand: {:.3f}s, {:.0f} hands/s".format(coreHands, numHands / coreHands),
+            "Speedup: x{:.2f}, hands with different plays or winner: {}".format(referenceHands / coreHands, handMismatches),
+        ])
+
+'''
+Decider which plays each player's first card, so hands can be timed without any player logic.
+'''
+class FirstCard(Decider):
+
+    def decide(self, player, decision, *args):
+        return player.currHand.pop(0)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    numGames = int(args[0]) if args else 200
+    cardRange = int(args[1]) if len(args) > 1 else 13
+    numLives = int(args[2]) if len(args) > 2 else 5
+    powerTries = int(args[3]) if len(args) > 3 else 3
+    names = args[4:] or ["RANDOM_1", "RANDOM_2", "RANDOM_3", "RANDOM_4"]
+    print(EngineBenchmark(names, cardRange, numLives, powerTries, numGames).run())
@@ -0,0 +1,67 @@
+'''
+File for the table scaling benchmark, which times hands and games as tables grow to many players and decks.
+Run from the repository root: python -m benchmarks.scaling [hands] [range] [players...]
+'''
+
+import sys
+
+from benchmarks.engine import EngineBenchmark
+from logic.core import CoreHand
+from logic.core import CoreRound
+from logic.hand import Hand
+from utils.card import CardInfo
+
+'''
+ScalingBenchmark measures how the engines' cost grows with the number of players:
+    Settings: card range, player counts, hands and games per player count, largest round, lives, power tries
+    Each table is dealt the fewest decks which let rounds grow to the largest round (one deck for small tables)
+Functionalities:
+    Times Hand and CoreHand alone on the same random hands (see EngineBenchmark.playHands) and checks they agree
+    Times whole games of random players on the core
+    Reports the cost per hand and per card played: with plays cancelled and ranked by rank occupancy, a hand is
+    linear in the number of players, so the cost per card played stays flat as tables grow (every player is
+    still told of every play, which is the one part of a hand quadratic in players)
+'''
+class ScalingBenchmark:
+
+    def __init__(self, cardRange, playerCounts, numHands, numGames, maxCards = 10, numLives = 3, powerTries = 3):
+        self.cardRange = cardRange
+        self.playerCounts = playerCounts
+        self.numHands = numHands
+        self.numGames = numGames
+        self.maxCards = maxCards
+        self.numLives = numLives
+        self.powerTries = powerTries
+
+    def decks(self, numPlayers):
+        needed = numPlayers * self.maxCards + self.powerTries
+        return max(1, -(-needed // (self.cardRange * len(CardInfo.SUITS))))
+
+    def run(self):
+        lines = ["Range {}, {} hands and {} games per table (random players, rounds up to {} cards)".format(
+            self.cardRange, self.numHands, self.numGames, self.maxCards
+        )]
+        for numPlayers in self.playerCounts:
+            numDecks = self.decks(numPlayers)
+            names = ["RANDOM_{}".format(i + 1) for i in range(numPlayers)]
+            benchmark = EngineBenchmark(names, self.cardRange, self.numLives, self.powerTries, self.numGames, numDecks)
+            reference, referenceResults = benchmark.playHands(Hand, self.numHands)
+            core, coreResults = benchmark.playHands(CoreHand, self.numHands)
+            mismatches = sum([first != second for (first, second) in zip(referenceResults, coreResults)])
+            games, _ = benchmark.play(CoreRound)
+            lines.append("{} players, {} decks:".format(numPlayers, numDecks))
+            for (name, elapsed) in [("Hand", reference), ("CoreHand", core)]:
+                lines.append("\t{}: {:.1f}us a hand, {:.2f}us a card played".format(
+                    name, 1e6 * elapsed / self.numHands, 1e6 * elapsed / (self.numHands * numPlayers)
+                ))
+            lines.append("\tCoreRound: {:.1f} games/s, hands with different plays or winner: {}".format(
+                self.numGames / games, mismatches
+            ))
+        return "\n".join(lines)
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    numHands = args[0] if args else 5000
+    cardRange = args[1] if len(args) > 1 else 13
+    playerCounts = args[2:] or [4, 8, 12, 16, 20]
+    print(ScalingBenchmark(cardRange, playerCounts, numHands, max(1, numHands // 100)).run())
@@ -0,0 +1,179 @@
+'''
+File for the lean engine core (CoreRound and CoreHand), which plays rounds by the same rules as Round and Hand.
+'''
+
+from collections.abc import Mapping
+
+from logic.hand import Hand
+from logic.round import Round
+from utils.card import CardCollection
+from utils.card import CardInfo
+from utils.card import CardUtils
+from utils.constants import Gameplay
+from utils.constants import Strategies
+
+'''
+SeatView is a read-only, name-keyed view of a per-seat list (optionally transformed, i.e. str for plays):
+    Reads go straight to the list, so one view serves a whole round instead of a dict rebuilt every turn
+    Iterates names in seat order and prints like the dict it stands in for
+'''
+class SeatView(Mapping):
+
+    def __init__(self, seats, seatValues, transform = None):
+        self.seats = seats
+        self.seatValues = seatValues
+        self.transform = transform
+
+    def __getitem__(self, name):
+        value = self.seatValues[self.seats[name]]
+        if self.transform is None:
+            return value
+        return self.transform(value)
+
+    def __iter__(self):
+        return iter(self.seats)
+
+    def __len__(self):
+        return len(self.seats)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+'''
+CoreRound plays a round as Round does, for simulation:
+    Same settings and state as Round, with the same calls to players and the decider in the same order, so
+    seeded games play out identically (see benchmarks/engine.py, and benchmarks/differential.py step by step)
+    Plays silently: no game output and no sleeps
+    Name-keyed calls and wins are views over the per-seat lists (see SeatView), built once per round
+Launches CoreHand instances in place of Hand.
+'''
+class CoreRound(Round):
+
+    def playRound(self):
+        self.wins = [0] * self.numPlayers
+        self.diffs = [None] * self.numPlayers
+        self.hands = []
+        self.seats = {name: seat for (seat, name) in enumerate(self.names)}
+        orderedWins = []
+
+        remaining, namedDeals = self.dealCards(oneCard = (self.numCards == 1))
+        self.power, self.shown = self.choosePower(remaining, self.players[self.dealer])
+        self.cardRanker = CardUtils.cardRankerGen(self.power, self.cardRange)
+        self.observers = [player for player in self.players if player.observing()]
+        self.calls = self.requestCalls(namedDeals)
+        self.namedCalls = SeatView(self.seats, self.calls)
+        self.namedWins = SeatView(self.seats, self.wins)
+
+        first = (self.dealer + 1) % self.numPlayers
+        winCarry = 0
+        for i in range(self.numCards):
+            winner = self.startHand(first, i == self.numCards - 1)
+            if winner is None:
+                winCarry += 1
+                orderedWins.append(None)
+            else:
+                first = winner
+                self.wins[winner] += 1 + winCarry
+                orderedWins.append(winner)
+                winCarry = 0
+
+        for i in range(self.numPlayers):
+            self.diffs[i] = abs(self.calls[i] - self.wins[i])
+            player = self.players[i]
+            if Strategies.Q_LEARN in player.name or Strategies.Q_APPROXIMATE in player.name:
+                player.update([winner == i for winner in orderedWins])
+
+    def dealCards(self, oneCard):
+        namedDeals = {}
+        self.deck.shuffle(self.dealRng)
+        hands = self.deck.deal(self.numCards, self.numPlayers)
+        for i in range(self.numPlayers):
+            curr = ((self.dealer + 1) + i) % self.numPlayers
+            self.players[curr].setHand(hands[curr])
+            if oneCard:
+                namedDeals[self.names[curr]] = hands[curr].get(0)
+        return self.deck.slice(self.numPlayers * self.numCards, None), namedDeals
+
+    def choosePower(self, remaining, player):
+        shown = CardCollection(cards = [])
+        for i in range(self.powerTries):
+            draw = remaining.get(i)
+            cand = (draw.num + 1) % self.cardRange
+            if i == self.powerTries - 1:
+                shown.append(draw)
+                return (cand, shown)
+            decision = self.decider.decide(player, "choosePower", cand, shown, self.numPlayers, self.cardRange, self.powerTries)
+            if decision == Gameplay.POWER_YES:
+                shown.append(draw)
+                return (cand, shown)
+            if decision == Gameplay.POWER_NO:
+                shown.append(draw)
+
+    def requestCalls(self, namedDeals = {}):
+        # calls so far are a growing dict, as players expect only the calls made before theirs
+        calls = [None] * self.numPlayers
+        namedCalls = {}
+        for i in range(self.numPlayers):
+            curr = ((self.dealer + 1) + i) % self.numPlayers
+            name = self.names[curr]
+            illegal = self.numCards - sum(namedCalls.values()) if curr == self.dealer else -1
+            calls[curr] = self.decider.decide(
+                self.players[curr], "makeCall", namedCalls, self.numPlayers, self.numCards, self.power,
+                self.shown, illegal, self.cardRange, self.cardRanker, namedDeals
+            )
+            namedCalls[name] = calls[curr]
+            for player in self.observers:
+                player.observeCall(name, calls[curr])
+        return calls
+
+    def startHand(self, first, lastHand):
+        currHand = CoreHand(first, lastHand, self.names, self.players, self.calls,
+            self.wins, self.power, self.cardRanker, self.shown, self.cardRange, self.decider, self.observers
+        )
+        currHand.playHand(self.seats, self.namedCalls, self.namedWins)
+        self.hands.append(currHand)
+        return currHand.getWinner()
+
+'''
+CoreHand plays a hand as Hand does, without rescanning the plays:
+    Standing cards are kept by rank (power cards by their suit's rank above the card range, as the card ranker
+    ranks them), so a play cancels (or stands) with one lookup
+    The best standing play is tracked as cards are played; cancelling it falls back to the highest standing rank
+    Plays are shown to players through a SeatView of the plays (as strings), in place of a dict per turn
+Gives the same plays, cancellations and winner (None if every card cancelled) as Hand.
+'''
+class CoreHand(Hand):
+
+    def playHand(self, seats, namedCalls, namedWins):
+        plays = self.plays = [None] * self.numPlayers
+        namedPlays = SeatView(seats, plays, str)
+        power = self.power
+        standing = {}
+        best, bestRank = None, -1
+
+        for i in range(self.numPlayers):
+            curr = (self.first + i) % self.numPlayers
+            name = self.names[curr]
+            choice = self.decider.decide(
+                self.players[curr], "chooseCard", namedCalls, namedWins, self.lastHand, power, plays,
+                namedPlays, self.shown, self.cardRange
+            )
+            self.shown.append(choice)
+            for player in self.observers:
+                player.observePlay(name, choice, namedCalls, namedWins)
+
+            rank = choice.num if choice.num != power else self.cardRange + CardInfo.SUIT_RANKS[choice.suit]
+            if rank in standing:
+                other = standing.pop(rank)
+                plays[other] = Gameplay.CANCELLED
+                plays[curr] = Gameplay.CANCELLED
+                if other == best:
+                    bestRank = max(standing, default = -1)
+                    best = standing.get(bestRank)
+            else:
+                plays[curr] = choice
+                standing[rank] = curr
+                if rank > bestRank:
+                    best, bestRank = curr, rank
+
+        self.winner = best
@@ -0,0 +1,101 @@
+'''
+File for Decider classes, which ask players for their round-level decisions.
+'''
+
+import asyncio
+import threading
+
+from players.prob import Easy
+from utils.constants import Deadlines
+
+'''
+Decider used by Round and Hand whenever a player has to make a decision:
+    Decisions are named by the Player method that makes them (choosePower, makeCall, chooseCard)
+The plain Decider calls the player directly and waits as long as it takes, as the engine always has.
+Every Decider counts the decisions it asks for by player class, per process (one dict increment a decision,
+unlocked, so concurrent games may drop the odd count), for the live metrics of long runs (see utils/metrics.py).
+'''
+class Decider:
+
+    counts = {}
+
+    def decide(self, player, decision, *args):
+        Decider.count(player)
+        return getattr(player, decision)(*args)
+
+    def count(player):
+        kind = type(player)
+        Decider.counts[kind] = Decider.counts.get(kind, 0) + 1
+
+    def tally():
+        # this process's decisions so far by strategy (player class name)
+        return {kind.__name__: count for (kind, count) in list(Decider.counts.items())}
+
+    def combine(tallies):
+        # sums tallies from several processes (see tally)
+        total = {}
+        for tally in tallies:
+            for (name, count) in tally.items():
+                total[name] = total.get(name, 0) + count
+        return total
+
+'''
+Decider which bounds the time each decision may take:
+    Settings:
+        Timeouts (seconds) per decision name, None meaning no deadline for that decision
+        Fallback player class whose logic is used when a deadline passes (Easy by default)
+        Event loop to await decisions on (started in a background thread if not given)
+Functionalities:
+    Runs the player's awaitable decision on a snapshot of the player under asyncio.wait_for
+    On time, the snapshot is committed back to the player and its answer returned
+    On timeout (or a dropped remote player) the snapshot is discarded, so a late answer can't touch
+    the real hand, the player is told (see Player.missDecision) and the fallback's decision is made for it instead
+Must be called from outside the event loop thread, i.e. from the thread running the game.
+'''
+class DeadlineDecider(Decider):
+
+    def __init__(self, timeouts = Deadlines.TIMEOUTS, fallback = Easy, loop = None):
+        self.timeouts = timeouts
+        self.fallback = fallback
+        self.missed = {}
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target = loop.run_forever, daemon = True).start()
+        self.loop = loop
+
+    def decide(self, player, decision, *args):
+        Decider.count(player)
+        timeout = self.timeouts.get(decision)
+        if timeout is None:
+            return getattr(player, decision)(*args)
+
+        snapshot = player.snapshot()
+        pending = asyncio.wait_for(getattr(snapshot, decision + "Async")(*args), timeout)
+        try:
+            result = asyncio.run_coroutine_threadsafe(pending, self.loop).result()
+        except (asyncio.TimeoutError, ConnectionError):
+            self.missed[player.name] = self.missed.get(player.name, 0) + 1
+            print("{} ran out of time, deciding with {} logic.".format(player.name, self.fallback.__name__))
+            player.missDecision(decision, *args)
+            return getattr(self.fallback, decision)(player, *args)
+        player.commit(snapshot)
+        return result
+
+'''
+Decider for games played at once which share a policy server (see players/batch.py):
+    Decisions of players whose class has a batched version of the decision (i.e. makeCallBatch) are sent
+    to the server, which makes them together with the other games' pending decisions
+    Every other decision is made directly, as the plain Decider does
+The game's thread must join the server before playing and leave it after, so the server knows how many
+games a batch can wait for.
+'''
+class BatchDecider(Decider):
+
+    def __init__(self, server):
+        self.server = server
+
+    def decide(self, player, decision, *args):
+        Decider.count(player)
+        if hasattr(type(player), decision + "Batch"):
+            return self.server.request(player, decision, args)
+        return getattr(player, decision)(*args)
@@ -3,9 +3,11 @@ File for Game class.
 '''
 
 import time
+from logic.decision import Decider
 from logic.round import Round
 from players.choose import chooseStrategy
 from utils.card import CardCollection
+from utils.card import CardInfo
 from utils.constants import SLEEP_TIME
 from utils.constants import Strategies
 
@@ -13,6 +15,12 @@ from utils.constants import Strategies
 Top level object, stores highest level information:
     Meta game settings passed down from play.py:
         Names (creates list of player objects), card range, number of lives, tries for power card
+        Strategy chooser (defaults to choosing by name, overridden by e.g. the table server)
+        Decider used to ask players for decisions (see decision.py, defaults to waiting indefinitely)
+        Deal generator used for every shuffle (optional, fixes the deals and power draws of the game)
+        Round class used to play rounds (Round, or the silent CoreRound of core.py for simulation)
+        Number of decks shuffled together (identical cards cancel like any other equal cards, see hand.py),
+        which every player is told as their numDecks
     Game state:
         Current round, current dealer, winner of game, eliminated players
     Game history: Rounds played
@@ -23,15 +31,22 @@ Functionalities:
 '''
 class Game:
 
-    def __init__(self, names, cardRange, numLives, powerTries):
+    def __init__(self, names, cardRange, numLives, powerTries, chooser = chooseStrategy, decider = None, dealRng = None,
+            roundType = Round, numDecks = 1):
         self.rounds = []
         self.names = names
-        self.players = [chooseStrategy(name, numLives, self.rounds) for name in names]
+        self.players = [chooser(name, numLives, self.rounds) for name in names]
         self.origPlayers = self.players.copy()
         self.cardRange = cardRange
-        self.deck = CardCollection(cardRange = cardRange)
+        self.numDecks = numDecks
+        self.deck = CardCollection(cardRange = cardRange, numDecks = numDecks)
+        for player in self.players:
+            player.numDecks = numDecks
         self.numPlayers = len(names)
         self.powerTries = powerTries
+        self.decider = decider if decider is not None else Decider()
+        self.dealRng = dealRng
+        self.roundType = roundType
 
     def playGame(self):
         self.round = 1
@@ -72,7 +87,9 @@ class Game:
 
     def startRound(self):
         print("Beginning round with {} cards. Dealer is {}.".format(self.round, self.names[self.dealer]))
-        currRound = Round(self.round, self.dealer, self.names, self.players, self.deck, self.cardRange, self.powerTries)
+        currRound = self.roundType(self.round, self.dealer, self.names, self.players, self.deck, self.cardRange, self.powerTries, 
+            self.decider, self.dealRng
+        )
         currRound.playRound()
         self.rounds.append(currRound)
         print()
@@ -155,7 +172,7 @@ class Game:
             return self.names[0]
 
     def updateRound(self):
-        if (self.round + 1) * self.numPlayers > (self.cardRange * 4 - self.powerTries):
+        if (self.round + 1) * self.numPlayers > (self.cardRange * len(CardInfo.SUITS) * self.numDecks - self.powerTries):
             self.round -= 1
         else:
             self.round += 1
@@ -2,6 +2,7 @@
 File for Hand class.
 '''
 
+from logic.decision import Decider
 from utils.constants import Gameplay
 
 '''
@@ -10,13 +11,18 @@ Hand stores hand-level information:
         Game: List of names and Player objects, card range
         Round: Original calls, current wins, power card, comparison fn, cards shown in the round
         Meta: First player in the hand, whether it is the last hand of the round
+        Decider used to ask players for their cards
 Funcitonalities:
-    Calls on Player instances to select cards
+    Calls on Player instances to select cards, and tells the observing players (see Player.observing) what was played
+    Cancels equal cards in pairs: non-power cards of a rank, and (with several decks) identical power cards
+    Keeps the seat of the card standing at each rank, so a play cancels or stands with one lookup and a hand
+    is linear in the number of players
     Tracks winner (passes back up to Round)
 '''
 class Hand:
 
-    def __init__(self, first, lastHand, names, players, calls, wins, power, cardRanker, shown, cardRange):
+    def __init__(self, first, lastHand, names, players, calls, wins, power, cardRanker, shown, cardRange, decider = None,
+            observers = None):
         self.first = first
         self.lastHand = lastHand
         self.names = names
@@ -28,29 +34,33 @@ class Hand:
         self.shown = shown
         self.cardRange = cardRange
         self.numPlayers = len(names)
+        self.decider = decider if decider is not None else Decider()
+        self.observers = observers if observers is not None else [player for player in players if player.observing()]
 
     def playHand(self):
         self.plays = [None] * self.numPlayers
         namedCalls = {self.names[i]: self.calls[i] for i in range(self.numPlayers)}
         namedWins = {self.names[i]: self.wins[i] for i in range(self.numPlayers)}
 
+        # seat of the card standing at each rank, as the card ranker ranks them
+        standing = {}
         for i in range(self.numPlayers):
             curr = (self.first + i) % self.numPlayers
             name = self.names[curr]
-            choice = self.players[curr].chooseCard(
-                namedCalls, namedWins, self.lastHand, self.power, self.plays,
+            choice = self.decider.decide(
+                self.players[curr], "chooseCard", namedCalls, namedWins, self.lastHand, self.power, self.plays,
                 {self.names[j]: str(self.plays[j]) for j in range(self.numPlayers)}, self.shown, self.cardRange
             )
             # hand is given reference to cards shown this round, pass and update
             self.shown.append(choice)
-            if choice.num != self.power:
-                cancelled = self.checkCancel(name, choice)
-                if not cancelled:
-                    self.plays[curr] = choice
-                else:
-                    self.plays[curr] = Gameplay.CANCELLED
-            else:
+            for player in self.observers:
+                player.observePlay(name, choice, namedCalls, namedWins)
+            cancelled = self.checkCancel(name, choice, standing)
+            if not cancelled:
                 self.plays[curr] = choice
+                standing[self.cardRanker(choice)] = curr
+            else:
+                self.plays[curr] = Gameplay.CANCELLED
 
         if all([play == Gameplay.CANCELLED for play in self.plays]):
             print("All hands cancelled this round!")
@@ -63,20 +73,16 @@ class Hand:
             )
             print("The winner of the hand, playing a {}, is {}!".format(self.plays[self.winner], self.names[self.winner]))
 
-    def checkCancel(self, name, choice):
-        for i in range(self.numPlayers):
-            if not self.plays[i]:
-                continue
-            if self.plays[i] == Gameplay.CANCELLED:
-                continue
-            if self.plays[i].rank == choice.rank:
-                print("{}'s {} cancelled with {}'s {}!"
-                    .format(name, str(choice), self.names[i], str(self.plays[i]))
-                )
-                print()
-                self.plays[i] = Gameplay.CANCELLED
-                return True
-        return False
+    def checkCancel(self, name, choice, standing):
+        other = standing.pop(self.cardRanker(choice), None)
+        if other is None:
+            return False
+        print("{}'s {} cancelled with {}'s {}!"
+            .format(name, str(choice), self.names[other], str(self.plays[other]))
+        )
+        print()
+        self.plays[other] = Gameplay.CANCELLED
+        return True
 
     def getWinner(self):
         return self.winner
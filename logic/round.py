@@ -3,6 +3,7 @@ File for Round class.
 '''
 import time
 
+from logic.decision import Decider
 from logic.hand import Hand
 from players.player import Player
 from utils.card import CardInfo
@@ -16,18 +17,19 @@ from utils.constants import Strategies
 Round stores round-level information:
     Game info and meta round settings passed down from game.py:
         List of names and Player objects, range of cards, deck
-        Dealer, number of cards to be dealt
+        Dealer, number of cards to be dealt, decider for asking players to decide
+        Deal generator for shuffling (None for the global random state)
     Round state:
         Current power card, calls, wins, first player
     Round history: Hands played, cards shown so far
 Functionalities:
-    Round set-up: shuffle and deal cards, power card, calls
+    Round set-up: shuffle and deal cards, power card, calls (told to the observing players)
     Launches Hand instances (passes down name, players, calls, wins, power card)
     Computes final differentials (passes back up to Game)
 '''
 class Round:
 
-    def __init__(self, numCards, dealer, names, players, deck, cardRange, powerTries):
+    def __init__(self, numCards, dealer, names, players, deck, cardRange, powerTries, decider = None, dealRng = None):
         self.numCards = numCards
         self.dealer = dealer
         self.names = names
@@ -36,6 +38,8 @@ class Round:
         self.cardRange = cardRange
         self.powerTries = powerTries
         self.numPlayers = len(names)
+        self.decider = decider if decider is not None else Decider()
+        self.dealRng = dealRng
 
     def playRound(self):
         self.wins = [0] * self.numPlayers
@@ -51,7 +55,8 @@ class Round:
         self.power, self.shown = self.choosePower(remaining, self.players[self.dealer])
         self.cardRanker = CardUtils.cardRankerGen(self.power, self.cardRange)
 
-        # Request calls
+        # Request calls, telling only the players which observe them
+        self.observers = [player for player in self.players if player.observing()]
         self.calls = self.requestCalls(namedDeals)
 
         # Play hands
@@ -93,7 +98,7 @@ class Round:
         print("Dealing cards...")
         if oneCard:
             namedDeals = {}
-        self.deck.shuffle()
+        self.deck.shuffle(self.dealRng)
         hands = self.deck.deal(self.numCards, self.numPlayers)
         for i in range(self.numPlayers):
             curr = ((self.dealer + 1) + i) % self.numPlayers
@@ -115,7 +120,7 @@ class Round:
             draw = remaining.get(i)
             print("The draw is the {}.".format(draw))
             cand = (draw.num + 1) % self.cardRange
-            namedCand = CardInfo.RANKS[cand]
+            namedCand = CardInfo.rankName(cand)
 
             if i == self.powerTries - 1:
                 print("{} has been forced as the power card!".format(namedCand))
@@ -124,7 +129,7 @@ class Round:
                 time.sleep(SLEEP_TIME)
                 return (cand, shown)
 
-            decision = player.choosePower(cand, shown)
+            decision = self.decider.decide(player, "choosePower", cand, shown, self.numPlayers, self.cardRange, self.powerTries)
 
             if decision == Gameplay.POWER_YES:
                 print("{} has been chosen as the power card!".format(namedCand))
@@ -152,11 +157,13 @@ class Round:
                 illegal = -1
 
             print("It is currently {}'s turn to make a call.".format(name))
-            calls[curr] = self.players[curr].makeCall(
-                namedCalls, self.numPlayers, self.numCards, self.power, 
+            calls[curr] = self.decider.decide(
+                self.players[curr], "makeCall", namedCalls, self.numPlayers, self.numCards, self.power, 
                 self.shown, illegal, self.cardRange, self.cardRanker, namedDeals
             )
             namedCalls[self.names[curr]] = calls[curr]
+            for player in self.observers:
+                player.observeCall(name, calls[curr])
             print("{} calls {}!".format(name, calls[curr]))
             print()
             time.sleep(SLEEP_TIME)
@@ -164,7 +171,7 @@ class Round:
 
     def startHand(self, first, lastHand):
         currHand = Hand(first, lastHand, self.names, self.players, self.calls, 
-            self.wins, self.power, self.cardRanker, self.shown, self.cardRange
+            self.wins, self.power, self.cardRanker, self.shown, self.cardRange, self.decider, self.observers
         )
         currHand.playHand()
         self.hands.append(currHand)
@@ -0,0 +1,56 @@
+'''
+File for Simulation class.
+'''
+
+'''
+Static class for quickly simulating the rest of a round, used by search-based players.
+Cards are represented by their keys as CardUtils.cardRankerGen ranks them: a non-power card's key is its number,
+and power cards' keys are above the card range, so equal keys cancel (power keys only repeat with several decks).
+A hand in progress is the dict of cards left standing (key to seat), which is all later plays depend on.
+Functionalities:
+    Playing a card into a hand, resolving cancellation in play order as Hand does
+    Rollout policy: a player short of their call plays the lowest card which would currently take the hand,
+    otherwise (or if none would) the lowest card; a player at their call plays the highest card which
+    wouldn't take the hand, otherwise the lowest card
+    Rolling out the rest of a round from a partly played hand, every player following the policy
+'''
+class Simulation:
+
+    def play(standing, seat, key):
+        if key in standing:
+            del standing[key]
+        else:
+            standing[key] = seat
+
+    def takes(standing, key, top):
+        return key > top and key not in standing
+
+    def choose(hand, standing, short):
+        top = max(standing) if standing else -1
+        if short:
+            taking = [key for key in hand if Simulation.takes(standing, key, top)]
+            return min(taking) if taking else min(hand)
+        losing = [key for key in hand if not Simulation.takes(standing, key, top)]
+        return max(losing) if losing else min(hand)
+
+    def rollout(hands, first, played, standing, calls, wins, carry):
+        # hands (lists of keys per seat), standing and wins are updated in place,
+        # the first played seats (counting from first) have already played this hand
+        numSeats = len(hands)
+        while True:
+            for i in range(played, numSeats):
+                seat = (first + i) % numSeats
+                hand = hands[seat]
+                key = Simulation.choose(hand, standing, wins[seat] < calls[seat])
+                hand.remove(key)
+                Simulation.play(standing, seat, key)
+            if not standing:
+                carry += 1
+            else:
+                first = standing[max(standing)]
+                wins[first] += 1 + carry
+                carry = 0
+            if not hands[first]:
+                return wins
+            played = 0
+            standing.clear()
@@ -86,50 +86,189 @@ TODO: Math details in README
 '''
 
 import sys
-from random import shuffle
-from numpy import mean
 
 from logic.game import Game
+from trials.campaign import Campaign
+from trials.sequential import SequentialStop
+from trials.trial import TrialRun
+from utils.constants import Books
+from utils.constants import Distribution
+from utils.constants import Metrics
 from utils.constants import Modes
+from utils.constants import Powers
+from utils.constants import Sequential
+from utils.constants import Solving
+from utils.constants import Strategies
+from utils.constants import Tournaments
+from utils.constants import Training
+from utils.constants import Trials
 
-mode = sys.argv[1]
+# optional settings are given anywhere as --key=value (or --flag), the rest are positional
+options = dict([arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--")])
+args = [arg for arg in sys.argv if not arg.startswith("--")]
+
+'''
+Starts the live metrics endpoint for a long run if asked to with --serve-metrics=[host:]port, returning it (or None).
+'''
+def serveMetrics(collect):
+    if "serve-metrics" not in options:
+        return None
+    from utils.metrics import MetricsServer
+    host, _, port = options["serve-metrics"].rpartition(":")
+    server = MetricsServer(collect, host or Metrics.HOST, int(port or Metrics.PORT))
+    print("Serving metrics on http://{}:{}/metrics".format(server.host, server.port), file = sys.stderr)
+    return server
+
+mode = args[1]
 if mode == Modes.PLAY:
-    cardRange = int(sys.argv[2])
-    numLives = int(sys.argv[3])
-    powerTries = int(sys.argv[4])
-    names = sys.argv[5:]
-    game = Game(names, cardRange, numLives, powerTries)
+    cardRange = int(args[2])
+    numLives = int(args[3])
+    powerTries = int(args[4])
+    names = args[5:]
+    # --decks=N shuffles N decks together, for larger tables
+    game = Game(names, cardRange, numLives, powerTries, numDecks = int(options.get("decks", 1)))
     game.playGame()
 elif mode == Modes.TRIAL:
-    numTrials = int(sys.argv[2])
-    writeStep = int(sys.argv[3])
-    writeFile = sys.argv[4]
-    cardRange = int(sys.argv[5])
-    numLives = int(sys.argv[6])
-    powerTries = int(sys.argv[7])
-    names = sys.argv[8:]
-    wins = {name: 0 for name in names}
-    finishes = {name: [] for name in names}
-    for i in range(numTrials):
-        if i != 0 and i % writeStep == 0:
-            with open("count.txt", "a") as f:
-                f.write("Iteration: {}\n Wins by Player: {}\n Average Finish (last {}): {}\n"
-                    .format(i, wins, writeStep, {name: mean(stand[-writeStep:]) for (name, stand) in finishes.items()}))
-        shuffle(names)
-        game = Game(names.copy(), cardRange, numLives, powerTries)
-        try:
-            game.playGame()
-            standings = game.standings
-            wins[standings[0]] += 1
-            curr = 1
-            for stand in standings:
-                finishes[stand].append(curr)
-                curr += 1
-        except Exception as e:
-            with open("count.txt", "a") as f:
-                f.write("Iteration {}: {}".format(i, e))
-    print("Trials: {}".format(numTrials))
-    print("Wins by player: {}".format(wins))
-    print("Average finish by player: {}".format({name: mean(stand) for (name, stand) in finishes.items()}))
+    numTrials = int(args[2])
+    writeStep = int(args[3])
+    writeFile = args[4]
+    cardRange = int(args[5])
+    numLives = int(args[6])
+    powerTries = int(args[7])
+    names = args[8:]
+    # --precision=p stops once win rates are known to +/- p (see trials/sequential.py)
+    stop = None
+    if "precision" in options:
+        stop = SequentialStop(float(options["precision"]), float(options.get("z", Sequential.Z)),
+            int(options.get("min-games", Sequential.MIN_GAMES)), int(options.get("every", Sequential.EVERY))
+        )
+    seed = int(options["seed"]) if "seed" in options else None
+    # --campaign=dir checkpoints the run there, --resume continues it from the last checkpoint
+    campaign = None
+    if "campaign" in options:
+        campaign = Campaign(options["campaign"], resume = "resume" in options,
+            every = int(options.get("checkpoint-every", Trials.CHECKPOINT_EVERY))
+        )
+    # --coordinate=host:port hands the games to WORKER processes, on this machine (--spawn=N) or others
+    coordinator = None
+    if "coordinate" in options:
+        from trials.distributed import Coordinator
+        host, _, port = options["coordinate"].rpartition(":")
+        coordinator = Coordinator(host or Distribution.HOST, int(port),
+            chunk = int(options.get("chunk", Distribution.CHUNK)), lease = float(options.get("lease", Distribution.LEASE)),
+            spawn = int(options.get("spawn", 0))
+        )
+    trial = TrialRun(names, cardRange, numLives, powerTries, numTrials, writeStep,
+        workers = int(options.get("workers", 1)), stop = stop, seed = seed, concurrent = int(options.get("concurrent", 1)),
+        campaign = campaign, coordinator = coordinator, numDecks = int(options.get("decks", 1))
+    )
+    # --serve-metrics=[host:]port serves live metrics while the trials run (see utils/metrics.py)
+    metricsServer = serveMetrics(trial.metrics)
+    print(trial.run())
+    if metricsServer is not None:
+        metricsServer.close()
+elif mode == Modes.WORKER:
+    from trials.distributed import Worker
+    Worker(args[2], int(args[3]), processes = int(options.get("workers", 1))).run()
+elif mode == Modes.REPLAY:
+    from trials.runner import replayFailures
+    print(replayFailures(args[2], int(args[3]) if len(args) > 3 else None))
+elif mode == Modes.SERVE:
+    # either "SERVE host port" for TCP or "SERVE unix path" for a Unix socket
+    import asyncio
+    from server.server import TableServer
+    # --max-tables=N refuses new tables while N are open
+    server = TableServer(maxTables = int(options["max-tables"]) if "max-tables" in options else None)
+    if args[2] == "unix":
+        asyncio.run(server.serve(path = args[3]))
+    else:
+        asyncio.run(server.serve(host = args[2], port = int(args[3])))
+elif mode == Modes.TOURNAMENT:
+    from trials.tournament import Tournament
+    form = args[2]
+    system = args[3]
+    tableSize = int(args[4])
+    cardRange = int(args[5])
+    numLives = int(args[6])
+    powerTries = int(args[7])
+    specs = args[8:]
+    tournament = Tournament(specs, tableSize, cardRange, numLives, powerTries, system, form,
+        workers = int(options.get("workers", Tournaments.WORKERS)),
+        maxGames = int(options.get("max-games", Tournaments.MAX_GAMES)),
+        seed = int(options.get("seed", 0)), numDecks = int(options.get("decks", 1))
+    )
+    print(tournament.run())
+elif mode == Modes.DUPLICATE:
+    from trials.duplicate import Duplicate
+    numDeals = int(args[2])
+    cardRange = int(args[3])
+    numLives = int(args[4])
+    powerTries = int(args[5])
+    specs = args[6:]
+    duplicate = Duplicate(specs, cardRange, numLives, powerTries, numDeals,
+        permute = "permute" in options,
+        workers = int(options.get("workers", Tournaments.WORKERS)),
+        seed = int(options.get("seed", 0)), numDecks = int(options.get("decks", 1))
+    )
+    print(duplicate.run())
+elif mode == Modes.TRAIN:
+    from training.selfplay import SelfPlay
+    numGames = int(args[2])
+    cardRange = int(args[3])
+    numLives = int(args[4])
+    powerTries = int(args[5])
+    names = args[6:]
+    selfPlay = SelfPlay(names, cardRange, numLives, powerTries, numGames,
+        actors = int(options.get("actors", Training.ACTORS)),
+        batch = int(options.get("batch", Training.BATCH)),
+        publish = int(options.get("publish", Training.PUBLISH)),
+        seed = int(options["seed"]) if "seed" in options else None,
+        metrics = options.get("metrics"),
+        metricsInterval = int(options.get("metrics-interval", Metrics.INTERVAL))
+    )
+    metricsServer = serveMetrics(selfPlay.metrics)
+    print(selfPlay.run())
+    if metricsServer is not None:
+        metricsServer.close()
+elif mode == Modes.BOOK:
+    from players.book import OpeningBook
+    cardRange = int(args[2])
+    powerTries = int(args[3])
+    maxPlayers = int(args[4])
+    maxCards = int(options.get("max-cards", Books.MAX_CARDS))
+    print("Situations: {}".format(OpeningBook.build(cardRange, powerTries, maxPlayers, maxCards)))
+elif mode == Modes.POWER:
+    from players.power import PowerTable
+    from training.power import PowerBuilder
+    cardRange = int(args[2])
+    powerTries = int(args[3])
+    maxPlayers = int(args[4])
+    numDecks = int(options.get("decks", 1))
+    builder = PowerBuilder(cardRange, powerTries, maxPlayers, numDecks,
+        strategy = options.get("strategy", Strategies.HARD),
+        samples = int(options.get("samples", Powers.SAMPLES)),
+        workers = int(options.get("workers", Powers.WORKERS)),
+        seed = int(options["seed"]) if "seed" in options else None
+    )
+    print("Situations: {}".format(builder.run()))
+    print(PowerTable.report(cardRange, numDecks, powerTries))
+elif mode == Modes.SOLVE:
+    from training.solver import CFRSolver
+    iterations = int(args[2])
+    cardRange = int(args[3])
+    numPlayers = int(args[4])
+    powerTries = int(args[5])
+    path = options.get("out", Solving.STRATEGY)
+    solver = CFRSolver(cardRange, numPlayers, powerTries,
+        maxCards = int(options.get("max-cards", Solving.MAX_CARDS)),
+        size = int(options.get("size", Solving.TABLE_SIZE)),
+        workers = int(options.get("workers", Solving.WORKERS)),
+        epoch = int(options.get("epoch", Solving.EPOCH)),
+        seed = int(options["seed"]) if "seed" in options else None
+    )
+    if "resume" in options:
+        solver.resume(path)
+    solver.run(iterations, path)
+    print(solver.report())
 else:
     print("Invalid game mode selected!")
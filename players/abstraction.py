@@ -0,0 +1,48 @@
+'''
+File for state abstraction of Q-Learning states.
+'''
+
+from utils.constants import Learning
+
+'''
+Static class mapping QLearning's raw states to coarser, canonical ones, so that the same states come up far
+more often (see Learning in constants.py for the bucket settings):
+    Making calls: (players left to call, ranks in hand, sum of calls so far, hand size) becomes
+        (players left to call, cards in hand per strength bucket, calls so far above or below an even
+        share of the hand size (rounded and clipped), hand size)
+    Choosing cards: (cards above the top card in hand, players left, sum of call-win differences after,
+    ranks if played or index of lowest winning card, call, wins) becomes
+        (cards above the top card in buckets, players left, clipped sum of differences, ranks or index,
+        clipped wins still needed, hand size)
+Strength buckets split the non-power ranks evenly, with the power cards in a bucket of their own, and counting
+the cards per bucket makes the state independent of the order of the hand.
+'''
+class StateAbstraction:
+
+    def bucket(rank, cardRange):
+        # ranks come from the card ranker: non-power ranks are below the card range, power cards above
+        if rank >= cardRange:
+            return Learning.BUCKETS - 1
+        return rank * (Learning.BUCKETS - 1) // cardRange
+
+    def clip(value):
+        return max(-Learning.CLIP, min(Learning.CLIP, int(round(value))))
+
+    def callState(state, numPlayers, cardRange):
+        playersLeft, rankedCards, calls, handSize = state
+        counts = [0] * Learning.BUCKETS
+        for rank in rankedCards:
+            counts[StateAbstraction.bucket(rank, cardRange)] += 1
+        numCalls = numPlayers - playersLeft - 1
+        excess = StateAbstraction.clip(calls - handSize * numCalls / numPlayers)
+        return (playersLeft, tuple(counts), excess, handSize)
+
+    def playState(state, handSize):
+        lessThan, playersLeft, sumDiffs, wouldWin, call, wins = state
+        if isinstance(lessThan, list):
+            lessThan = tuple([less // Learning.LESS_BUCKET for less in lessThan])
+        else:
+            lessThan = lessThan // Learning.LESS_BUCKET
+        if isinstance(wouldWin, list):
+            wouldWin = tuple(wouldWin)
+        return (lessThan, playersLeft, StateAbstraction.clip(sumDiffs), wouldWin, StateAbstraction.clip(call - wins), handSize)
@@ -0,0 +1,72 @@
+'''
+File for PolicyServer class, which makes decisions for many games at once.
+'''
+
+import threading
+from collections import defaultdict
+
+'''
+PolicyServer gathers the decisions of games played at once (one thread each, see BatchDecider) and makes them in batches:
+    State:
+        Games in play, decisions waiting to be made
+        Batches and decisions made (batch sizes for reporting)
+    Player classes opt in with a batched version of a decision (i.e. QApproximate.makeCallBatch), which takes
+    (player, arguments) pairs and returns the decisions in order
+Functionalities:
+    A decision waits until every game in play is waiting on one (or has finished), then the last game to arrive
+    makes every waiting decision, one batched call per player class and decision, and wakes the others
+    An error in a batch is raised in each of the games waiting on it
+Decisions of other players are made by their game's own thread as usual, so a batch holds the model-based
+decisions of every game which has reached one.
+'''
+class PolicyServer:
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active = 0
+        self.pending = []
+        self.batches = 0
+        self.decisions = 0
+
+    def join(self):
+        with self.condition:
+            self.active += 1
+
+    def leave(self):
+        with self.condition:
+            self.active -= 1
+            if self.pending and len(self.pending) >= self.active:
+                self.flush()
+
+    def request(self, player, decision, args):
+        # [player, decision, arguments, result, error, done]
+        entry = [player, decision, args, None, None, False]
+        with self.condition:
+            self.pending.append(entry)
+            if len(self.pending) >= self.active:
+                self.flush()
+            while not entry[5]:
+                self.condition.wait()
+        if entry[4] is not None:
+            raise entry[4]
+        return entry[3]
+
+    def flush(self):
+        # called holding the condition, by the last game to arrive
+        pending, self.pending = self.pending, []
+        batches = defaultdict(list)
+        for entry in pending:
+            batches[(type(entry[0]), entry[1])].append(entry)
+        for ((playerType, decision), entries) in batches.items():
+            try:
+                results = getattr(playerType, decision + "Batch")([(entry[0], entry[2]) for entry in entries])
+                for (entry, result) in zip(entries, results):
+                    entry[3] = result
+            except Exception as e:
+                for entry in entries:
+                    entry[4] = e
+            for entry in entries:
+                entry[5] = True
+            self.batches += 1
+            self.decisions += len(entries)
+        self.condition.notify_all()
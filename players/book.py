@@ -0,0 +1,128 @@
+'''
+File for the opening book of precomputed calls (OpeningBook class).
+'''
+
+import os
+
+import numpy as np
+
+from utils.card import CardInfo
+from utils.checkpoint import Checkpoint
+from utils.constants import Books
+from utils.probability import CallProbability
+from utils.probability import CancelProbability
+
+'''
+Static class for the opening book, which holds calls for every call situation of small rounds:
+    Situations are canonical: the hand's and the shown cards' slots (see CancelProbability.slotOf, which ranks
+    non-power numbers below the power cards and drops their suits, as Easy's counts only depend on rank order)
+    and the number of players, packed into an int64 key (Books.DIGIT bits a digit: players, hand size, shown
+    size, then the sorted slots); seat and calls so far only matter to Easy through the illegal call
+    Book (one checkpoint per card range, see checkpoint.py): sorted keys, and per key the expected loss of every
+    call, E|call - wins|, with wins the sum of the hand's independent win indicators under Easy's model, and for
+    each illegal call (-1 for none) the legal call with the least (the lowest on ties), which rounds Easy's
+    probabilities into a call optimally where Easy's own rule counts the cards above one half
+Functionalities:
+    Building enumerates every reachable situation (hand sizes 2 up to the largest given, as one-card rounds are
+    already solved by a table, see onecard.py, and one to power tries shown, the last never a power card)
+    Looking up is a binary search of the mapped keys, and misses (larger rounds, more players, several decks)
+    return None
+'''
+class OpeningBook:
+
+    books = {}
+
+    def path(cardRange):
+        return Books.PATH.format(cardRange)
+
+    def pack(numPlayers, hand, shown):
+        digits = [numPlayers, len(hand), len(shown)] + sorted(hand) + sorted(shown)
+        if len(digits) * Books.DIGIT >= 64 or max(digits) >= 2 ** Books.DIGIT:
+            return None
+        key = 0
+        for digit in digits:
+            key = (key << Books.DIGIT) | digit
+        return key
+
+    def multisets(capacity, size, start = 0):
+        if size == 0:
+            yield ()
+            return
+        for slot in range(start, len(capacity)):
+            if capacity[slot]:
+                capacity[slot] -= 1
+                for rest in OpeningBook.multisets(capacity, size - 1, slot):
+                    yield (slot,) + rest
+                capacity[slot] += 1
+
+    def evaluate(hand, shown, numPlayers, cardRange, maxCards):
+        # Easy's win probability for each card: unseen cards (own hand included) strictly below and above its slot
+        probs = CallProbability.cardProbabilities(hand, shown, numPlayers, cardRange)
+        # distribution of wins, a sum of independent indicators
+        wins = np.zeros(len(hand) + 1)
+        wins[0] = 1.0
+        for prob in probs:
+            wins[1:] = wins[1:] * (1 - prob) + wins[:-1] * prob
+            wins[0] *= 1 - prob
+        losses = [float(np.abs(call - np.arange(len(hand) + 1)) @ wins) for call in range(maxCards + 1)]
+        calls = [
+            min([call for call in range(len(hand) + 1) if call != illegal], key = lambda call: losses[call])
+            for illegal in range(-1, maxCards + 1)
+        ]
+        return calls, losses
+
+    def build(cardRange, powerTries, maxPlayers, maxCards = Books.MAX_CARDS):
+        numSlots = CancelProbability.numSlots(cardRange)
+        capacity = CancelProbability.capacity(cardRange)
+        entries = {}
+        for numShown in range(1, powerTries + 1):
+            # the generator holds its cards out of the capacity while its multiset is in use, so hands are dealt
+            # from what's left
+            for shown in OpeningBook.multisets(capacity, numShown):
+                # the accepted draw is one number below the power, so never a power card
+                if min(shown) >= cardRange - 1:
+                    continue
+                for numPlayers in range(2, maxPlayers + 1):
+                    for numCards in range(2, maxCards + 1):
+                        if numCards * numPlayers > len(CardInfo.SUITS) * cardRange - powerTries:
+                            continue
+                        for hand in OpeningBook.multisets(capacity, numCards):
+                            key = OpeningBook.pack(numPlayers, hand, shown)
+                            if key is not None:
+                                entries[key] = OpeningBook.evaluate(hand, shown, numPlayers, cardRange, maxCards)
+        keys = np.array(sorted(entries), dtype = np.int64)
+        arrays = {
+            "keys": keys,
+            "calls": np.array([entries[key][0] for key in keys.tolist()], dtype = np.int8),
+            "losses": np.array([entries[key][1] for key in keys.tolist()], dtype = np.float32),
+        }
+        header = {"cardRange": cardRange, "powerTries": powerTries, "maxPlayers": maxPlayers, "maxCards": maxCards,
+            "slots": numSlots}
+        Checkpoint.save(OpeningBook.path(cardRange), header, arrays)
+        OpeningBook.books.pop(cardRange, None)
+        return len(keys)
+
+    def load(cardRange):
+        # books are mapped once per process, a missing book is remembered as None
+        if cardRange not in OpeningBook.books:
+            path = OpeningBook.path(cardRange)
+            OpeningBook.books[cardRange] = Checkpoint.load(path)[1] if os.path.exists(path) else None
+        return OpeningBook.books[cardRange]
+
+    def lookup(hand, shown, power, cardRange, numPlayers, illegal, numDecks = 1):
+        # returns the least expected loss legal call and the expected loss of every call, or None if the book doesn't hold the situation
+        if numDecks != 1:
+            return None
+        book = OpeningBook.load(cardRange)
+        if book is None:
+            return None
+        key = OpeningBook.pack(numPlayers, [CancelProbability.slotOf(card, power, cardRange) for card in hand],
+            [CancelProbability.slotOf(card, power, cardRange) for card in shown])
+        if key is None:
+            return None
+        keys = book["keys"]
+        row = int(np.searchsorted(keys, key))
+        if row == len(keys) or keys[row] != key:
+            return None
+        # an illegal call below zero (calls so far above the hand size) rules nothing out, as -1 doesn't
+        return int(book["calls"][row, max(illegal, -1) + 1]), book["losses"][row]
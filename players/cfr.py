@@ -0,0 +1,175 @@
+'''
+File for the CFR player class and the information sets it shares with the solver (see training/solver.py).
+'''
+
+import random
+import time
+
+from players.player import Player
+from players.prob import Easy
+from players.prob import Hard
+from utils.card import CardInfo
+from utils.checkpoint import Checkpoint
+from utils.constants import SLEEP_TIME
+from utils.constants import Gameplay
+from utils.constants import Solving
+
+'''
+Static class for the information sets of a round, as keys (tuples of ints) and action slots:
+    Cards are keyed as the card ranker ranks them (number, or card range + suit rank for power cards), which
+    loses nothing: suits only matter for power cards, and equal non-power numbers cancel whatever their suits
+    Seats count from the first to call (the dealer is last), so keys don't depend on where the dealer sits
+    Choosing power (slot 0 yes, 1 no): players, hand size, try, candidate, numbers of the draws rejected so far
+    (the dealer can't see their hand before choosing)
+    Making calls (slot is the call): players, hand size, power, hand, draws, calls so far, and in one-card
+    rounds the other players' cards in seat order in place of the player's own (which they can't see)
+    Choosing cards (slot is the index among the hand's distinct keys): players, hand size, power, hand left,
+    draws, every call, seat and every card played so far in order (which, with the calls, fixes who played them)
+Keys are hashed into fixed-size tables as with HashedTable, so keys which collide share a row.
+'''
+class InfoSets:
+
+    POWER = 0
+    CALL = 1
+    PLAY = 2
+
+    def cardKey(num, suitRank, power, cardRange):
+        if num == power:
+            return cardRange + suitRank
+        return num
+
+    def keyCard(card, power, cardRange):
+        return InfoSets.cardKey(card.num, CardInfo.SUIT_RANKS[card.suit], power, cardRange)
+
+    def powerKey(numPlayers, numCards, tryIndex, cand, draws):
+        return (InfoSets.POWER, numPlayers, numCards, tryIndex, cand, draws)
+
+    def callKey(numPlayers, numCards, power, hand, draws, calls, others):
+        return (InfoSets.CALL, numPlayers, numCards, power, hand if numCards > 1 else (), draws, calls, others)
+
+    def playKey(numPlayers, numCards, power, hand, draws, calls, seat, sequence):
+        return (InfoSets.PLAY, numPlayers, numCards, power, hand, draws, calls, seat, sequence)
+
+    def distinct(hand):
+        # a sorted hand's distinct keys, the choices of card that play differently
+        return sorted(set(hand))
+
+'''
+Class for CFR AI player, which plays a strategy solved by counterfactual regret minimization (see training/solver.py):
+    Tracks the round as the solver's information sets see it: the draws, calls in order and every card played
+    Every decision samples the solved average strategy of its information set, over the legal actions
+    Rounds the solver wasn't run for (hand sizes, player counts or several decks) and information sets it never
+    reached are played as Hard plays them
+    The strategy file is a setting (i.e. CFR:strategy='players/strategies/small.ckpt'), mapped once per process
+    and shared by every CFR player
+'''
+class CFR(Player):
+
+    strategy = Solving.STRATEGY
+    tables = {}
+
+    def setHand(self, hand):
+        Player.setHand(self, hand)
+        # set again by makeCall, kept for rounds whose call was made without the player (i.e. a missed deadline)
+        self.roundCalls = []
+        self.sequence = []
+        self.power = None
+        self.cardRange = None
+        self.numPlayers = None
+        self.numCards = len(hand)
+        self.draws = ()
+        self.seat = None
+
+    def table(self):
+        if self.strategy not in CFR.tables:
+            header, arrays = Checkpoint.load(self.strategy)
+            CFR.tables[self.strategy] = (header, arrays["strategy"], set([tuple(config) for config in header["configs"]]))
+        return CFR.tables[self.strategy]
+
+    def solved(self, numPlayers, numCards):
+        # rows of rounds the solver wasn't run for only hold other keys which collided with them,
+        # and the solver only deals one deck
+        if self.numDecks != 1:
+            return False
+        _, _, configs = self.table()
+        return (numPlayers, numCards) in configs
+
+    def decide(self, key, legal):
+        _, strategy, _ = self.table()
+        row = strategy[hash(key) % len(strategy)]
+        weights = [float(row[action]) for action in legal]
+        total = sum(weights)
+        if total <= 0:
+            return None
+        draw = random.random() * total
+        for (action, weight) in zip(legal, weights):
+            draw -= weight
+            if draw < 0:
+                return action
+        return legal[-1]
+
+    def observing(self):
+        return True
+
+    def observeCall(self, name, call):
+        Player.observeCall(self, name, call)
+        self.roundCalls.append(call)
+
+    def observePlay(self, name, card, calls, wins):
+        Player.observePlay(self, name, card, calls, wins)
+        self.sequence.append(InfoSets.keyCard(card, self.power, self.cardRange))
+
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        header, _, _ = self.table()
+        cardRange = header["cardRange"]
+        draws = tuple([card.num for card in shown])
+        key = InfoSets.powerKey(numPlayers, len(self.currHand), len(shown), cand, draws)
+        decision = self.decide(key, [0, 1]) if self.solved(numPlayers, len(self.currHand)) else None
+        if decision is None:
+            return Hard.choosePower(self, cand, shown, numPlayers, cardRange, powerTries)
+        return Gameplay.POWER_YES if decision == 0 else Gameplay.POWER_NO
+
+    def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        header, _, _ = self.table()
+        if header["cardRange"] != cardRange:
+            raise ValueError("{} was solved for card range {}, not {}!".format(self.strategy, header["cardRange"], cardRange))
+        self.power = power
+        self.cardRange = cardRange
+        self.numPlayers = numPlayers
+        self.numCards = roundNum
+        self.draws = tuple([InfoSets.keyCard(card, power, cardRange) for card in shown])
+        self.seat = len(currCalls)
+        hand = tuple(sorted([InfoSets.keyCard(card, power, cardRange) for card in self.currHand]))
+        others = tuple([InfoSets.keyCard(card, power, cardRange) for (name, card) in namedDeals.items() if name != self.name])
+        key = InfoSets.callKey(numPlayers, roundNum, power, hand, self.draws, tuple(currCalls.values()), others)
+        call = None
+        if self.solved(numPlayers, roundNum):
+            call = self.decide(key, [call for call in range(roundNum + 1) if call != illegal])
+        if call is None:
+            return Easy.makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
+
+        self.currCall = call
+        self.calls.append(call)
+
+        return call
+
+    def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
+        keys = [InfoSets.keyCard(card, power, cardRange) for card in self.currHand]
+        choices = InfoSets.distinct(keys)
+        if len(choices) == 1:
+            choice = choices[0]
+        else:
+            decision = None
+            if self.solved(self.numPlayers, self.numCards):
+                key = InfoSets.playKey(self.numPlayers, self.numCards, power, tuple(sorted(keys)), self.draws,
+                    tuple(self.roundCalls), self.seat, tuple(self.sequence)
+                )
+                decision = self.decide(key, list(range(len(choices))))
+            if decision is None:
+                return Hard.chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange)
+            choice = choices[decision]
+        choice = self.currHand.pop(keys.index(choice))
+        print("{} played the {}.".format(self.name, str(choice)))
+        print()
+        time.sleep(SLEEP_TIME)
+        return choice
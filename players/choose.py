@@ -5,6 +5,7 @@ File for player type choosing logic.
 from players.manual import Manual
 from players.random import Random
 from players.search import Search
+from players.cfr import CFR
 from players.prob import Easy
 from players.prob import Hard
 from players.logistic import Logistic
@@ -34,5 +35,7 @@ def chooseStrategy(name, numLives, history):
         return QLearning(name, numLives, history)
     elif Strategies.Q_APPROXIMATE in name:
         return QApproximate(name, numLives, history)
+    elif Strategies.CFR in name:
+        return CFR(name, numLives, history)
     else:
         return Manual(name, numLives, history)
\ No newline at end of file
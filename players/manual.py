@@ -15,8 +15,8 @@ Implements round-level decisions via user input in terminal.
 '''
 class Manual(Player):
 
-    def choosePower(self, cand, shown):
-        decision = input("{}, would you like for {} to be the power card? [{}/{}]: ".format(self.name, CardInfo.RANKS[cand], POWER_YES, POWER_NO))
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        decision = input("{}, would you like for {} to be the power card? [{}/{}]: ".format(self.name, CardInfo.rankName(cand), POWER_YES, POWER_NO))
         if decision == Gameplay.POWER_YES or decision == Gameplay.POWER_NO:
             return decision
         else:
@@ -26,11 +26,11 @@ class Manual(Player):
     def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
         if namedDeals:
             print("Current Information \nCurrent Calls: {} \nNumber of Players: {} \nRound: {} \nPower: {} \nShown: {} \nHands: {}"
-                    .format(currCalls, numPlayers, roundNum, CardInfo.RANKS[power], shown, 
+                    .format(currCalls, numPlayers, roundNum, CardInfo.rankName(power), shown, 
                         {name: str(card) for (name, card) in namedDeals.items() if name != self.name}))
         else:
             print("Current Information \nCurrent Calls: {} \nNumber of Players: {} \nRound: {} \nPower: {} \nShown: {} \nHand: {}"
-                    .format(currCalls, numPlayers, roundNum, CardInfo.RANKS[power], shown, self.currHand))
+                    .format(currCalls, numPlayers, roundNum, CardInfo.rankName(power), shown, self.currHand))
 
         if illegal >= 0:
             print("You are the last player to make a call this round! You cannot call {}.".format(illegal))
@@ -60,7 +60,7 @@ class Manual(Player):
             return choice
         print("It is currently {}'s turn to choose a card.".format(self.name))
         print("Current Information \nCalls: {} \nWins: {} \nPlays: {} \nPower: {} \nShown Cards: {}"
-                .format(calls, wins, namedPlays, CardInfo.RANKS[power], shown))
+                .format(calls, wins, namedPlays, CardInfo.rankName(power), shown))
         print("Your Hand: {}".format(self.currHand))
         try:
             index = int(input("{}, submit the index of your choice of card (0-indexed): ".format(self.name)))
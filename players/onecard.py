@@ -0,0 +1,67 @@
+'''
+File for the closed-form one-card round call solver.
+'''
+
+from utils.card import CardInfo
+from utils.probability import CancelProbability
+
+'''
+Class for solving calls in one-card rounds, where every card but the player's own is visible.
+With only one hand to play, the player wins exactly when their unknown card X (uniform over the
+unseen cards) beats the cards at the table, so the call only depends on
+    W: number of unseen cards with which the player would win, and T: number of unseen cards
+Counting W accounts for cancellation (see Hand.checkCancel), which pairs off equal cards in play order
+(cards of a slot, see CancelProbability, so non-power ranks whatever their suits and, with several decks,
+identical power cards), so a slot played an odd number of times leaves its last card standing:
+    Let top be the highest slot left standing among the other players' cards
+    X of slot s only wins if s is above top and, counting X, s is played an odd number of times with X
+    played last among them (X can never win by cancelling top, as it cancels too)
+Losses are symmetric (call 1 and lose, or call 0 and win, both cost one life), so the best call is
+1 exactly when W / T > 1/2, unless the call is illegal.
+Calls are precomputed for every (illegal, T, W) up to a full deck, so each decision is a count and a table
+lookup (larger decks are solved as they come).
+'''
+class OneCardSolver:
+
+    def __init__(self, maxCards = len(CardInfo.RANKS) * len(CardInfo.SUITS)):
+        # calls[illegal + 1][total][winning], illegal is -1 (none), 0 or 1
+        self.calls = [
+            [[OneCardSolver.solve(total, winning, illegal) for winning in range(total + 1)] for total in range(maxCards + 1)]
+            for illegal in range(-1, 2)
+        ]
+
+    def solve(total, winning, illegal):
+        if illegal == 0 or illegal == 1:
+            return 1 - illegal
+        return int(2 * winning > total)
+
+    def count(self, name, namedDeals, shown, power, cardRange, numDecks = 1):
+        unseen = CancelProbability.capacity(cardRange, numDecks)
+        held = [0] * len(unseen)
+        # namedDeals is in play order, so the player is last among holders of a slot iff
+        # nobody after them holds it
+        after = set()
+        passed = False
+        for (player, card) in namedDeals.items():
+            if player == name:
+                passed = True
+                continue
+            slot = CancelProbability.slotOf(card, power, cardRange)
+            unseen[slot] -= 1
+            held[slot] += 1
+            if passed:
+                after.add(slot)
+        for card in shown:
+            unseen[CancelProbability.slotOf(card, power, cardRange)] -= 1
+
+        total = sum(unseen)
+        top = max([slot for slot in range(len(held)) if held[slot] % 2], default = -1)
+        winning = sum([unseen[slot] for slot in range(top + 1, len(unseen)) if not held[slot] or slot not in after])
+        return winning, total
+
+    def call(self, name, namedDeals, shown, power, cardRange, illegal, numDecks = 1):
+        winning, total = self.count(name, namedDeals, shown, power, cardRange, numDecks)
+        # the dealer's illegal call can be negative (others called more than one), i.e. no constraint
+        if total >= len(self.calls[0]):
+            return OneCardSolver.solve(total, winning, max(illegal, -1))
+        return self.calls[max(illegal, -1) + 1][total][winning]
@@ -0,0 +1,135 @@
+'''
+File for OpponentModel class.
+'''
+
+import numpy as np
+
+from utils.card import Card
+from utils.card import CardInfo
+from utils.constants import Gameplay
+from utils.constants import Modeling
+
+'''
+Class for a player's beliefs about the hidden hands of their opponents in the current round:
+    Round information passed down from the player:
+        Own name, number of cards dealt, power card, card range, own hand and cards shown so far
+        Calls made so far (opponents calling later are added as their calls are observed), number of decks
+    Beliefs:
+        Per opponent, an array of weights over every card (indexed num * suits + suit rank, then the same for
+        each further deck's copies), zero for cards known not to be held; unseen cards not in an opponent's
+        hand are left in the deck
+        Copies of a card are interchangeable, so a card seen removes its first copy still unseen
+        Number of cards left in each opponent's hand
+Functionalities:
+    Incremental updates, each multiplying the weights by a likelihood:
+        Call: a player calling k of n cards more likely holds cards which tend to win hands, the more
+        so the further k / n is from 1/2 (a call of half the cards says nothing)
+        Play: the card is removed from every hand; a player still short of their call is less likely
+        to hold cards beating the one they played, and a player avoiding wins cards below it
+    Marginal probability of each opponent holding each card
+    State of the hand in progress (first seat, seats played, cards left standing by key, see simulate.py)
+    Sampling the opponents' hands weighted by the beliefs (one opponent at a time in random order,
+    without replacement), cheap enough to draw for every rollout
+'''
+class OpponentModel:
+
+    def __init__(self, name, numCards, power, cardRange, hand, shown, calls = {}, numDecks = 1):
+        self.name = name
+        self.numCards = numCards
+        self.power = power
+        self.cardRange = cardRange
+        self.numTypes = cardRange * len(CardInfo.SUITS)
+        self.cards = [Card(num, suit) for _ in range(numDecks) for num in range(cardRange) for suit in CardInfo.SUITS]
+        # keys rank cards as CardUtils.cardRankerGen does
+        self.keys = np.array([
+            card.num if card.num != power else cardRange + CardInfo.SUIT_RANKS[card.suit] for card in self.cards
+        ])
+        # strength of each card: share of the other cards in the deck it beats (a tie counts half)
+        lower = (self.keys[:, None] > self.keys[None, :]).sum(axis = 1)
+        ties = (self.keys[:, None] == self.keys[None, :]).sum(axis = 1) - 1
+        self.strength = (lower + ties / 2) / (len(self.cards) - 1)
+
+        self.unseen = np.ones(len(self.cards))
+        for card in hand:
+            self.unseen[self.copyIndex(card)] = 0
+        for card in shown:
+            self.unseen[self.copyIndex(card)] = 0
+        self.weights = {}
+        self.sizes = {}
+        for (caller, call) in calls.items():
+            self.observeCall(caller, call)
+
+    def index(self, card):
+        return card.num * len(CardInfo.SUITS) + CardInfo.SUIT_RANKS[card.suit]
+
+    def copyIndex(self, card):
+        # the first copy of the card still unseen (the last copy if none is)
+        index = self.index(card)
+        while not self.unseen[index] and index + self.numTypes < len(self.unseen):
+            index += self.numTypes
+        return index
+
+    # Updates
+
+    def observeCall(self, name, call):
+        if name == self.name or name in self.weights:
+            return
+        share = call / self.numCards
+        likelihood = self.strength * share + (1 - self.strength) * (1 - share)
+        self.weights[name] = self.unseen * likelihood ** Modeling.CALL_WEIGHT
+        self.sizes[name] = self.numCards
+
+    def observePlay(self, name, card, calls, wins):
+        index = self.index(card)
+        # own cards were never unseen
+        if name != self.name:
+            copy = self.copyIndex(card)
+            self.unseen[copy] = 0
+            for weights in self.weights.values():
+                weights[copy] = 0
+        if name not in self.weights:
+            return
+        self.sizes[name] -= 1
+        if wins[name] < calls[name]:
+            self.weights[name][self.keys > self.keys[index]] *= Modeling.PLAY_TILT
+        else:
+            self.weights[name][self.keys < self.keys[index]] *= Modeling.PLAY_TILT
+
+    # Queries
+
+    def marginals(self, name):
+        weights = self.weights[name]
+        if not weights.sum():
+            return weights
+        return np.minimum(weights * self.sizes[name] / weights.sum(), 1)
+
+    def sample(self):
+        # returns card indices per opponent
+        pool = self.unseen.copy()
+        hands = {}
+        names = list(self.weights)
+        for i in np.random.permutation(len(names)):
+            name = names[i]
+            size = self.sizes[name]
+            if not size:
+                hands[name] = np.array([], dtype = int)
+                continue
+            weights = self.weights[name] * pool
+            hands[name] = np.random.choice(len(weights), size, replace = False, p = weights / weights.sum())
+            pool[hands[name]] = 0
+        return hands
+
+    def handState(self, names, plays):
+        # names and plays are in seat order, the hand started with the earliest of those who played before this player
+        numSeats = len(names)
+        seat = names.index(self.name)
+        first = seat
+        while plays[(first - 1) % numSeats] is not None and (first - 1) % numSeats != seat:
+            first = (first - 1) % numSeats
+        played = (seat - first) % numSeats
+        standing = {}
+        for other in range(first, first + played):
+            play = plays[other % numSeats]
+            if play != Gameplay.CANCELLED:
+                standing[self.keys[self.index(play)]] = other % numSeats
+        return first, played, standing
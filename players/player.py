@@ -2,26 +2,42 @@
 File for abstract Player class.
 '''
 
+import asyncio
+import copy
+
+from utils.card import CardCollection
+
 '''
 Abstract class for players.
 Player stores player-level information:
     Player game status passed down from game.py:
         Name of player, number of lives remaining, and access to rounds history
+        Number of decks in play (one unless the game sets it)
     Player game history:
         Hands had, calls made, lives lost
     Player round information:
         Current hand (passed down from round.py), current call
         Card ranker for the current round is also passed down, used by computer players
+        Opponent model for the current round, for players which keep one (see opponents.py)
 Functionalities:
     Game-level updates:
         Setting hand and losing lives (info passed down from game.py)
+    Observations:
+        Every call and play in the round is passed to the players which observe them (see observing), and on to
+        their opponent model
     Round-level decisions (abstract methods):
         Choosing power card: given a card num from round.py, return yes / no decision
         Making call: given current round info, return int for round call
         Choosing card: given current hand info, return choice of Card
+    Awaitable decisions:
+        Each decision has an async counterpart, by default running the blocking decision in a thread
+        Players who wait on outside input (e.g. Remote) override these to await natively
+        Snapshot / commit let a deadline-bound decision run on a copy, so a late answer can be dropped
 '''
 class Player:
 
+    numDecks = 1
+
     # Implemented methods for game-level updates and information passing
 
     def __init__(self, name, numLives, history):
@@ -33,10 +49,12 @@ class Player:
         self.lost = []
         self.currHand = []
         self.currCall = None
+        self.model = None
 
     def setHand(self, hand):
         self.currHand = hand
         self.hands.append(hand.copy())
+        self.model = None
 
     def loseLives(self, lost):
         self.lost.append(lost)
@@ -47,8 +65,42 @@ class Player:
     def setLives(self, lives):
         self.lives = lives
 
+    # Observations of other players' decisions, passed down from round.py and hand.py
+
+    def observing(self):
+        # rounds only pass calls and plays to players which keep a model or track them, asked once per round
+        return False
+
+    def observeCall(self, name, call):
+        if self.model is not None:
+            self.model.observeCall(name, call)
+
+    def observePlay(self, name, card, calls, wins):
+        if self.model is not None:
+            self.model.observePlay(name, card, calls, wins)
+
+    # Snapshots for decisions which may be abandoned (see logic/decision.py)
+
+    def snapshot(self):
+        # lists and hands are mutated by decisions, so those are copied, tables and models are shared
+        snapshot = copy.copy(self)
+        for (attr, value) in vars(self).items():
+            if isinstance(value, list):
+                setattr(snapshot, attr, list(value))
+            elif isinstance(value, CardCollection):
+                setattr(snapshot, attr, value.copy())
+        return snapshot
+
+    def commit(self, snapshot):
+        vars(self).update(vars(snapshot))
+
+    def missDecision(self, decision, *args):
+        # told when a decision past its deadline is made for the player by fallback logic, with the decision's
+        # arguments, before the fallback runs; agents which keep state per round override this
+        pass
+
     # Abstract methods for round-level updates
-    def choosePower(self, cand, shown):
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
         pass
 
     def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
@@ -56,3 +108,14 @@ class Player:
 
     def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
         pass
+
+    # Awaitable versions of the round-level decisions
+
+    async def choosePowerAsync(self, cand, shown, numPlayers, cardRange, powerTries):
+        return await asyncio.to_thread(self.choosePower, cand, shown, numPlayers, cardRange, powerTries)
+
+    async def makeCallAsync(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        return await asyncio.to_thread(self.makeCall, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
+
+    async def chooseCardAsync(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
+        return await asyncio.to_thread(self.chooseCard, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange)
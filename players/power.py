@@ -0,0 +1,81 @@
+'''
+File for the power card tables, from which AI dealers choose the power card (PowerTable class).
+'''
+
+import os
+
+import numpy as np
+
+from utils.checkpoint import Checkpoint
+from utils.constants import Gameplay
+from utils.constants import Powers
+
+'''
+Static class for the power card tables, which hold the dealer's expected lives lost for accepting or rejecting
+each candidate (built by playing rounds out, see training/power.py):
+    The dealer can't see their hand yet, and every candidate orders the cards alike (the other numbers below the
+    power cards), so a candidate only differs by how many of its cards were drawn before it (its matches, which
+    are out of play); situations are (players, round size, try, matches)
+    Table (one checkpoint per card range, decks and power tries, see checkpoint.py): the expected lives lost for
+    accepting per situation and for rejecting per (players, round size, try), and the decision per situation
+    (1 to accept, 0 to reject, -1 where too few rounds were played to tell)
+Functionalities:
+    Choosing is one dict lookup (tables are read into a dict of their decisions once per process, well under a
+    microsecond a decision); without a table (or past it) the candidate is accepted if any of its cards were
+    drawn, the rule the tables replace
+    Reports how often each try and matches is accepted, and what accepting costs over rejecting
+'''
+class PowerTable:
+
+    tables = {}
+
+    def path(cardRange, numDecks, powerTries):
+        return Powers.PATH.format(cardRange, numDecks, powerTries)
+
+    def matches(cand, shown):
+        return [card.num for card in shown.cards].count(cand)
+
+    def load(cardRange, numDecks, powerTries):
+        # tables are read once per process into a dict of the decided situations, a missing table is remembered as None
+        settings = (cardRange, numDecks, powerTries)
+        if settings not in PowerTable.tables:
+            path = PowerTable.path(cardRange, numDecks, powerTries)
+            table = None
+            if os.path.exists(path):
+                decisions = Checkpoint.load(path)[1]["decisions"]
+                table = {tuple(situation): Gameplay.POWER_YES if decisions[tuple(situation)] else Gameplay.POWER_NO
+                    for situation in np.argwhere(decisions >= 0).tolist()}
+            PowerTable.tables[settings] = table
+        return PowerTable.tables[settings]
+
+    def choose(cand, shown, numPlayers, numCards, cardRange, powerTries, numDecks = 1):
+        matches = PowerTable.matches(cand, shown)
+        table = PowerTable.tables.get((cardRange, numDecks, powerTries), False)
+        if table is False:
+            table = PowerTable.load(cardRange, numDecks, powerTries)
+        if table is not None:
+            decision = table.get((numPlayers, numCards, len(shown.cards), matches))
+            if decision is not None:
+                return decision
+        return Gameplay.POWER_YES if matches else Gameplay.POWER_NO
+
+    def report(cardRange, numDecks, powerTries):
+        # for each try and matches, the share of decided situations (players, round size) accepting
+        path = PowerTable.path(cardRange, numDecks, powerTries)
+        header, arrays = Checkpoint.load(path)
+        accept = arrays["accept"]
+        reject = arrays["reject"]
+        decisions = arrays["decisions"]
+        lines = ["{} ({}, {} rounds a situation and try)".format(path, header["strategy"], header["samples"])]
+        for tryIndex in range(powerTries - 1):
+            for matches in range(decisions.shape[3]):
+                decided = decisions[:, :, tryIndex, matches] >= 0
+                if not decided.any():
+                    continue
+                gaps = (accept[:, :, tryIndex, matches] - reject[:, :, tryIndex])[decided]
+                lines.append("Try {}, {} of its cards drawn: accepted in {:.0%} of {} situations, "
+                    "accepting costs {:+.3f} lives on average".format(
+                    tryIndex + 1, matches, float(decisions[:, :, tryIndex, matches][decided].mean()), int(decided.sum()),
+                    float(gaps.mean())
+                ))
+        return "\n".join(lines)
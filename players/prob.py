@@ -4,112 +4,70 @@ File for expected utility-based Player classes (Easy, Medium, Hard).
 
 import time
 
+import numpy as np
 import scipy.stats as sc
+from logic.simulate import Simulation
+from players.book import OpeningBook
+from players.onecard import OneCardSolver
+from players.opponents import OpponentModel
 from players.player import Player
-from utils.card import Card
-from utils.card import CardInfo
-from utils.card import CardUtils
+from players.power import PowerTable
+from utils.cache import DecisionCache
 from utils.constants import SLEEP_TIME
-from utils.constants import Gameplay
+from utils.constants import Caching
+from utils.constants import Modeling
+from utils.probability import CallProbability
+from utils.probability import CancelProbability
 
 '''
 Class for Easy AI player (expected utility).
 Implements round-level decisions via the following logic:
-    Choosing power card: Default to showing 3 cards, unless candidate has been shown
+    Choosing power card: Accepts or rejects by the power card tables (see power.py), which compare the dealer's
+    expected lives lost for the candidate with that of trying the next draw, by players, round size, try and
+    how many of the candidate's cards were drawn; without a table, accepts a candidate some of whose cards were drawn
     Make call:
         Assumes uniform distribution of cards across other hands and random play
         Does not update according to other information and ignores cancellation
         Makes calls per card depending on probability of victory
-        Math: X ~ hypergeometric(g + l, l, p - 1), where:
+        Math (see CallProbability in utils/probability.py): X ~ hypergeometric(g + l, l, p - 1), where:
             X is RV representing # cards played each hand > card in hand
             g, l are # cards the card is greater than and less than among all remaining cards
             p is the total number of players
             P(X = 0) is the expected value of indicator for winning with the card
             Since loss is symmetric, call when P(X = 0) > 1/2
+        One-card rounds are solved exactly, cancellation included (see onecard.py)
+        Calls of small rounds are looked up in the opening book instead when one was built (see book.py), which
+        holds the legal call of least expected loss under this model
+        Calls are memoized by canonical state (players, decks, illegal call, hand's and shown cards' slots, see
+        CancelProbability.slotOf), as suits and order don't change them (see utils/cache.py)
     Choose card:
         Random
 '''
 class Easy(Player):
 
-    def choosePower(self, cand, shown):
-        if cand in shown:
-            return Gameplay.POWER_YES
-        return Gameplay.POWER_NO
+    oneCardSolver = OneCardSolver()
+    callCache = DecisionCache("calls", Caching.CALL_DECISIONS)
+
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        return PowerTable.choose(cand, shown, numPlayers, len(self.currHand), cardRange, powerTries, self.numDecks)
 
     def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
         # at beginning of each round, store the card ranker for the current round
         self.cardRanker = cardRanker
         if namedDeals:
-            return self.makeOneCardCall(currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
-
-        currRanks = set([card.rank for card in self.currHand])
-        allCards = []
-        for num in range(cardRange):
-            if num == power:
-                continue
-            currRank = []
-            inHand = []
-            for suit in CardInfo.SUITS:
-                card = Card(num, suit)
-                if card in self.currHand:
-                    inHand.append(card)
-                currRank.append((card, card in shown))
-            allCards.append((currRank, inHand))
-        for suit in CardInfo.SUITS:
-            powerCard = Card(power, suit)
-            if powerCard in self.currHand:
-                allCards.append(([(powerCard, powerCard in shown)], [powerCard]))
+            return Easy.makeOneCardCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
+        hand = [CancelProbability.slotOf(card, power, cardRange) for card in self.currHand]
+        drawn = [CancelProbability.slotOf(card, power, cardRange) for card in shown]
+        key = (cardRange, self.numDecks, numPlayers, max(illegal, -1), tuple(sorted(hand)), tuple(sorted(drawn)))
+        call = Easy.callCache.get(key)
+        if call is None:
+            entry = OpeningBook.lookup(self.currHand, shown, power, cardRange, numPlayers, illegal, self.numDecks)
+            if entry is not None:
+                call = entry[0]
             else:
-                allCards.append(([(powerCard, powerCard in shown)], []))
-
-        count = 0
-        # number of cards remaining that each card is greater than
-        greatThan = {}
-        for rank in allCards:
-            if rank[1]:
-                for card in rank[1]:
-                    greatThan[card] = count
-            for cardData in rank[0]:
-                if cardData[1]:
-                    continue
-                else:
-                    count += 1
-
-        count = 0
-        # number of cards remaining that each card is less than
-        lessThan = {}
-        for rank in allCards[::-1]:
-            if rank[1]:
-                for card in rank[1]:
-                    lessThan[card] = count
-            for cardData in rank[0]:
-                if cardData[1]:
-                    continue
-                else:
-                    count += 1
-
-        call = 0
-        total = 0
-        for card in self.currHand:
-            great = greatThan[card]
-            less = lessThan[card]
-            hypergeom = sc.hypergeom(great + less, less, numPlayers - 1)
-            prob = hypergeom.pmf(0)
-            if prob > .5:
-                call += 1
-            total += prob
-        average = total / roundNum
-
-        # if call would be illegal, average probability informs + or -
-        # unless call would be over the total, in which case go down
-        # or if call would be negative, in which case go up
-        if call == illegal:
-            if call == roundNum:
-                call -= 1
-            elif call == 0:
-                call += 1
-            else:
-                call = call + (average > .5) - (average <= .5)
+                probs = CallProbability.cardProbabilities(hand, drawn, numPlayers, cardRange, self.numDecks)
+                call = CallProbability.chooseCall(probs, roundNum, illegal)
+            Easy.callCache.put(key, call)
 
         self.currCall = call
         self.calls.append(call)
@@ -117,27 +75,7 @@ class Easy(Player):
         return call
 
     def makeOneCardCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
-        if illegal == 0 or illegal == 1:
-            self.currCall = 1 - illegal
-            self.calls.append(1 - illegal)
-            return 1 - illegal
-        dealtCards = list([card for (name, card) in namedDeals.items() if name != self.name])
-        cardsSet = set(dealtCards)
-        topCard = dealtCards[dealtCards.index(max(dealtCards, key = self.cardRanker))]
-        topRank = self.cardRanker(topCard)
-        total = 0
-        greater = 0
-        for num in range(cardRange):
-            for suit in CardInfo.SUITS:
-                card = Card(num, suit)
-                if card in shown:
-                    continue
-                if card in cardsSet:
-                    continue
-                if self.cardRanker(card) > topRank:
-                    greater += 1
-                total += 1
-        call = 1 * (greater / total > .5)
+        call = Easy.oneCardSolver.call(self.name, namedDeals, shown, power, cardRange, illegal, self.numDecks)
 
         self.currCall = call
         self.calls.append(call)
@@ -159,98 +97,98 @@ Implements round-level decisions via the following logic:
     Make call: Same as Easy
     Choose card:
         Assumes randomness in play from other players
-        Caches probability of wins computed during call making to rank cards
         Updates probability of a win for each card whenever turn to select:
             Computes both probability of a win for the current hand and future hands
             Tracks cards shown through course of play during the round and current hand
             Considers whether cards already played this hand can win and players coming after
+            Accounts for cancellation: cards of its rank played later cancel the card, and higher
+            ranks only beat it if they don't cancel each other out (see utils/probability.py)
+            If modeled, the current hand is instead estimated from deals sampled from an opponent model
+            (see opponents.py), each player still to play playing a random card from their sampled hand
         Check expected value of wins for playing each card, take card which gets closest to call
+        Unless modeled, choices are memoized by canonical state (slots of the hand in order, as ties go to the
+        first card, unseen and standing cards, players after, wins and call, see utils/cache.py)
 '''
 class Hard(Player):
 
-    def choosePower(self, cand, shown):
-        if cand in shown:
-            return Gameplay.POWER_YES
-        return Gameplay.POWER_NO
+    modeled = False
+    playCache = DecisionCache("plays", Caching.PLAY_DECISIONS)
+
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        return Easy.choosePower(self, cand, shown, numPlayers, cardRange, powerTries)
 
     def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        if self.modeled:
+            self.model = OpponentModel(self.name, roundNum, power, cardRange, self.currHand, shown, currCalls, self.numDecks)
         return Easy.makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)    
 
     def makeOneCardCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
         return Easy.makeOneCardCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
 
+    def observing(self):
+        return self.modeled
+
     def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
-        allCards = []
-        for num in range(cardRange):
-            if num == power:
-                continue
-            for suit in CardInfo.SUITS:
-                card = Card(num, suit)
-                allCards.append((card, card in self.currHand, card in shown))
-        for suit in CardInfo.SUITS:
-            powerCard = Card(power, suit)
-            allCards.append((powerCard, powerCard in self.currHand, powerCard in shown))
+        # shown includes the cards played so far this hand, so unseen cards are those still to come
+        unseen = CancelProbability.unseenCounts(power, cardRange, self.currHand, shown, self.numDecks)
+        standing = CancelProbability.standingSlots(plays, power, cardRange)
+        after = len(calls) - len([play for play in plays if play != None]) - 1
+        slots = tuple([CancelProbability.slotOf(card, power, cardRange) for card in self.currHand])
+        currWin = wins[self.name]
 
-        count = 0
-        # number of cards remaining that each card is greater than
-        greatThan = {}
-        for cardData in allCards:
-            if cardData[1]:
-                greatThan[cardData[0]] = count
-            elif cardData[2]:
-                continue
-            else:
-                count += 1
+        if self.model is not None and after:
+            # sampled deals differ every time, so modeled choices aren't memoized
+            currProbs = self.sampleProbs(list(calls), plays)
+            choiceIndex = Hard.bestIndex(slots, unseen, standing, after, len(calls), currWin, self.currCall, currProbs)
+        else:
+            # suits don't change the choice, but the hand's order breaks ties, so slots are kept in hand order
+            key = (slots, unseen, standing, after, len(calls), currWin, self.currCall)
+            choiceIndex = Hard.playCache.get(key)
+            if choiceIndex is None:
+                choiceIndex = Hard.bestIndex(slots, unseen, standing, after, len(calls), currWin, self.currCall)
+                Hard.playCache.put(key, choiceIndex)
 
-        count = 0
-        # number of cards remaining that each card is less than
-        lessThan = {}
-        for cardData in allCards[::-1]:
-            if cardData[1]:
-                lessThan[cardData[0]] = count
-            elif cardData[2]:
-                continue
-            else:
-                count += 1
+        choice = self.currHand.pop(choiceIndex)
+        print("{} played the {}.".format(self.name, str(choice)))
+        print()
+        time.sleep(SLEEP_TIME)
+        return choice
+
+    def bestIndex(slots, unseen, standing, after, numPlayers, currWin, call, currProbs = None):
+        empty = (0,) * len(standing)
 
         # find probability of winning the current hand and for a future hand
-        currProbs = []
-        genProbs = []
-        after = len(calls) - len([play for play in plays if play != None])
-        for i in range(len(self.currHand)):
-            card = self.currHand.get(i)
-            feasible = True
-            cardRank = self.cardRanker(card)
-            for play in plays:
-                if self.cardRanker(play) >= cardRank:
-                    feasible = False
-                    break
-            great = greatThan[card]
-            less = lessThan[card]
-            if feasible:
-                if not after:
-                    currProbs.append(1)
-                else:
-                    currProbs.append(sc.hypergeom(great + less, less, after).pmf(0))
-            else:
-                currProbs.append(0)
-            genProbs.append(sc.hypergeom(great + less, less, len(calls) - 1).pmf(0))
+        genProbs = [CancelProbability.winProbability(slot, unseen, empty, numPlayers - 1) for slot in slots]
+        if currProbs is None:
+            currProbs = [CancelProbability.winProbability(slot, unseen, standing, after) for slot in slots]
 
         # compute sum of current wins additional expected wins given each possible play
-        currWin = wins[self.name]
         expected = []
-        for i in range(len(self.currHand)):
+        for i in range(len(slots)):
             curr = currProbs[i]
-            for j in range(len(self.currHand)):
+            for j in range(len(slots)):
                 if j == i:
                     continue
                 curr += genProbs[j]
             expected.append(currWin + curr)
 
         # take the choice whose play this turn minimizes expected distance between wins and call
-        choiceIndex = expected.index(min(expected, key = lambda e: abs(e - self.currCall)))
-        choice = self.currHand.pop(choiceIndex)
-        print("{} played the {}.".format(self.name, str(choice)))
-        print()
-        time.sleep(SLEEP_TIME)
-        return choice
+        return expected.index(min(expected, key = lambda e: abs(e - call)))
+
+    def sampleProbs(self, names, plays):
+        model = self.model
+        first, played, standing = model.handState(names, plays)
+        seat = names.index(self.name)
+        later = [names[other % len(names)] for other in range(first + played + 1, first + len(names))]
+        keys = [model.keys[model.index(card)] for card in self.currHand]
+        wins = np.zeros(len(keys))
+        for _ in range(Modeling.SAMPLES):
+            deal = model.sample()
+            laterKeys = [model.keys[np.random.choice(deal[name])] for name in later]
+            for (i, key) in enumerate(keys):
+                hand = dict(standing)
+                Simulation.play(hand, seat, key)
+                for (j, laterKey) in enumerate(laterKeys):
+                    Simulation.play(hand, seat + 1 + j, laterKey)
+                wins[i] += bool(hand) and hand[max(hand)] == seat
+        return list(wins / Modeling.SAMPLES)
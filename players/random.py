@@ -14,7 +14,7 @@ An agent which makes all decisions completely randomly among legal options.
 Used for benchmarking.
 '''
 class Random(Player):
-    def choosePower(self, cand, shown):
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
         if random.random() > .5:
             return Gameplay.POWER_YES
         return Gameplay.POWER_NO
@@ -7,16 +7,23 @@ import os
 import numpy as np
 import random
 from collections import defaultdict
+from math import comb
 
+from players.abstraction import StateAbstraction
 from players.player import Player
+from players.power import PowerTable
+from utils.checkpoint import Checkpoint
 from utils.constants import Learning
-from utils.constants import Gameplay
 from utils.card import Card
 from utils.card import CardInfo
+from utils.card import CardUtils
+from utils.table import HashedTable
+from utils.table import TableUpdates
 
 '''
 An agent which learns Q-Values of (state, action) pairings through experience.
 Two sets of Q-Values for making calls and choosing cards
+Power cards aren't learned: the agent chooses them from the power card tables as Easy does (see power.py)
 Making calls:
     State definition:
         Number of players remaining to call after the agent
@@ -34,39 +41,104 @@ Choosing cards:
             See constants.py for option to just use index of lowest rank card that would be current top card
         Current calls and wins for the agent
     Actions: playing top card, second card, etc. by rank
+State abstraction:
+    If abstract (see abstraction.py), both states are bucketed and made canonical before lookup
+    Each round's updates are collected as (key, target) pairs and applied to the table in one pass, with
+    optional n-step or TD(lambda) returns for the actions taken (nStep, traceDecay)
+    Given a metrics sink (see utils/metrics.py), the errors of every update are reported to it
+    New tables are fixed-size hashed arrays (see utils/table.py) unless the table size is None
+Learning from a round:
+    By default, Q-Values are updated at the end of every round and saved at the end of every game
+    Given a recorder (a list, see training/selfplay.py), rounds are recorded instead, to be replayed
+    by a learner holding the tables; tables can also be passed in rather than loaded from file
+    Tables are saved to a versioned checkpoint (see utils/checkpoint.py), falling back to the old pickles to load
+    A frozen agent (learning off) neither learns nor saves; with hot reload on, it loads a newer checkpoint
+    saved by another process at the start of the next round
+    A round with a call or card chosen for the agent (a missed deadline, see Player.missDecision) is neither
+    learned nor recorded, as its caches don't hold the actions taken
 '''
 
 class QLearning(Player):
 
-    def __init__(self, name, numLives, history):
+    tableSize = Learning.TABLE_SIZE
+
+    def __init__(self, name, numLives, history, tables = None):
         Player.__init__(self, name, numLives, history)
         self.alpha = Learning.ALPHA
         self.gamma = Learning.GAMMA
         self.epsilon = Learning.EPSILON
-        if os.path.exists(Learning.Q_DIREC + name + "_" + Learning.CALLS_QVALS):
-            with open(Learning.Q_DIREC + name + "_" + Learning.CALLS_QVALS, "rb") as file:
-                self.qCalls = pickle.load(file)
-        else:
-            self.qCalls = defaultdict(float)
-            self.qCalls[Learning.DECAY] = 1.0
-        if os.path.exists(Learning.Q_DIREC + name + "_" + Learning.PLAY_QVALS):
-            with open(Learning.Q_DIREC + name + "_" + Learning.PLAY_QVALS, "rb") as file:
-                self.qPlays = pickle.load(file)
-        else:
-            self.qPlays = defaultdict(float)
-            self.qPlays[Learning.DECAY] = 1.0
+        self.abstract = Learning.ABSTRACT
+        self.nStep = Learning.N_STEP
+        self.traceDecay = Learning.TRACE_DECAY
+        self.metrics = None
+        self.recorder = None
+        self.learning = True
+        self.hotReload = False
+        self.step = 0
+        self.stamp = None
+        if tables is None:
+            tables = self.loadQVals()
+        self.qCalls, self.qPlays = tables
+
+    def loadQVals(self):
+        path = Checkpoint.path(self.name)
+        if os.path.exists(path):
+            # the stamp is taken first, so a checkpoint replaced during the load is picked up on the next refresh
+            self.stamp = Checkpoint.stamp(path)
+            header, arrays = Checkpoint.load(path)
+            self.step = header["step"]
+            return [Checkpoint.unpackTable(table, header["tables"][table], arrays) for table in ["calls", "plays"]]
+        # tables from before checkpoints, saved with pickle
+        tables = []
+        for fileName in [Learning.CALLS_QVALS, Learning.PLAY_QVALS]:
+            if os.path.exists(Learning.Q_DIREC + self.name + "_" + fileName):
+                with open(Learning.Q_DIREC + self.name + "_" + fileName, "rb") as file:
+                    tables.append(pickle.load(file))
+            else:
+                tables.append(self.newTable())
+        return tables
+
+    def newTable(self):
+        if self.tableSize is None:
+            table = defaultdict(float)
+            table[Learning.DECAY] = 1.0
+            return table
+        return HashedTable(self.tableSize)
+
+    def refresh(self):
+        # picks up a checkpoint saved by another process since the tables were loaded
+        if self.hotReload and Checkpoint.stamp(Checkpoint.path(self.name)) not in [None, self.stamp]:
+            self.qCalls, self.qPlays = self.loadQVals()
+
+    def setHand(self, hand):
+        Player.setHand(self, hand)
+        self.callCache = None
+        self.playCache = []
+        self.missedRound = False
+
+    def missDecision(self, decision, *args):
+        if decision == "choosePower":
+            return
+        self.missedRound = True
+        # the agent's own card choices later in the round still rank cards as of this round
+        if decision == "makeCall":
+            power, cardRange, cardRanker = args[3], args[6], args[7]
+            self.cardRanker = cardRanker
+            self.rankerSettings = (power, cardRange)
 
-    def choosePower(self, cand, shown):
-        if cand in shown:
-            return Gameplay.POWER_YES
-        return Gameplay.POWER_NO
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        return PowerTable.choose(cand, shown, numPlayers, len(self.currHand), cardRange, powerTries, self.numDecks)
 
     def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        self.refresh()
         self.cardRanker = cardRanker
+        self.rankerSettings = (power, cardRange)
         playersLeft = numPlayers - len(currCalls) - 1
         rankedCards = tuple(sorted([self.cardRanker(card) for card in self.currHand]))
         calls = sum(currCalls.values())
         state = (playersLeft, rankedCards, calls, len(self.currHand))
+        if self.abstract:
+            state = StateAbstraction.callState(state, numPlayers, cardRange)
         actions = [i for i in range(len(self.currHand) + 1) if i != illegal]
         if random.random() < self.epsilon / self.qCalls[Learning.DECAY]:
             action = random.choice(actions)
@@ -77,6 +149,7 @@ class QLearning(Player):
                 currVal = self.getCallValue(state, action)
                 if currVal > maxVal:
                     topActions = [action]
+                    maxVal = currVal
                 elif currVal == maxVal:
                     topActions.append(action)
             action = random.choice(topActions)
@@ -166,6 +239,8 @@ class QLearning(Player):
                     wouldWin = i
                     break
             state = (lessThan, len(playersLeft), sumDiffs, wouldWin, self.currCall, wins[self.name])
+        if self.abstract:
+            state = StateAbstraction.playState(state, len(self.currHand))
 
         actions = range(len(self.currHand))
         self.currHand = sorted(self.currHand, key = self.cardRanker)
@@ -178,6 +253,7 @@ class QLearning(Player):
                 currVal = self.getPlayValue(state, action)
                 if currVal > maxVal:
                     topActions = [action]
+                    maxVal = currVal
                 elif currVal == maxVal:
                     topActions.append(action)
             action = random.choice(topActions)
@@ -185,60 +261,107 @@ class QLearning(Player):
         return self.currHand.pop(action)
 
     def update(self, wins):
+        if self.missedRound or self.callCache is None:
+            return
+        if self.recorder is not None:
+            self.recorder.append((self.callCache, self.playCache, self.currCall, wins, self.rankerSettings))
+        elif self.learning:
+            self.learn(wins)
+
+    def replay(self, record):
+        # learn from a round recorded by another copy of the agent (the card ranker can't be pickled, so is rebuilt)
+        self.callCache, self.playCache, self.currCall, wins, (power, cardRange) = record
+        self.cardRanker = CardUtils.cardRankerGen(power, cardRange)
+        self.learn(wins)
+
+    def replayBatch(self, records):
+        # learn from many recorded rounds in one pass over each table (every round sees the tables as they were)
+        callKeys, callTargets, playKeys, playTargets = [], [], [], []
+        for record in records:
+            self.callCache, self.playCache, self.currCall, wins, (power, cardRange) = record
+            self.cardRanker = CardUtils.cardRankerGen(power, cardRange)
+            self.decay()
+            for (keys, more) in zip([callKeys, callTargets, playKeys, playTargets], self.assignCredit(wins)):
+                keys.extend(more)
+        self.recordErrors(
+            TableUpdates.apply(self.qCalls, callKeys, callTargets, self.alpha),
+            TableUpdates.apply(self.qPlays, playKeys, playTargets, self.alpha)
+        )
+
+    def decay(self):
         self.qCalls[Learning.DECAY] += Learning.DECAY_INCREMENT * 10
         self.qPlays[Learning.DECAY] += Learning.DECAY_INCREMENT
+
+    def learn(self, wins):
+        self.decay()
+        callKeys, callTargets, playKeys, playTargets = self.assignCredit(wins)
+        self.recordErrors(
+            TableUpdates.apply(self.qCalls, callKeys, callTargets, self.alpha),
+            TableUpdates.apply(self.qPlays, playKeys, playTargets, self.alpha)
+        )
+
+    def recordErrors(self, callErrors, playErrors):
+        if self.metrics is not None:
+            self.metrics.record(self.name, {
+                "tdError": float(np.mean(np.abs(np.concatenate([callErrors, playErrors])))),
+                "callEntries": len(self.qCalls),
+                "playEntries": len(self.qPlays),
+            })
+
+    def assignCredit(self, wins):
+        # collects a target for every (state, action) pair the round says something about, so that
+        # the whole round is applied at once (see TableUpdates in utils/table.py)
         # if no lives are lost in the round, then default reward for all actions
-        if sum(wins) == self.currCall:
-            self.qCalls[self.callCache] = ((1 - self.alpha) * self.qCalls[self.callCache] + self.alpha * Learning.REWARD)
-            for pair in self.playCache:
-                self.qPlays[pair] = ((1 - self.alpha) * self.qPlays[pair] + self.alpha * Learning.REWARD)
         # else use the following scheme for rewards
         # give the calls action reward equal to the negative of the number of lives lost
         # give the actual number of wins default reward
         # if too many hands won, then for all the hands that were won (unless the lowest card was chosen),
         # penalize the chosen action by the # lives lost and reward all actions that played lower cards
         # vice versa if too many hands lost
-        else:
-            livesLost = abs(sum(wins) - self.currCall)
-            self.qCalls[self.callCache] = ((1 - self.alpha) * self.qCalls[self.callCache] - self.alpha * livesLost)
-            self.qCalls[(self.callCache[0], sum(wins))] = ((1 - self.alpha) * 
-                self.qCalls[(self.callCache[0], sum(wins))] + self.alpha * Learning.REWARD)
-            handSize = self.callCache[0][3]
-            if sum(wins) > self.currCall:
-                for i in range(len(wins)):
-                    if not wins[i]:
-                        continue
-                    pair = self.playCache[i]
-                    # retrieve the number of options the agent had
-                    numOptions = handSize - i
-                    # if the agent chose the lowest card in hand and still won, then 
-                    # nothing could be done (could have been faulty call, which is penalized)
-                    if pair[1] == 0:
-                        continue
-                    self.qPlays[pair] = ((1 - self.alpha) * self.qPlays[pair] - self.alpha * livesLost)
-                    for j in range(numOptions):
-                        # reward all options which played lower cards than the chosen
-                        if j >= pair[1]:
-                            continue
-                        self.qPlays[(pair[0], j)] = ((1 - self.alpha) * self.qPlays[(pair[0], j)] + self.alpha * Learning.REWARD)
-            else:
-                for i in range(len(wins)):
-                    if wins[i]:
-                        continue
-                    pair = self.playCache[i]
-                    # retrieve the number of options the agent had from the first element
-                    # of state, which always contains the lessThan tuple
-                    numOptions = handSize - i
-                    # if the agent chose the highest card in hand and still won, then
-                    # nothing could be done (could have been faulty call, which is penalized)
-                    if pair[1] == numOptions - 1:
-                        continue
-                    self.qPlays[pair] = ((1 - self.alpha) * self.qPlays[pair] - self.alpha * livesLost)
-                    for j in range(numOptions):
-                        # reward all options which played higher cards than the chosen
-                        if j <= pair[1]:
-                            continue
-                        self.qPlays[(pair[0], j)] = ((1 - self.alpha) * self.qPlays[(pair[0], j)] + self.alpha * Learning.REWARD)
+        # with n-step or TD(lambda) returns, every chosen action instead gets its return (see returns)
+        won = sum(wins)
+        livesLost = abs(won - self.currCall)
+        reward = Learning.REWARD if not livesLost else -livesLost
+        handSize = self.callCache[0][3]
+        withReturns = self.nStep is not None or self.traceDecay is not None
+        callKeys = [self.callCache]
+        playKeys = []
+        playTargets = []
+        if livesLost:
+            callKeys.append((self.callCache[0], won))
+            for i in range(len(wins)):
+                pair = self.playCache[i]
+                # retrieve the number of options the agent had
+                numOptions = handSize - i
+                # if the agent chose the lowest (highest) card in hand and still won (lost), then
+                # nothing could be done (could have been faulty call, which is penalized)
+                if won > self.currCall and wins[i] and pair[1] != 0:
+                    alternatives = range(pair[1])
+                elif won < self.currCall and not wins[i] and pair[1] != numOptions - 1:
+                    alternatives = range(pair[1] + 1, numOptions)
+                else:
+                    continue
+                if not withReturns:
+                    playKeys.append(pair)
+                    playTargets.append(-livesLost)
+                playKeys.extend([(pair[0], j) for j in alternatives])
+                playTargets.extend([Learning.REWARD] * len(alternatives))
+        elif not withReturns:
+            playKeys.extend(self.playCache)
+            playTargets.extend([Learning.REWARD] * len(self.playCache))
+        callTargets = [reward, Learning.REWARD][:len(callKeys)]
+
+        if withReturns:
+            # values of the states reached after each action (the play states), bootstrapped from greedily
+            values = np.array([
+                TableUpdates.lookup(self.qPlays, [(pair[0], j) for j in range(handSize - i)]).max()
+                for (i, pair) in enumerate(self.playCache)
+            ])
+            returns = TableUpdates.returns(reward, values, self.gamma, self.nStep, self.traceDecay)
+            callTargets[0] = returns[0]
+            playKeys.extend(self.playCache)
+            playTargets.extend(returns[1:])
+        return callKeys, callTargets, playKeys, playTargets
 
     def getCallValue(self, state, action):
         return self.qCalls[(state, action)]
@@ -247,14 +370,17 @@ class QLearning(Player):
         return self.qPlays[(state, action)]
 
     def saveQVals(self):
-        if os.path.exists(Learning.Q_DIREC + self.name + "_" + Learning.CALLS_QVALS):
-            os.remove(Learning.Q_DIREC + self.name + "_" + Learning.CALLS_QVALS)
-        with open(Learning.Q_DIREC + self.name + "_" + Learning.CALLS_QVALS, "wb") as file:
-            pickle.dump(self.qCalls, file)
-        if os.path.exists(Learning.Q_DIREC + self.name + "_" + Learning.PLAY_QVALS):
-            os.remove(Learning.Q_DIREC + self.name + "_" + Learning.PLAY_QVALS)
-        with open(Learning.Q_DIREC + self.name + "_" + Learning.PLAY_QVALS, "wb") as file:
-            pickle.dump(self.qPlays, file)
+        # recording agents leave saving to the learner, frozen agents have nothing new to save
+        if self.recorder is not None or not self.learning:
+            return
+        self.step += 1
+        header, arrays = {"name": self.name, "step": self.step, "tables": {}}, {}
+        for (table, values) in [("calls", self.qCalls), ("plays", self.qPlays)]:
+            header["tables"][table], more = Checkpoint.packTable(table, values)
+            arrays.update(more)
+        path = Checkpoint.path(self.name)
+        Checkpoint.save(path, header, arrays)
+        self.stamp = Checkpoint.stamp(path)
 
 '''
 An agent which approximates Q-Values of (state, action) pairings through experience.
@@ -295,166 +421,188 @@ Card Choosing (n-card hand):
 
     Transitions to a card choosing pseudo-state (unless it was the last card in hand, which leads to the terminal
     state) whose value is determined by averaging over different possibilities for number of players to play after.
+
+Pseudo-state values are exact expectations rather than averages over sampled plays: Q is linear in the features,
+so it is the weights against the expected features, where a card beats k unknown plays with hypergeometric chance.
+Steps are normalized by the squared size of the features (normalized least mean squares), since the features
+are unscaled and a plain step of alpha diverges. Ranks of the remaining cards are computed once per decision and
+cached for the update. Given a metrics sink, each round reports its mean absolute TD error and the norms of the
+weights updated.
+Decisions are batched: makeCallBatch and chooseCardBatch decide for many agents at once (i.e. one per game, see
+players/batch.py), building the features of every action of every decision as one array per hand size and card
+range and valuing them in one product with the stacked weights. A single decision is a batch of one.
 '''
 class QApproximate(QLearning):
 
-    def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
-        self.cardRanker = cardRanker
-        handSize = len(self.currHand)
-        state = (shown, self.currHand.copy(), numPlayers, sum(currCalls.values()), len(currCalls))
-        actions = [i for i in range(len(self.currHand) + 1) if i != illegal]
-        if random.random() < self.epsilon / self.qCalls[Learning.DECAY]:
-            action = random.choice(actions)
-            # even if a random action is made, need to cache for update step
-            _, cache = self.getCallValue(state, action, handSize, cardRange)
-        else:
-            topActions = []
-            maxVal = float("-inf")
-            for action in actions:
-                currVal, cache = self.getCallValue(state, action, handSize, cardRange)
-                if currVal > maxVal:
-                    topActions = [(action, cache)]
-                elif currVal == maxVal:
-                    topActions.append((action, cache))
-            action, cache = random.choice(topActions)
-
-        self.callCache = cache
-        self.playCache = []
+    # weights are arrays kept per hand size, which a hashed table can't hold
+    tableSize = None
 
-        self.currCall = action
-        self.calls.append(action)
+    def replayBatch(self, records):
+        # weights are updated round by round
+        for record in records:
+            self.replay(record)
 
-        return action
-
-    def getCallValue(self, state, action, handSize, cardRange):
+    def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        return QApproximate.makeCallBatch([(self, (currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker))])[0]
+
+    def makeCallBatch(requests):
+        # requests are (player, makeCall arguments) pairs, decided together per hand size and card range
+        calls = [None] * len(requests)
+        for group in QApproximate.groups(requests, 6):
+            players = [requests[i][0] for i in group]
+            args = [requests[i][1] for i in group]
+            for (player, (_, _, _, power, _, _, cardRange, cardRanker, *_)) in zip(players, args):
+                player.refresh()
+                player.cardRanker = cardRanker
+                player.rankerSettings = (power, cardRange)
+            handSize = len(players[0].currHand)
+            cardRange = args[0][6]
+            infos, _, normHand = QApproximate.getStateInfo(players, [arg[4] for arg in args], [arg[3] for arg in args], cardRange)
+
+            # f_i(s,a) for every action and hand card, then g(s,a) for every action
+            centActions = np.arange(handSize + 1) - handSize / 2
+            numPlayers = np.array([arg[1] for arg in args])
+            sums = np.array([sum(arg[0].values()) for arg in args])
+            played = np.array([len(arg[0]) for arg in args])
+            features = np.empty((len(group), handSize + 1, handSize + 1))
+            features[:, :, :handSize] = centActions[None, :, None] * normHand[:, None, :]
+            features[:, :, handSize] = centActions[None, :] * (handSize / numPlayers * played - sums)[:, None]
+            weights = np.array([player.getCallWeights(handSize) for player in players])
+            values = np.einsum("bad,bd->ba", features, weights)
+
+            rows = values.tolist()
+            for (row, (i, player, arg)) in enumerate(zip(group, players, args)):
+                currCalls, numPlayers, _, _, shown, illegal, _, _, *_ = arg
+                state = (shown, player.currHand.copy(), numPlayers, sum(currCalls.values()), len(currCalls))
+                actions = [action for action in range(handSize + 1) if action != illegal]
+                action = player.chooseAction(actions, rows[row])
+                player.callCache = (handSize, features[row, action], values[row, action], state, action, cardRange, infos[row])
+                player.playCache = []
+                player.currCall = action
+                player.calls.append(action)
+                calls[i] = action
+        return calls
+
+    def chooseAction(self, actions, values):
+        # epsilon greedy, ties between the best actions broken at random (values is a list, for speed)
+        if random.random() < self.epsilon / self.qCalls[Learning.DECAY]:
+            return random.choice(actions)
+        best = max([values[action] for action in actions])
+        return random.choice([action for action in actions if values[action] == best])
+
+    def groups(requests, rangeIndex):
+        # indices of the requests whose features stack: same hand size and card range (args[rangeIndex])
+        groups = defaultdict(list)
+        for (i, (player, args)) in enumerate(requests):
+            groups[(len(player.currHand), args[rangeIndex])].append(i)
+        return list(groups.values())
+
+    def getCallWeights(self, handSize):
         weights = self.qCalls[handSize]
         # float only by default settings, change to array
         if type(weights) == float:
             weights = np.array([np.random.rand() for _ in range(handSize + 1)])
             self.qCalls[handSize] = weights
-
-        features = []
-
-        # f_i(s,a) computation
-        centAction = action - handSize / 2
-
-        allCards = []
-        shown = state[0]
-        currHand = state[1]
-        for num in range(cardRange):
-            for suit in CardInfo.SUITS:
-                card = Card(num, suit)
-                if card in currHand or card in shown:
-                    continue
-                allCards.append(card)
-
-        rankedCards = list(map(self.cardRanker, allCards))
-        avgRank = np.mean(rankedCards)
-        sdRank = np.sqrt(np.var(rankedCards))
-        normHand = [(self.cardRanker(card) - avgRank) / sdRank for card in currHand]
-
-        features.extend([centAction * rank for rank in normHand])
-
-        # g(s,a) computation
-        numPlayers = state[2]
-        calls = state[3]
-        played = state[4]
-        features.append(centAction * (handSize / numPlayers * played - calls))
-        features = np.array(features)
-        qVal = np.dot(weights, features)
-
-        cache = (handSize, features, qVal, state, action, cardRange, allCards)
-
-        return qVal, cache
+        return weights
+
+    def getStateInfo(players, shown, powers, cardRange):
+        # ranks of the remaining cards (neither in hand nor shown) and of the hand, and the hand's ranks
+        # normalized against the remaining cards, for decisions on hands of one size: one row per decision,
+        # with each card's rank looked up from its game's rank table
+        ranks = np.array([CardUtils.rankTable(power, cardRange) for power in powers])
+        hands = np.array([[card.index for card in player.currHand] for player in players], dtype = int)
+        hands = hands.reshape(len(players), -1)
+        known = np.zeros(ranks.shape, dtype = bool)
+        shownCards = [(row, card.index) for (row, cards) in enumerate(shown) for card in cards]
+        if shownCards:
+            known[tuple(np.array(shownCards).T)] = True
+        rows = np.arange(len(players))[:, None]
+        known[rows, hands] = True
+
+        unknown = ~known
+        counts = unknown.sum(axis = 1)
+        means = (ranks * unknown).sum(axis = 1) / np.maximum(counts, 1)
+        stds = np.sqrt(((ranks - means[:, None]) ** 2 * unknown).sum(axis = 1) / np.maximum(counts, 1))
+        # every remaining card can share one rank late in a round, leaving nothing to normalize by
+        stds[stds == 0] = 1.0
+        handRanks = ranks[rows, hands]
+        normHand = (handRanks - means[:, None]) / stds[:, None]
+        remaining = np.sort(np.where(known, np.inf, ranks), axis = 1)
+        infos = [(remaining[row, :count], handRanks[row], normHand[row]) for (row, count) in enumerate(counts.tolist())]
+        return infos, handRanks, normHand
 
     def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
-        handSize = len(self.currHand)
-
-        playersLeft = []
-        for player in calls:
-            if namedPlays[player] is None:
-                playersLeft.append(player)
-
-        sumDiffs = sum([calls[player] for player in playersLeft]) - sum([wins[player] for player in playersLeft])
-        state = (shown, self.currHand.copy(), sumDiffs, self.currCall, wins[self.name], len(playersLeft), plays, len(calls))
-        actions = range(len(self.currHand))
-        if random.random() < self.epsilon / self.qCalls[Learning.DECAY]:
-            action = random.choice(actions)
-            # even if a random action is made, need to cache for update step
-            _, cache = self.getPlayValue(state, action, handSize, cardRange)
-        else:
-            topActions = []
-            maxVal = float("-inf")
-            for action in actions:
-                currVal, cache = self.getPlayValue(state, action, handSize, cardRange)
-                if currVal > maxVal:
-                    topActions = [(action, cache)]
-                elif currVal == maxVal:
-                    topActions.append((action, cache))
-                else:
-                    raise SystemExit
-            action, cache = random.choice(topActions)
-            self.playCache.append(cache)
-        return self.currHand.pop(action)
-
-    def getPlayValue(self, state, action, handSize, cardRange):
+        return QApproximate.chooseCardBatch([(self, (calls, wins, lastHand, power, plays, namedPlays, shown, cardRange))])[0]
+
+    def chooseCardBatch(requests):
+        # requests are (player, chooseCard arguments) pairs, decided together per hand size and card range
+        cards = [None] * len(requests)
+        for group in QApproximate.groups(requests, 7):
+            players = [requests[i][0] for i in group]
+            args = [requests[i][1] for i in group]
+            handSize = len(players[0].currHand)
+            cardRange = args[0][7]
+            infos, handRanks, normHand = QApproximate.getStateInfo(players, [arg[6] for arg in args], [arg[3] for arg in args], cardRange)
+
+            states = []
+            for (player, (calls, wins, _, _, plays, namedPlays, shown, _)) in zip(players, args):
+                playersLeft = [name for name in calls if namedPlays[name] is None]
+                sumDiffs = sum([calls[name] for name in playersLeft]) - sum([wins[name] for name in playersLeft])
+                states.append((shown, player.currHand.copy(), sumDiffs, player.currCall, wins[player.name], len(playersLeft), plays, len(calls)))
+            topRanks = np.array([player.cardRanker(max(state[6], key = player.cardRanker)) for (player, state) in zip(players, states)])
+            sumDiffs, currCalls, currWins, numLeft, numPlayers = np.array([state[2:6] + state[7:] for state in states], dtype = float).T
+
+            # r_i(s,a) and w_j(s,a) are the same for every action, then f(s,a), g(s,a) and h(s,a) per action
+            centActions = np.arange(handSize) - (handSize - 1) / 2
+            features = np.empty((len(group), handSize, 2 * handSize + 3))
+            features[:, :, :handSize] = normHand[:, None, :]
+            features[:, :, handSize:2 * handSize] = (handRanks > topRanks[:, None])[:, None, :]
+            features[:, :, 2 * handSize] = centActions[None, :] * (currCalls - currWins)[:, None]
+            features[:, :, 2 * handSize + 1] = centActions[None, :] * sumDiffs[:, None]
+            numPlays = numPlayers - numLeft - 1
+            features[:, :, 2 * handSize + 2] = np.abs(centActions)[None, :] * (numPlays - (numPlayers - 1) / 2)[:, None]
+            weights = np.array([player.getPlayWeights(handSize) for player in players])
+            values = np.einsum("bad,bd->ba", features, weights)
+
+            rows = values.tolist()
+            for (row, (i, player, state)) in enumerate(zip(group, players, states)):
+                action = player.chooseAction(list(range(handSize)), rows[row])
+                player.playCache.append((handSize, features[row, action], values[row, action], state, action, cardRange, infos[row]))
+                cards[i] = player.currHand.pop(action)
+        return cards
+
+    def getPlayWeights(self, handSize):
         weights = self.qPlays[handSize]
         # float only by default settings, change to array
         if type(weights) == float:
             weights = np.array([np.random.rand() for _ in range(2 * handSize + 3)])
             self.qPlays[handSize] = weights
-
-        features = []
-
-        # r_i(s,a) computation
-        allCards = []
-        shown = state[0]
-        currHand = state[1]
-        for num in range(cardRange):
-            for suit in CardInfo.SUITS:
-                card = Card(num, suit)
-                if card in currHand or card in shown:
-                    continue
-                allCards.append(Card(num, suit))
-
-        rankedCards = list(map(self.cardRanker, allCards))
-        avgRank = np.mean(rankedCards)
-        sdRank = np.sqrt(np.var(rankedCards))
-        normHand = [(self.cardRanker(card) - avgRank) / sdRank for card in currHand]
-
-        features.extend(normHand)
-
-        # w_j(s,a) computation
-        plays = state[6]
-        topRank = self.cardRanker(max(plays, key = self.cardRanker))
-        features.extend([int(self.cardRanker(card) > topRank) for card in currHand])
-
-        # f(s,a) computation
-        calls = state[3]
-        wins = state[4]
-        avgIndex = (handSize - 1) / 2
-        centAction = action - avgIndex
-        features.append(centAction * (calls - wins))
-
-        # g(s,a) computation
-        sumDiffs = state[2]
-        features.append(centAction * sumDiffs)
-
-        # h(s,a) computation
-        numPlayers = state[7]
-        numPlays = numPlayers - state[5] - 1
-        features.append(abs(centAction) * (numPlays - (numPlayers - 1) / 2))
-
-        features = np.array(features)
-        qVal = np.dot(weights, features)
-
-        cache = (handSize, features, qVal, state, action, cardRange, allCards)
-
-        return qVal, cache
-
-    def update(self, wins):
-        self.qCalls[Learning.DECAY] += Learning.DECAY_INCREMENT * 10
-        self.qPlays[Learning.DECAY] += Learning.DECAY_INCREMENT
+        return weights
+
+    def getExpectedPlayValue(self, handSize, info, numPlayers, actions, call, wins, sumDiffs):
+        # expected Q-Value over a pseudo-state in which the other players' plays are unknown: Q is linear in the
+        # features, so this is the weights against the expected features, taken over the actions and a uniform
+        # number of players to play after (the plays so far being a random draw of the remaining cards)
+        remaining, handRanks, normHand = info
+        weights = self.getPlayWeights(handSize)
+        centActions = np.array(actions) - (handSize - 1) / 2
+
+        # chance each card beats the top of k drawn cards (k = 0 to numPlayers - 1): all k are ranked below it
+        below = np.searchsorted(remaining, handRanks)
+        beats = np.mean([
+            [comb(int(less), k) / comb(len(remaining), k) for less in below] for k in range(numPlayers)
+        ], axis = 0)
+
+        features = np.concatenate([normHand, beats, [
+            centActions.mean() * (call - wins),
+            centActions.mean() * sumDiffs,
+            # the number of players who have played is uniform, so centers to zero
+            0.0,
+        ]])
+        return np.dot(weights, features)
+
+    def learn(self, wins):
+        self.decay()
         # if no lives are lost in the round, then default reward for all actions
         finalDiff = self.currCall - sum(wins)
         # if call matched wins, give every action the default reward
@@ -462,71 +610,44 @@ class QApproximate(QLearning):
             reward = Learning.REWARD
         else:
             reward = -abs(finalDiff)
+        errors = []
 
         # update call weights
-        handSize = self.callCache[0]
-        features = self.callCache[1]
-        qVal = self.callCache[2]
-        state = self.callCache[3]
-        action = self.callCache[4]
-        cardRange = self.callCache[5]
-        remainCards = self.callCache[6]
-
-        callWeights = self.qCalls[handSize]
-        # find expected value from the next state (averaging over possible
-        # number of calls and players to play after on the first hand)
-        nextStateQ = []
-        if not state[3]:
-            nextStateQ.append(0)
-        else:
-            for calls in range(state[3]):
-                for playAfter in range(state[2]):
-                    possiblePlays = list(np.random.choice(remainCards, state[2] - playAfter - 1)) + [None] * (playAfter + 1)
-                    possibleState = (state[0], state[1], calls, self.currCall, 0, playAfter, possiblePlays, state[2])
-                    for possibleAction in range(handSize):
-                        nextStateQ.append(self.getPlayValue(possibleState, possibleAction, handSize, cardRange)[0])
-        avgNextQ = np.nan_to_num(np.mean(nextStateQ))
-        diff = reward + self.gamma * avgNextQ - qVal
-
-        print(diff)
-        print(reward + self.gamma * avgNextQ)
-        print(qVal)
-        print(avgNextQ)
-        for i in range(handSize + 1):
-            callWeights[i] += self.alpha * diff * features[i]
-            print(i, features[i])
+        handSize, features, qVal, state, action, cardRange, info = self.callCache
+        callWeights = self.getCallWeights(handSize)
+        # find expected value from the next state (averaging over possible sums of
+        # call-win differences, actions and players to play after on the first hand)
+        sumDiffs = (state[3] - 1) / 2 if state[3] else 0
+        nextQ = self.getExpectedPlayValue(handSize, info, state[2], range(handSize), self.currCall, 0, sumDiffs)
+        diff = reward + self.gamma * nextQ - qVal
+        callWeights += self.alpha * diff * features / (1 + np.dot(features, features))
+        errors.append(diff)
 
         # update play weights
-        for cacheIndex in range(len(self.playCache)):
+        for (cacheIndex, cache) in enumerate(self.playCache):
             # in the case where lives were lost in this round:
             # if won too many hands but lost this hand or
             # if won too few hands but won this hand, then no penalty
             if finalDiff > 0 and wins[cacheIndex] or finalDiff < 0 and not wins[cacheIndex]:
                 continue
-            cache = self.playCache[cacheIndex]
-            handSize = cache[0]
-            features = cache[1]
-            qVal = cache[2]
-            state = cache[3]
-            action = cache[4]
-            cardRange = cache[5]
-            remainCards = cache[6]
-
-            playWeights = self.qPlays[handSize]
+            handSize, features, qVal, state, action, cardRange, info = cache
+
+            playWeights = self.getPlayWeights(handSize)
             # find expected value from the next state (averaging over different
             # possibilities for number of players to play after)
             if handSize == 1:
-                nextStateQ = [0]
+                nextQ = 0
             else:
-                nextStateQ = []
-                for playAfter in range(state[7]):
-                    possiblePlays = list(np.random.choice(remainCards, state[7] - playAfter - 1)) + [None] * (playAfter + 1)
-                    possibleState = (state[0], state[1], state[2] + .5, state[3], 
-                        state[4] + 1 / state[7], playAfter, possiblePlays, state[7]
-                    )
-                    for possibleAction in range(handSize - 1):
-                        nextStateQ.append(self.getPlayValue(possibleState, possibleAction, handSize, cardRange)[0])
-                avgNextQ = np.mean(nextStateQ)
-                diff = reward + self.gamma * avgNextQ - qVal
-                for i in range(2 * handSize + 3):
-                    playWeights[i] += self.alpha * diff * features[i]
+                nextQ = self.getExpectedPlayValue(handSize, info, state[7], range(handSize - 1), state[3],
+                    state[4] + 1 / state[7], state[2] + .5
+                )
+            diff = reward + self.gamma * nextQ - qVal
+            playWeights += self.alpha * diff * features / (1 + np.dot(features, features))
+            errors.append(diff)
+
+        if self.metrics is not None:
+            self.metrics.record(self.name, {
+                "tdError": float(np.mean(np.abs(errors))),
+                "callWeightNorm": float(np.linalg.norm(callWeights)),
+                "playWeightNorm": float(np.linalg.norm(self.getPlayWeights(self.callCache[0]))),
+            })
@@ -0,0 +1,95 @@
+'''
+File for Remote player class.
+'''
+
+import asyncio
+
+from players.player import Player
+from utils.card import CardInfo
+from utils.constants import Gameplay
+from utils.protocol import Protocol
+
+'''
+Class for human players connected to a table server (see server/server.py).
+Implements round-level decisions by sending a request over the player's connection and
+awaiting the reply on the server's event loop. Replies are validated the same way Manual
+validates terminal input, re-requesting on bad input.
+The awaitable decisions are the real implementations: under a DeadlineDecider they are awaited
+with a deadline, and the blocking versions (used without one) wait on them from the game thread.
+'''
+class Remote(Player):
+
+    def __init__(self, name, numLives, history):
+        Player.__init__(self, name, numLives, history)
+        self.connection = None
+        self.loop = None
+
+    def bind(self, connection, loop):
+        self.connection = connection
+        self.loop = loop
+
+    async def ask(self, decision, state):
+        if self.connection is None:
+            raise ConnectionError("{} is not connected to the table!".format(self.name))
+        return await self.connection.request(self.name, decision, state)
+
+    def wait(self, pending):
+        return asyncio.run_coroutine_threadsafe(pending, self.loop).result()
+
+    async def choosePowerAsync(self, cand, shown, numPlayers, cardRange, powerTries):
+        state = {
+            "cand": CardInfo.rankName(cand), "shown": Protocol.encodeCards(shown), "numPlayers": numPlayers,
+            "tries": powerTries - len(shown),
+        }
+        while True:
+            decision = (await self.ask(Protocol.POWER, state)).get("decision")
+            if decision == Gameplay.POWER_YES or decision == Gameplay.POWER_NO:
+                return decision
+            await self.connection.error("You must enter either {} or {} for your decision!".format(Gameplay.POWER_YES, Gameplay.POWER_NO))
+
+    async def makeCallAsync(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        state = {
+            "calls": currCalls, "numPlayers": numPlayers, "round": roundNum, "power": CardInfo.rankName(power),
+            "shown": Protocol.encodeCards(shown), "illegal": illegal,
+        }
+        # in one card rounds, the player sees every card except their own
+        if namedDeals:
+            state["deals"] = {name: Protocol.encodeCard(card) for (name, card) in namedDeals.items() if name != self.name}
+        else:
+            state["hand"] = Protocol.encodeCards(self.currHand)
+
+        while True:
+            call = (await self.ask(Protocol.CALL, state)).get("call")
+            if not isinstance(call, int) or call < 0 or call > len(self.currHand):
+                await self.connection.error("Calls must be integers between 0 and {}!".format(len(self.currHand)))
+            elif call == illegal:
+                await self.connection.error("You have made an illegal call! You cannot call {}.".format(illegal))
+            else:
+                break
+
+        self.currCall = call
+        self.calls.append(call)
+        return call
+
+    async def chooseCardAsync(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
+        if lastHand:
+            return self.currHand.pop()
+        state = {
+            "calls": dict(calls), "wins": dict(wins), "plays": dict(namedPlays), "power": CardInfo.rankName(power),
+            "shown": Protocol.encodeCards(shown), "hand": Protocol.encodeCards(self.currHand),
+        }
+        while True:
+            index = (await self.ask(Protocol.CARD, state)).get("index")
+            if isinstance(index, int) and 0 <= index < len(self.currHand):
+                break
+            await self.connection.error("You must choose an index between 0 and {}!".format(len(self.currHand) - 1))
+        return self.currHand.pop(index)
+
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        return self.wait(self.choosePowerAsync(cand, shown, numPlayers, cardRange, powerTries))
+
+    def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        return self.wait(self.makeCallAsync(currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals))
+
+    def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
+        return self.wait(self.chooseCardAsync(calls, wins, lastHand, power, plays, namedPlays, shown, cardRange))
@@ -2,7 +2,207 @@
 File for Search player class.
 '''
 
+import atexit
+import multiprocessing
+import time
+
+import numpy as np
+
+from logic.simulate import Simulation
+from players.opponents import OpponentModel
 from players.player import Player
+from players.prob import Easy
+from utils.constants import SLEEP_TIME
+from utils.constants import Modeling
+from utils.constants import Searching
+from utils.transposition import TranspositionTable
+from utils.transposition import Zobrist
 
+'''
+Class for Search AI player (determinized rollouts).
+Implements round-level decisions via the following logic:
+    Choosing power card: Same as Easy
+    Make call: Same as Easy, and starts an opponent model for the round (see opponents.py)
+    Choose card:
+        Samples the opponents' hidden hands from the opponent model, so the deals drawn follow what the
+        calls and plays so far reveal rather than a uniform deal of the unseen cards
+        For each sampled deal and each card in hand, plays the card and rolls out the rest of the round
+        (see logic/simulate.py), every player taking hands cheaply while short of their call and
+        shedding their highest losing card otherwise
+        Every card is scored on the same deals, and the card with the least mean distance between
+        the final wins and the call is played
+        Rollouts are deterministic, so their results are kept in a transposition table keyed by the Zobrist hash
+        of the state rolled out (see utils/transposition.py) and a state met again, in this search or a later
+        one, isn't rolled out twice; decisions are the same with or without it
+        Settings (i.e. SEARCH_1:workers=4,deadline=0.2): rollouts (deals sampled), root-parallel workers, seconds a
+        decision (in place of a set number of deals) and table entries (0 for no table)
+        With several workers, the search runs root-parallel on a pool (see SearchPool)
+'''
 class Search(Player):
-	pass
\ No newline at end of file
+
+    rollouts = Modeling.ROLLOUTS
+    workers = Searching.WORKERS
+    deadline = Searching.DEADLINE
+    tableSize = Searching.TABLE_SIZE
+    tables = {}
+
+    def choosePower(self, cand, shown, numPlayers, cardRange, powerTries):
+        return Easy.choosePower(self, cand, shown, numPlayers, cardRange, powerTries)
+
+    def makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        self.model = OpponentModel(self.name, roundNum, power, cardRange, self.currHand, shown, currCalls, self.numDecks)
+        return Easy.makeCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
+
+    def makeOneCardCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals = {}):
+        return Easy.makeOneCardCall(self, currCalls, numPlayers, roundNum, power, shown, illegal, cardRange, cardRanker, namedDeals)
+
+    def observing(self):
+        return True
+
+    def chooseCard(self, calls, wins, lastHand, power, plays, namedPlays, shown, cardRange):
+        if len(self.currHand) > 1:
+            choiceIndex = self.search(calls, wins, power, plays, shown, cardRange)
+        else:
+            choiceIndex = 0
+        choice = self.currHand.pop(choiceIndex)
+        print("{} played the {}.".format(self.name, str(choice)))
+        print()
+        time.sleep(SLEEP_TIME)
+        return choice
+
+    def search(self, calls, wins, power, plays, shown, cardRange):
+        names = list(calls)
+        seat = names.index(self.name)
+        if self.model is None:
+            # the call went unmade (i.e. a missed deadline), so the model starts from what is known now
+            self.model = OpponentModel(self.name, len(self.hands[-1]), power, cardRange, self.currHand, shown, calls,
+                self.numDecks
+            )
+            first, played, _ = self.model.handState(names, plays)
+            for other in range(first, first + played):
+                self.model.sizes[names[other % len(names)]] -= 1
+
+        model = self.model
+        first, played, standing = model.handState(names, plays)
+        # wins carried over from fully cancelled hands are the hands played but not yet won
+        carry = len(self.hands[-1]) - len(self.currHand) - sum(wins.values())
+        keys = [int(model.keys[model.index(card)]) for card in self.currHand]
+        root = (model, names, seat, keys, first, played, standing, [calls[name] for name in names],
+            [wins[name] for name in names], carry, cardRange, self.numDecks)
+        until = time.time() + self.deadline if self.deadline is not None else None
+        # pool workers are daemonic and can't start workers of their own, so searches in trial workers run here
+        if self.workers > 1 and not multiprocessing.current_process().daemon:
+            losses, counts = SearchPool.get(self.workers, self.tableSize).search(root, self.rollouts, until)
+        else:
+            table = Search.table(self.tableSize)
+            losses, counts, _ = Search.evaluate(root, self.rollouts, until, table)
+        return int(np.argmin(losses / counts))
+
+    def table(size):
+        # one table per process and size, None for none
+        if not size:
+            return None
+        if size not in Search.tables:
+            Search.tables[size] = TranspositionTable(size, shared = False)
+        return Search.tables[size]
+
+    def evaluate(root, rollouts, until, table):
+        # losses and rollouts per card in hand, and deals sampled: the set number of deals, or as many as fit
+        # before the deadline (at least one)
+        model, names, seat, keys, first, played, standing, callList, winList, carry, cardRange, numDecks = root
+        losses = np.zeros(len(keys))
+        counts = np.zeros(len(keys), dtype = np.int64)
+        if table is not None:
+            zobrist = Zobrist.get(len(names), cardRange, numDecks)
+            # every rollout starts after this player's card, with the same calls, wins and seat to play
+            rootHash = zobrist.round(seat, first, played + 1, carry, callList, winList) ^ zobrist.hand(seat, keys)
+            leaving = [zobrist.card(seat, key, keys.count(key) - 1) for key in keys]
+        samples = 0
+        while (samples < rollouts) if until is None else (not samples or time.time() < until):
+            deal = model.sample()
+            hands = [model.keys[deal[name]].tolist() if name != names[seat] else None for name in names]
+            if table is not None:
+                dealHash = rootHash
+                for (other, hand) in enumerate(hands):
+                    if hand is not None:
+                        dealHash ^= zobrist.hand(other, hand)
+            for (i, key) in enumerate(keys):
+                rolloutStanding = dict(standing)
+                Simulation.play(rolloutStanding, seat, key)
+                result = None
+                if table is not None:
+                    stateHash = dealHash ^ leaving[i] ^ zobrist.stand(rolloutStanding)
+                    result = table.get(stateHash)
+                if result is None:
+                    rolloutHands = [list(hand) if hand is not None else keys[:i] + keys[i + 1:] for hand in hands]
+                    result = Simulation.rollout(
+                        rolloutHands, first, played + 1, rolloutStanding, callList, list(winList), carry
+                    )[seat]
+                    if table is not None:
+                        table.put(stateHash, result)
+                losses[i] += abs(result - callList[seat])
+                counts[i] += 1
+            samples += 1
+        return losses, counts, samples
+
+'''
+Class for a pool of root-parallel search workers, one pool per process and settings (see get):
+    Settings: workers, transposition table entries
+    The table lives in shared memory, created by the pool and attached to by every worker, so a state rolled
+    out by one worker is a hit for all of them
+Functionalities:
+    Every worker searches the same root (the sampled deals differ by the seed each is sent) for its share of
+    the deals, or until the deadline, and returns its losses and rollouts per card, which are summed, and its
+    table hits and misses, which the pool totals
+    Seeds come from the global generator, so seeded games with a set number of deals replay identically
+    Closed (workers stopped, table unlinked) at exit
+'''
+class SearchPool:
+
+    pools = {}
+    worker = None
+
+    def __init__(self, workers, tableSize):
+        self.workers = workers
+        self.table = TranspositionTable(tableSize) if tableSize else None
+        name = self.table.name if self.table is not None else None
+        self.pool = multiprocessing.Pool(workers, initializer = SearchPool.attach, initargs = (name, tableSize))
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self.close)
+
+    def get(workers, tableSize):
+        if (workers, tableSize) not in SearchPool.pools:
+            SearchPool.pools[(workers, tableSize)] = SearchPool(workers, tableSize)
+        return SearchPool.pools[(workers, tableSize)]
+
+    def attach(name, tableSize):
+        # runs in each worker as it starts
+        SearchPool.worker = TranspositionTable(tableSize, name) if name is not None else None
+
+    def work(task):
+        root, rollouts, until, seed = task
+        np.random.seed(seed)
+        table = SearchPool.worker
+        hits, misses = (table.hits, table.misses) if table is not None else (0, 0)
+        losses, counts, _ = Search.evaluate(root, rollouts, until, table)
+        if table is not None:
+            hits, misses = table.hits - hits, table.misses - misses
+        return losses, counts, hits, misses
+
+    def search(self, root, rollouts, until):
+        shares = [rollouts // self.workers + (worker < rollouts % self.workers) for worker in range(self.workers)]
+        tasks = [(root, share, until, np.random.randint(2 ** 31)) for share in shares if share or until is not None]
+        losses = 0
+        counts = 0
+        for (workerLosses, workerCounts, hits, misses) in self.pool.map(SearchPool.work, tasks):
+            losses = losses + workerLosses
+            counts = counts + workerCounts
+            self.hits += hits
+            self.misses += misses
+        return losses, counts
+
+    def close(self):
+        self.pool.terminate()
+        if self.table is not None:
+            self.table.close()
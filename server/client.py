@@ -0,0 +1,90 @@
+'''
+File for ScriptedClient class, used to drive the table server locally.
+'''
+
+import asyncio
+
+from utils.protocol import Protocol
+
+'''
+Default policy for scripted clients: always the first legal option.
+Policies take the decision kind and the request state, and return the reply fields
+(or None to leave the request unanswered, e.g. to exercise table deadlines).
+'''
+def firstLegal(decision, state):
+    if decision == Protocol.POWER:
+        return {"decision": "y"}
+    if decision == Protocol.CALL:
+        return {"call": 1 if state["illegal"] == 0 else 0}
+    return {"index": 0}
+
+'''
+Client which plays one seat of a table by answering every request with a policy.
+Connects over TCP (host, port) or a Unix socket (path), and keeps every non-request message
+it receives in a log so that tests can inspect the exchange afterwards.
+'''
+class ScriptedClient:
+
+    def __init__(self, name, policy = firstLegal):
+        self.name = name
+        self.policy = policy
+        self.log = []
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, host = None, port = None, path = None):
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def send(self, message):
+        await Protocol.write(self.writer, message)
+
+    async def receive(self):
+        message = await Protocol.read(self.reader)
+        if message is None:
+            raise ConnectionError("Server closed the connection!")
+        return message
+
+    async def create(self, tableId, names, cardRange, numLives, powerTries, timeouts = {}):
+        await self.send({
+            "type": Protocol.CREATE, "table": tableId, "names": names,
+            "cardRange": cardRange, "lives": numLives, "tries": powerTries, "timeouts": timeouts,
+        })
+        return await self.expect(Protocol.CREATED)
+
+    async def join(self, tableId):
+        await self.send({"type": Protocol.JOIN, "table": tableId, "name": self.name})
+        return await self.expect(Protocol.JOINED)
+
+    async def list(self):
+        await self.send({"type": Protocol.LIST})
+        return await self.expect(Protocol.TABLES)
+
+    async def expect(self, kind):
+        message = await self.receive()
+        self.log.append(message)
+        if message["type"] != kind:
+            raise ValueError("Expected {} but received {}!".format(kind, message))
+        return message
+
+    async def play(self):
+        # answer requests until the table reports a result (or a failure)
+        while True:
+            message = await self.receive()
+            if message["type"] == Protocol.REQUEST:
+                reply = self.policy(message["decision"], message["state"])
+                if reply is None:
+                    continue
+                await self.send(dict(reply, type = Protocol.REPLY, id = message["id"]))
+                continue
+            self.log.append(message)
+            if message["type"] == Protocol.RESULT:
+                return message
+            if message["type"] == Protocol.ERROR and "table" in message:
+                return message
@@ -0,0 +1,176 @@
+'''
+File for the asyncio table server (TableServer and Connection classes).
+'''
+
+import asyncio
+import contextlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from server.table import Table
+from utils.constants import Deadlines
+from utils.constants import Serving
+from utils.protocol import Protocol
+
+'''
+Connection stores the state of one client socket:
+    Stream reader and writer, pending decision requests keyed by request id
+Functionalities:
+    Sends messages, and issues decision requests whose replies are matched back by id
+    Fails every pending request when the client goes away, so blocked games don't hang
+'''
+class Connection:
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.nextId = 0
+        self.closed = False
+
+    async def send(self, message):
+        if self.closed:
+            raise ConnectionError("Connection is closed!")
+        await Protocol.write(self.writer, message)
+
+    async def error(self, message):
+        await self.send({"type": Protocol.ERROR, "message": message})
+
+    async def request(self, name, decision, state):
+        self.nextId += 1
+        requestId = self.nextId
+        future = asyncio.get_running_loop().create_future()
+        self.pending[requestId] = future
+        try:
+            await self.send({"type": Protocol.REQUEST, "id": requestId, "name": name, "decision": decision, "state": state})
+            return await future
+        finally:
+            self.pending.pop(requestId, None)
+
+    def resolve(self, message):
+        future = self.pending.get(message.get("id"))
+        if future is None or future.done():
+            return False
+        future.set_result(message)
+        return True
+
+    def close(self):
+        self.closed = True
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Client disconnected!"))
+        self.writer.close()
+
+'''
+TableServer hosts many concurrent tables in one process:
+    Server settings:
+        Most tables open at once (None for no limit), size of the worker pool that runs bot decisions,
+        whether game output is silenced
+    Server state: live tables keyed by id
+Functionalities:
+    Accepts TCP or Unix socket clients speaking the protocol in utils/protocol.py
+    Creates tables (bot-only tables start immediately), seats joining clients (again after a dropped
+    connection), lists tables; creating a table past the limit is refused with an error
+    Every game runs in its own thread, so a slow bot decision at one table never blocks the event loop, and
+    a game waiting on human seats for as long as it lasts never keeps another table from starting
+    Bot decisions are awaited on the loop under the table's deadlines and run in a separate pool,
+    so tables waiting on decisions can never starve the threads those decisions need
+'''
+class TableServer:
+
+    def __init__(self, maxTables = Serving.MAX_TABLES, decisionWorkers = Serving.DECISION_WORKERS, quiet = Serving.QUIET):
+        self.tables = {}
+        self.maxTables = maxTables
+        self.decisionPool = ThreadPoolExecutor(max_workers = decisionWorkers)
+        self.quiet = quiet
+        self.server = None
+
+    async def start(self, host = None, port = None, path = None):
+        # awaitable player decisions run blocking logic via asyncio.to_thread, i.e. the default executor
+        asyncio.get_running_loop().set_default_executor(self.decisionPool)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path = path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def serve(self, host = None, port = None, path = None):
+        with contextlib.ExitStack() as stack:
+            if self.quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            await self.start(host, port, path)
+            async with self.server:
+                await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.decisionPool.shutdown(wait = False)
+
+    async def handle(self, reader, writer):
+        connection = Connection(reader, writer)
+        try:
+            while True:
+                try:
+                    message = await Protocol.read(reader)
+                except ValueError as e:
+                    await connection.error("Malformed message: {}".format(e))
+                    continue
+                if message is None:
+                    break
+                try:
+                    await self.dispatch(connection, message)
+                except (KeyError, TypeError, ValueError) as e:
+                    await connection.error(str(e))
+        except ConnectionError:
+            pass
+        finally:
+            connection.close()
+
+    async def dispatch(self, connection, message):
+        kind = message["type"]
+        if kind == Protocol.REPLY:
+            if not connection.resolve(message):
+                await connection.error("No pending request with id {}!".format(message.get("id")))
+        elif kind == Protocol.CREATE:
+            table = self.createTable(
+                message["table"], message["names"], message["cardRange"], message["lives"], message["tries"],
+                message.get("timeouts", {})
+            )
+            table.watch(connection)
+            await connection.send({"type": Protocol.CREATED, "table": table.tableId, "seats": list(table.seats)})
+            if table.ready():
+                table.start()
+        elif kind == Protocol.JOIN:
+            table = self.tables.get(message["table"])
+            if table is None:
+                raise ValueError("No table with id {}!".format(message["table"]))
+            table.join(message["name"], connection, asyncio.get_running_loop())
+            await connection.send({"type": Protocol.JOINED, "table": table.tableId, "name": message["name"]})
+            if table.ready() and table.task is None:
+                table.start()
+        elif kind == Protocol.LIST:
+            await connection.send({"type": Protocol.TABLES, "tables": [table.describe() for table in self.tables.values()]})
+        else:
+            raise ValueError("Unknown message type {}!".format(kind))
+
+    def createTable(self, tableId, names, cardRange, numLives, powerTries, timeouts = {}):
+        if tableId in self.tables:
+            raise ValueError("Table {} already exists!".format(tableId))
+        if self.maxTables is not None and len(self.tables) >= self.maxTables:
+            raise ValueError("Server is full ({} tables open), try again once a game ends!".format(len(self.tables)))
+        if len(set(names)) != len(names) or len(names) < 2:
+            raise ValueError("Tables need at least two players with distinct names!")
+        # timeouts may be overridden per decision by name (choosePower, makeCall, chooseCard)
+        tableTimeouts = dict(Deadlines.TIMEOUTS)
+        tableTimeouts.update({decision: timeouts[decision] for decision in timeouts if decision in tableTimeouts})
+        table = Table(
+            self, tableId, names, int(cardRange), int(numLives), int(powerTries),
+            tableTimeouts, asyncio.get_running_loop()
+        )
+        self.tables[tableId] = table
+        return table
+
+    def closeTable(self, tableId):
+        self.tables.pop(tableId, None)
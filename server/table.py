@@ -0,0 +1,121 @@
+'''
+File for Table class.
+'''
+
+import asyncio
+import contextlib
+import threading
+
+from logic.decision import DeadlineDecider
+from logic.game import Game
+from players.choose import chooseStrategy
+from players.manual import Manual
+from players.reinforcement import QLearning
+from players.remote import Remote
+from utils.protocol import Protocol
+
+'''
+Table stores one live game hosted by the table server:
+    Table settings passed down from the server:
+        Table id, names, card range, number of lives, tries for power card
+        Per-decision timeouts (a human or bot past its deadline is played by Easy logic for that decision)
+        Q-agents are frozen and hot-reload their checkpoint, so a running server picks up newly trained tables
+    Table state:
+        Game instance, remote seats (names without a bot strategy), watching connections
+Functionalities:
+    Seats connections at their Remote players, starts the game once every seat is taken
+    A player whose connection dropped can join again and take their seat back (decisions missed meanwhile
+    were made by Easy logic, see DeadlineDecider)
+    Runs the (blocking) game in its own thread so other tables keep going
+    Broadcasts the final standings (or the failure) to every connection at the table
+'''
+class Table:
+
+    def __init__(self, server, tableId, names, cardRange, numLives, powerTries, timeouts, loop):
+        self.server = server
+        self.tableId = tableId
+        self.names = list(names)
+        self.decider = DeadlineDecider(timeouts = timeouts, loop = loop)
+        self.game = Game(list(names), cardRange, numLives, powerTries, chooser = self.choosePlayer, decider = self.decider)
+        self.seats = {player.name: player for player in self.game.players if isinstance(player, Remote)}
+        self.watchers = set()
+        self.task = None
+
+    def choosePlayer(self, name, numLives, history):
+        player = chooseStrategy(name, numLives, history)
+        # names which would be played from the terminal are seated remotely instead
+        if isinstance(player, Manual):
+            return Remote(name, numLives, history)
+        # served Q-agents play the latest checkpoint rather than training on live games
+        if isinstance(player, QLearning):
+            player.learning = False
+            player.hotReload = True
+        return player
+
+    def join(self, name, connection, loop):
+        if name not in self.seats:
+            raise ValueError("{} is not a human seat at table {}!".format(name, self.tableId))
+        seat = self.seats[name].connection
+        if seat is not None and not seat.closed:
+            raise ValueError("{} is already seated at table {}!".format(name, self.tableId))
+        self.watchers.discard(seat)
+        self.seats[name].bind(connection, loop)
+        self.watchers.add(connection)
+
+    def watch(self, connection):
+        self.watchers.add(connection)
+
+    def ready(self):
+        return all([seat.connection is not None for seat in self.seats.values()])
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+        return self.task
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        await self.broadcast({"type": Protocol.STARTED, "table": self.tableId, "names": self.names})
+        try:
+            await self.play(loop)
+            message = {
+                "type": Protocol.RESULT, "table": self.tableId, "standings": self.game.standings,
+                "missed": self.decider.missed,
+            }
+        except Exception as e:
+            message = {"type": Protocol.ERROR, "table": self.tableId, "message": "Game failed: {}".format(e)}
+        await self.broadcast(message)
+        self.server.closeTable(self.tableId)
+
+    async def play(self, loop):
+        # a game can wait on human seats for as long as it lasts, so it holds a thread of its own, not a pooled one
+        done = loop.create_future()
+
+        def settle(error):
+            # the table's task may have been cancelled (the server closing) before the game ended
+            if not done.done():
+                done.set_result(None) if error is None else done.set_exception(error)
+
+        def playGame():
+            error = None
+            try:
+                self.game.playGame()
+            except Exception as e:
+                error = e
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(settle, error)
+
+        threading.Thread(target = playGame, name = "table-{}".format(self.tableId), daemon = True).start()
+        await done
+
+    async def broadcast(self, message):
+        for connection in list(self.watchers):
+            try:
+                await connection.send(message)
+            except ConnectionError:
+                self.watchers.discard(connection)
+
+    def describe(self):
+        return {
+            "table": self.tableId, "names": self.names, "started": self.task is not None,
+            "open": [name for (name, seat) in self.seats.items() if seat.connection is None],
+        }
@@ -0,0 +1,35 @@
+'''
+Tests for the Q-Value table updates (see utils/table.py). Run from the repository root: python -m pytest tests
+'''
+
+from collections import defaultdict
+
+import numpy as np
+
+from utils.table import HashedTable
+from utils.table import TableUpdates
+
+'''
+A key repeated within one round steps once per occurrence, as on a dict table, rather than summing its steps.
+'''
+def test_repeated_keys_match_dict_table():
+    hashed = HashedTable(64)
+    table = defaultdict(float)
+    keys = [(1, 2)] * 40 + [(3, 4), (5, 6), (1, 2)]
+    targets = list(np.linspace(0, 1, len(keys)))
+    for _ in range(5):
+        hashedErrors = TableUpdates.apply(hashed, keys, targets, .1)
+        errors = TableUpdates.apply(table, keys, targets, .1)
+        assert np.allclose(hashedErrors, errors)
+    for key in set(keys):
+        assert np.isclose(hashed[key], table[key])
+    assert 0 <= hashed[(1, 2)] <= 1
+
+'''
+Many copies of one key with a large step converge to the target rather than diverging.
+'''
+def test_repeated_keys_stay_bounded():
+    hashed = HashedTable(64)
+    for _ in range(5):
+        TableUpdates.apply(hashed, [(7,)] * 40, [1.0] * 40, .1)
+    assert np.isclose(hashed[(7,)], 1.0)
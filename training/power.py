@@ -0,0 +1,136 @@
+'''
+File for building the power card tables (ForcedPower and PowerBuilder classes, see players/power.py).
+'''
+
+import contextlib
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from logic.core import CoreRound
+from logic.decision import Decider
+from logic.game import Game
+from players.power import PowerTable
+from utils.card import CardInfo
+from utils.checkpoint import Checkpoint
+from utils.constants import Gameplay
+from utils.constants import Powers
+from utils.constants import Strategies
+
+'''
+Decider which makes the dealer accept the draw of a given try (earlier draws are rejected), and asks players for
+every other decision as the plain Decider does.
+'''
+class ForcedPower(Decider):
+
+    def __init__(self, tryIndex):
+        self.tryIndex = tryIndex
+
+    def decide(self, player, decision, *args):
+        if decision == "choosePower":
+            _, shown = args[:2]
+            return Gameplay.POWER_YES if len(shown) == self.tryIndex else Gameplay.POWER_NO
+        return Decider.decide(self, player, decision, *args)
+
+'''
+PowerBuilder builds a power card table by playing rounds out on the silent core:
+    Settings: card range, power tries, most players, decks, strategy every seat plays (its calls and card choices
+    are what the table's values assume), rounds per situation and try, worker processes, seed
+    Situations are (players, round size, try, matches), see PowerTable
+Functionalities:
+    For every table size (players, round size) deals rounds and plays each deal once per try, the dealer (last to
+    call) accepting that try's draw (see ForcedPower), so the tries of a deal share their hands and differ by the
+    power alone; the dealer's lives lost are summed by try and by the accepted candidate's matches
+    Accepting a situation is worth its mean lives lost, if played at least Powers.MIN_ROUNDS times
+    Rejecting is worth the next try's lives lost, over how often each of its matches came up, each accepted or
+    rejected by the least (the last try is forced), worked back from the last try
+    Table sizes are shared between workers, and the table is saved where PowerTable looks for it
+'''
+class PowerBuilder:
+
+    def __init__(self, cardRange, powerTries, maxPlayers, numDecks = 1, strategy = Strategies.HARD,
+            samples = Powers.SAMPLES, workers = Powers.WORKERS, seed = None):
+        self.cardRange = cardRange
+        self.powerTries = powerTries
+        self.maxPlayers = maxPlayers
+        self.numDecks = numDecks
+        self.strategy = strategy
+        self.samples = samples
+        self.workers = workers
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        numCards = len(CardInfo.SUITS) * cardRange * numDecks
+        self.sizes = [
+            (numPlayers, roundSize) for numPlayers in range(2, maxPlayers + 1)
+            for roundSize in range(1, (numCards - powerTries) // numPlayers + 1)
+        ]
+        self.maxCards = max([roundSize for (_, roundSize) in self.sizes])
+        self.numMatches = min(powerTries - 1, len(CardInfo.SUITS) * numDecks)
+
+    def play(self, task):
+        # runs in a worker: the dealer's lives lost and rounds played by try and matches for one table size
+        numPlayers, roundSize, seed = task
+        rng = random.Random(seed)
+        random.seed(seed)
+        np.random.seed(seed % (2 ** 32))
+        losses = np.zeros((self.powerTries, self.numMatches + 1))
+        counts = np.zeros((self.powerTries, self.numMatches + 1), dtype = np.int64)
+        names = ["{}_{}".format(self.strategy, seat + 1) for seat in range(numPlayers)]
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            game = Game(names, self.cardRange, 1, self.powerTries, numDecks = self.numDecks)
+            for _ in range(self.samples):
+                dealSeed = rng.randrange(2 ** 31)
+                for tryIndex in range(self.powerTries):
+                    currRound = CoreRound(roundSize, numPlayers - 1, names, game.players, game.deck, self.cardRange,
+                        self.powerTries, ForcedPower(tryIndex), random.Random(dealSeed)
+                    )
+                    currRound.playRound()
+                    # the deal leaves the deck in order, so the draws follow the hands
+                    draws = game.deck.cards[numPlayers * roundSize:numPlayers * roundSize + tryIndex]
+                    matches = sum([card.num == currRound.power for card in draws])
+                    losses[tryIndex, matches] += currRound.diffs[currRound.dealer]
+                    counts[tryIndex, matches] += 1
+        return numPlayers, roundSize, losses, counts
+
+    def values(self, losses, counts):
+        # values of accepting (nan if played too rarely) and rejecting, and decisions, for one table size
+        accept = np.divide(losses, counts, out = np.full(losses.shape, np.nan), where = counts >= Powers.MIN_ROUNDS)
+        reject = np.full(self.powerTries, np.nan)
+        decisions = np.full(losses.shape, -1, dtype = np.int8)
+        for tryIndex in reversed(range(self.powerTries - 1)):
+            following = counts[tryIndex + 1]
+            # a rare matches of the next try is worth that try's mean
+            value = np.where(np.isnan(accept[tryIndex + 1]), losses[tryIndex + 1].sum() / following.sum(),
+                accept[tryIndex + 1])
+            if tryIndex + 1 < self.powerTries - 1:
+                value = np.minimum(value, reject[tryIndex + 1])
+            reject[tryIndex] = float(value @ following) / following.sum()
+            decided = ~np.isnan(accept[tryIndex])
+            decisions[tryIndex, decided] = accept[tryIndex, decided] <= reject[tryIndex]
+        return accept, reject, decisions
+
+    def run(self):
+        rng = random.Random(self.seed)
+        tasks = [(numPlayers, roundSize, rng.randrange(2 ** 31)) for (numPlayers, roundSize) in self.sizes]
+        shape = (self.maxPlayers + 1, self.maxCards + 1, self.powerTries)
+        accept = np.full(shape + (self.numMatches + 1,), np.nan, dtype = np.float32)
+        reject = np.full(shape, np.nan, dtype = np.float32)
+        decisions = np.full(accept.shape, -1, dtype = np.int8)
+        counts = np.zeros(accept.shape, dtype = np.int64)
+        if self.workers == 1:
+            results = [self.play(task) for task in tasks]
+        else:
+            with multiprocessing.Pool(self.workers) as pool:
+                results = pool.map(self.play, tasks)
+        for (numPlayers, roundSize, losses, played) in results:
+            values = self.values(losses, played)
+            accept[numPlayers, roundSize], reject[numPlayers, roundSize], decisions[numPlayers, roundSize] = values
+            counts[numPlayers, roundSize] = played
+        header = {"cardRange": self.cardRange, "numDecks": self.numDecks, "powerTries": self.powerTries,
+            "maxPlayers": self.maxPlayers, "strategy": self.strategy, "samples": self.samples, "seed": self.seed}
+        Checkpoint.save(PowerTable.path(self.cardRange, self.numDecks, self.powerTries), header,
+            {"accept": accept, "reject": reject, "decisions": decisions, "counts": counts}
+        )
+        PowerTable.tables.pop((self.cardRange, self.numDecks, self.powerTries), None)
+        return int(np.count_nonzero(decisions >= 0))
@@ -0,0 +1,234 @@
+'''
+File for self-play training (Actor, Learner and SelfPlay classes).
+'''
+
+import contextlib
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import numpy as np
+
+from logic.core import CoreRound
+from logic.decision import Decider
+from logic.game import Game
+from players.choose import chooseStrategy
+from utils.constants import Strategies
+from utils.constants import Metrics
+from utils.constants import Training
+from utils.metrics import MetricsSink
+
+'''
+Checks whether a player name is trained by self-play (QLearning or QApproximate).
+'''
+def isTrainee(name):
+    return Strategies.Q_LEARN in name or Strategies.Q_APPROXIMATE in name
+
+'''
+Actor plays training games in its own process:
+    Settings passed down from SelfPlay:
+        Names, card range, lives, power tries, seed
+        Shared queue for recorded rounds, shared version counter for the published tables, stop event
+    State: tables for each trainee as of the last version loaded
+Functionalities:
+    Reloads the trainees' tables whenever the learner publishes a new version, and plays every game in
+    between against that snapshot of the policy
+    Trainees record their rounds rather than learning or saving (see QLearning), and the rounds of a game
+    are sent to the learner as one message, with the game's winner and the actor's decisions by strategy so far
+    (see Decider.tally) for the live metrics
+'''
+class Actor:
+
+    def __init__(self, names, cardRange, numLives, powerTries, records, version, stop, seed):
+        self.names = list(names)
+        self.cardRange = cardRange
+        self.numLives = numLives
+        self.powerTries = powerTries
+        self.records = records
+        self.version = version
+        self.stop = stop
+        self.seed = seed
+        self.loaded = None
+        self.tables = {}
+
+    def load(self):
+        self.loaded = self.version.value
+        for name in self.names:
+            if isTrainee(name):
+                template = chooseStrategy(name, self.numLives, [])
+                self.tables[name] = (type(template), (template.qCalls, template.qPlays))
+
+    def choosePlayer(self, name, numLives, history):
+        if name not in self.tables:
+            return chooseStrategy(name, numLives, history)
+        agentType, tables = self.tables[name]
+        player = agentType(name, numLives, history, tables = tables)
+        player.recorder = self.rounds[name]
+        return player
+
+    def run(self):
+        random.seed(self.seed)
+        np.random.seed(self.seed % (2 ** 32))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            while not self.stop.is_set():
+                if self.version.value != self.loaded:
+                    self.load()
+                self.rounds = {name: [] for name in self.tables}
+                names = list(self.names)
+                random.shuffle(names)
+                game = Game(names, self.cardRange, self.numLives, self.powerTries, chooser = self.choosePlayer, roundType = CoreRound)
+                game.playGame()
+                self.records.put((self.rounds, game.standings[0], os.getpid(), Decider.tally()))
+
+'''
+Learner holds the one authoritative copy of each trainee's tables:
+    Replays recorded rounds into the tables a batch at a time (see QLearning.replayBatch)
+    Publishes by saving the tables (atomically, so an actor never loads a partial file)
+Since only the learner writes, same-named trainees in different games no longer race on one file.
+Given a metrics sink, the agents report their updates to it, and it is flushed on every publish.
+'''
+class Learner:
+
+    def __init__(self, names, metrics = None):
+        self.agents = {name: chooseStrategy(name, 1, []) for name in names if isTrainee(name)}
+        self.rounds = 0
+        self.metrics = metrics
+        for agent in self.agents.values():
+            agent.metrics = metrics
+
+    def learn(self, games):
+        for (name, agent) in self.agents.items():
+            records = [record for rounds in games for record in rounds[name]]
+            agent.replayBatch(records)
+            self.rounds += len(records)
+
+    def publish(self):
+        for agent in self.agents.values():
+            agent.saveQVals()
+        if self.metrics is not None:
+            self.metrics.close()
+
+'''
+SelfPlay runs TRAIN mode:
+    Settings passed down from play.py:
+        Names (trainees and fixed opponents), card range, lives, power tries, number of games
+        Number of actor processes, games per learning batch, games per publish, base seed
+        Optional metrics sink settings (file, or stdout if empty, and rounds per report)
+    State: games received, recorded games waiting for the next batch, wins by player, latest decisions by
+    strategy of each actor, the queue from the actors and the published version (while running)
+Functionalities:
+    Starts the actors, then learns in this process: recorded games are applied a batch at a time,
+    and the tables are published every few batches, bumping the version the actors reload on
+    Once enough games have arrived, stops the actors, learns from and publishes what is left
+    Reports games, rounds learned, versions published and throughput
+    Collects its metrics for the live endpoint (see MetricsServer in utils/metrics.py) from what it already keeps
+'''
+class SelfPlay:
+
+    def __init__(self, names, cardRange, numLives, powerTries, numGames, actors = Training.ACTORS,
+            batch = Training.BATCH, publish = Training.PUBLISH, seed = None, metrics = None, metricsInterval = Metrics.INTERVAL):
+        self.names = list(names)
+        self.cardRange = cardRange
+        self.numLives = numLives
+        self.powerTries = powerTries
+        self.numGames = numGames
+        self.actors = actors
+        self.batch = batch
+        self.publish = publish
+        # actors are forked with the same random state, so each gets its own seed
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        sink = MetricsSink(metrics or None, metricsInterval) if metrics is not None else None
+        self.learner = Learner(self.names, sink)
+        self.games = 0
+        self.pending = []
+        self.wins = {name: 0 for name in self.names}
+        self.decisions = {}
+        self.records = None
+        self.version = None
+
+    def receive(self, message):
+        rounds, winner, pid, decisions = message
+        self.pending.append(rounds)
+        self.wins[winner] += 1
+        self.decisions[pid] = decisions
+        self.games += 1
+
+    def run(self):
+        start = time.time()
+        self.records = multiprocessing.Queue()
+        self.version = multiprocessing.Value("i", 0)
+        stop = multiprocessing.Event()
+        # the tables the actors start from are the ones on file
+        self.learner.publish()
+        processes = [
+            multiprocessing.Process(target = Actor(
+                self.names, self.cardRange, self.numLives, self.powerTries, self.records, self.version, stop, self.seed + i
+            ).run)
+            for i in range(self.actors)
+        ]
+        for process in processes:
+            process.start()
+
+        while self.games < self.numGames:
+            try:
+                self.receive(self.records.get(timeout = 1))
+            except queue.Empty:
+                if not any([process.is_alive() for process in processes]):
+                    raise RuntimeError("Every actor has stopped!")
+                continue
+            if len(self.pending) == self.batch:
+                self.learner.learn(self.pending)
+                self.pending = []
+            if self.games % self.publish == 0:
+                self.learner.publish()
+                with self.version.get_lock():
+                    self.version.value += 1
+
+        # games in flight when the actors stop are still learned from, so none are wasted
+        stop.set()
+        while any([process.is_alive() for process in processes]) or not self.records.empty():
+            try:
+                self.receive(self.records.get(timeout = .1))
+            except queue.Empty:
+                pass
+        for process in processes:
+            process.join()
+        self.learner.learn(self.pending)
+        self.pending = []
+        self.learner.publish()
+
+        elapsed = time.time() - start
+        return "\n".join([
+            "Games: {} ({} actors), rounds learned: {}, versions published: {}".format(
+                self.games, self.actors, self.learner.rounds, self.version.value + 1
+            ),
+            "Elapsed: {:.1f}s, {:.1f} games/s".format(elapsed, self.games / elapsed),
+        ])
+
+    def metrics(self):
+        queues = {"learner_batch": len(self.pending)}
+        if self.records is not None:
+            # qsize isn't implemented everywhere (i.e. macOS)
+            with contextlib.suppress(NotImplementedError):
+                queues["actor_records"] = self.records.qsize()
+        wins = dict(self.wins)
+        tables = {}
+        for (name, agent) in list(self.learner.agents.items()):
+            tables[name + "/calls"] = len(agent.qCalls)
+            tables[name + "/plays"] = len(agent.qPlays)
+        return [
+            ("fodinha_games_total", "counter", "Training games received from the actors", None, self.games),
+            ("fodinha_games_remaining", "gauge", "Training games left to play", None, max(self.numGames - self.games, 0)),
+            ("fodinha_rounds_learned_total", "counter", "Recorded rounds replayed into the tables", None, self.learner.rounds),
+            ("fodinha_version", "gauge", "Versions of the tables published", None,
+                self.version.value if self.version is not None else 0),
+            ("fodinha_decisions_total", "counter", "Decisions by strategy (actors as of their last game)", "strategy",
+                Decider.combine(list(self.decisions.values()))),
+            ("fodinha_queue_depth", "gauge", "Recorded games waiting for the learner", "queue", queues),
+            ("fodinha_q_table_entries", "gauge", "Entries (or weights) in each trainee's tables", "table", tables),
+            ("fodinha_wins_total", "counter", "Training games won by player", "player", wins),
+            ("fodinha_win_rate", "gauge", "Win rate by player over the training games so far", "player",
+                {name: count / self.games if self.games else 0.0 for (name, count) in wins.items()}),
+        ]
@@ -0,0 +1,289 @@
+'''
+File for the counterfactual regret minimization solver (RoundState and CFRSolver classes).
+'''
+
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from logic.simulate import Simulation
+from players.cfr import InfoSets
+from utils.card import CardInfo
+from utils.checkpoint import Checkpoint
+from utils.constants import Solving
+
+'''
+RoundState is a node of one round's game tree, played by the rules of Round and Hand:
+    Settings: players, hand size, card range, power tries
+    Chance (sampled up front): every seat's hand and the power draws, as card indices (num * 4 + suit rank)
+    State: power try, power, calls, hands left (as card keys, see InfoSets), the hand in progress (first seat,
+    turn, standing cards), wins, wins carried by fully cancelled hands, every card played in order
+    Seats count from the first to call, so the dealer (who chooses the power card and calls last) is the last seat
+Functionalities:
+    Whose turn it is, their legal action slots and information set key (see InfoSets), and the state after
+    an action (a new state, so the solver can explore every action from one node)
+    Power: the dealer accepts or rejects each draw but the last, which is forced
+    Calls: the dealer can't call the number which would make the calls add up to the hand size
+    Plays: cards cancel and wins carry as in Hand (see Simulation.play), the winner leads the next hand
+    Payoff: the lives each player loses, |call - wins|, as a negative utility
+'''
+class RoundState:
+
+    def __init__(self, numPlayers, numCards, cardRange, powerTries, hands, draws):
+        self.numPlayers = numPlayers
+        self.numCards = numCards
+        self.cardRange = cardRange
+        self.powerTries = powerTries
+        self.hands = hands
+        self.draws = draws
+        self.tryIndex = 0
+        self.power = None
+        self.shown = ()
+        self.calls = ()
+        self.first = 0
+        self.turn = 0
+        self.standing = {}
+        self.wins = [0] * numPlayers
+        self.carry = 0
+        self.sequence = ()
+        self.handsLeft = numCards
+        if powerTries == 1:
+            self.setPower(0)
+
+    def deal(rng, numPlayers, numCards, cardRange, powerTries):
+        deck = list(range(cardRange * len(CardInfo.SUITS)))
+        rng.shuffle(deck)
+        hands = [deck[seat * numCards:(seat + 1) * numCards] for seat in range(numPlayers)]
+        draws = deck[numPlayers * numCards:numPlayers * numCards + powerTries]
+        return RoundState(numPlayers, numCards, cardRange, powerTries, hands, draws)
+
+    def cardKey(self, index, power):
+        return InfoSets.cardKey(index // len(CardInfo.SUITS), index % len(CardInfo.SUITS), power, self.cardRange)
+
+    def candidate(self, tryIndex):
+        return (self.draws[tryIndex] // len(CardInfo.SUITS) + 1) % self.cardRange
+
+    def setPower(self, tryIndex):
+        self.power = self.candidate(tryIndex)
+        self.shown = tuple([self.cardKey(index, self.power) for index in self.draws[:tryIndex + 1]])
+        self.hands = [sorted([self.cardKey(index, self.power) for index in hand]) for hand in self.hands]
+
+    def copy(self):
+        state = RoundState.__new__(RoundState)
+        vars(state).update(vars(self))
+        state.hands = [list(hand) for hand in self.hands]
+        state.standing = dict(self.standing)
+        state.wins = list(self.wins)
+        return state
+
+    def terminal(self):
+        return self.handsLeft == 0
+
+    def utility(self, seat):
+        return -abs(self.calls[seat] - self.wins[seat])
+
+    def player(self):
+        if self.power is None:
+            return self.numPlayers - 1
+        if len(self.calls) < self.numPlayers:
+            return len(self.calls)
+        return (self.first + self.turn) % self.numPlayers
+
+    def legal(self):
+        if self.power is None:
+            return [0, 1]
+        if len(self.calls) < self.numPlayers:
+            illegal = self.numCards - sum(self.calls) if len(self.calls) == self.numPlayers - 1 else -1
+            return [call for call in range(self.numCards + 1) if call != illegal]
+        return list(range(len(InfoSets.distinct(self.hands[self.player()]))))
+
+    def key(self):
+        if self.power is None:
+            draws = tuple([index // len(CardInfo.SUITS) for index in self.draws[:self.tryIndex]])
+            return InfoSets.powerKey(self.numPlayers, self.numCards, self.tryIndex, self.candidate(self.tryIndex), draws)
+        seat = self.player()
+        if len(self.calls) < self.numPlayers:
+            others = ()
+            if self.numCards == 1:
+                others = tuple([self.hands[other][0] for other in range(self.numPlayers) if other != seat])
+            return InfoSets.callKey(self.numPlayers, self.numCards, self.power, tuple(self.hands[seat]), self.shown,
+                self.calls, others
+            )
+        return InfoSets.playKey(self.numPlayers, self.numCards, self.power, tuple(self.hands[seat]), self.shown,
+            self.calls, seat, self.sequence
+        )
+
+    def next(self, action):
+        state = self.copy()
+        if state.power is None:
+            if action == 0:
+                state.setPower(state.tryIndex)
+            else:
+                state.tryIndex += 1
+                if state.tryIndex == state.powerTries - 1:
+                    state.setPower(state.tryIndex)
+            return state
+        if len(state.calls) < state.numPlayers:
+            state.calls += (action,)
+            return state
+        seat = state.player()
+        key = InfoSets.distinct(state.hands[seat])[action]
+        state.hands[seat].remove(key)
+        Simulation.play(state.standing, seat, key)
+        state.sequence += (key,)
+        state.turn += 1
+        if state.turn == state.numPlayers:
+            if state.standing:
+                state.first = state.standing[max(state.standing)]
+                state.wins[state.first] += 1 + state.carry
+                state.carry = 0
+            else:
+                state.carry += 1
+            state.standing = {}
+            state.turn = 0
+            state.handsLeft -= 1
+        return state
+
+'''
+CFRSolver approximately solves the rounds of a table configuration by external-sampling Monte Carlo CFR:
+    Settings: card range, most players (every count down to two is solved, as eliminations shrink the table),
+    power tries, largest hand size (trees grow exponentially with it, None for the largest the game deals),
+    table size, worker processes, iterations per worker between merges, seed
+    Tables: regrets and average strategy sums, one row per information set (hashed, see InfoSets) and one
+    column per action slot
+Functionalities:
+    An iteration samples a table size and hand size, deals, and walks the tree once for each seat in turn:
+    every action of the walking seat is explored and its regrets updated, the other seats' actions are sampled
+    from their current strategies (regret matching), which are added to the average strategy
+    Workers each run iterations against a copy of the tables as of the last merge and send back what they
+    changed, which is summed in (the tables are passed as a checkpoint mapped copy-on-write, see checkpoint.py)
+    Saves a checkpoint with the normalized average strategy (the CFR player's table, mapped in place) and the
+    regrets and sums, from which a later run resumes
+With more than two players CFR isn't guaranteed to reach an equilibrium, but its average strategy is a strong,
+stable benchmark; rounds are solved on their own, minimizing the lives each loses.
+'''
+class CFRSolver:
+
+    def __init__(self, cardRange, numPlayers, powerTries, maxCards = Solving.MAX_CARDS, size = Solving.TABLE_SIZE,
+            workers = Solving.WORKERS, epoch = Solving.EPOCH, seed = None):
+        self.cardRange = cardRange
+        self.numPlayers = numPlayers
+        self.powerTries = powerTries
+        self.workers = workers
+        self.epoch = epoch
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        # Game bounces the hand size back down once another card each wouldn't leave the power draws
+        self.configs = [
+            (players, numCards) for players in range(2, numPlayers + 1)
+            for numCards in range(1, (cardRange * len(CardInfo.SUITS) - powerTries) // players + 1)
+            if maxCards is None or numCards <= maxCards
+        ]
+        self.numActions = max(2, max([numCards for (_, numCards) in self.configs]) + 1)
+        self.regrets = np.zeros((size, self.numActions))
+        self.sums = np.zeros((size, self.numActions))
+        self.iterations = 0
+
+    def __getstate__(self):
+        # workers get their tables from the checkpoint, so they're left out of what the pool pickles
+        state = dict(vars(self))
+        state["regrets"] = state["sums"] = None
+        return state
+
+    def settings(self):
+        return {"cardRange": self.cardRange, "numPlayers": self.numPlayers, "powerTries": self.powerTries,
+            "configs": [list(config) for config in self.configs]}
+
+    def match(regrets, legal):
+        positive = [max(regrets[action], 0.0) for action in legal]
+        total = sum(positive)
+        if total <= 0:
+            return [1 / len(legal)] * len(legal)
+        return [value / total for value in positive]
+
+    def walk(self, state, traverser, rng, regrets, sums, touched):
+        if state.terminal():
+            return state.utility(traverser)
+        legal = state.legal()
+        if len(legal) == 1:
+            return self.walk(state.next(legal[0]), traverser, rng, regrets, sums, touched)
+        index = hash(state.key()) % len(regrets)
+        touched.add(index)
+        strategy = CFRSolver.match(regrets[index].tolist(), legal)
+        if state.player() == traverser:
+            values = [self.walk(state.next(action), traverser, rng, regrets, sums, touched) for action in legal]
+            node = sum([weight * value for (weight, value) in zip(strategy, values)])
+            regrets[index, legal] += np.array(values) - node
+            return node
+        sums[index, legal] += strategy
+        action = rng.choices(legal, strategy)[0]
+        return self.walk(state.next(action), traverser, rng, regrets, sums, touched)
+
+    def iterate(self, count, rng, regrets, sums, touched):
+        for _ in range(count):
+            numPlayers, numCards = rng.choice(self.configs)
+            root = RoundState.deal(rng, numPlayers, numCards, self.cardRange, self.powerTries)
+            for traverser in range(numPlayers):
+                self.walk(root, traverser, rng, regrets, sums, touched)
+
+    def work(self, task):
+        # runs in a worker: iterations on a copy-on-write mapping of the last merge, returns the rows changed
+        path, count, seed = task
+        _, arrays = Checkpoint.load(path)
+        _, original = Checkpoint.load(path)
+        touched = set()
+        self.iterate(count, random.Random(seed), arrays["regrets"], arrays["sums"], touched)
+        rows = np.array(sorted(touched), dtype = np.int64)
+        return (rows, arrays["regrets"][rows] - original["regrets"][rows], arrays["sums"][rows] - original["sums"][rows])
+
+    def run(self, iterations, path = Solving.STRATEGY):
+        rng = random.Random(self.seed + self.iterations)
+        if self.workers == 1:
+            while iterations > 0:
+                count = min(iterations, self.epoch)
+                self.iterate(count, rng, self.regrets, self.sums, set())
+                self.iterations += count
+                iterations -= count
+                self.save(path)
+            return
+        with multiprocessing.Pool(self.workers) as pool:
+            while iterations > 0:
+                self.save(path)
+                counts = [min(self.epoch, max(iterations - worker * self.epoch, 0)) for worker in range(self.workers)]
+                tasks = [(path, count, rng.randrange(2 ** 31)) for count in counts if count]
+                for (rows, regrets, sums) in pool.imap_unordered(self.work, tasks):
+                    self.regrets[rows] += regrets
+                    self.sums[rows] += sums
+                self.iterations += sum(counts)
+                iterations -= sum(counts)
+            self.save(path)
+
+    def strategy(self):
+        totals = self.sums.sum(axis = 1, keepdims = True)
+        return np.divide(self.sums, totals, out = np.zeros_like(self.sums), where = totals > 0).astype(np.float32)
+
+    def save(self, path = Solving.STRATEGY):
+        header = dict(self.settings(), iterations = self.iterations, seed = self.seed)
+        Checkpoint.save(path, header, {"strategy": self.strategy(), "regrets": self.regrets, "sums": self.sums})
+
+    def resume(self, path = Solving.STRATEGY):
+        if not os.path.exists(path):
+            return False
+        header, arrays = Checkpoint.load(path)
+        settings = {key: header[key] for key in self.settings()}
+        if settings != self.settings() or arrays["regrets"].shape != self.regrets.shape:
+            raise ValueError("{} was solved with {}, not {}!".format(path, settings, self.settings()))
+        self.regrets = np.array(arrays["regrets"])
+        self.sums = np.array(arrays["sums"])
+        self.iterations = header["iterations"]
+        self.seed = header["seed"]
+        return True
+
+    def report(self):
+        reached = int(np.count_nonzero(self.sums.any(axis = 1)))
+        return "\n".join([
+            "Iterations: {}".format(self.iterations),
+            "Table configurations (players, hand size): {}".format(self.configs),
+            "Information sets reached: {} of {} rows ({:.1%})".format(reached, len(self.sums), reached / len(self.sums)),
+        ])
@@ -0,0 +1,109 @@
+'''
+File for Campaign class, which checkpoints long TRIAL runs so they can be resumed.
+'''
+
+import json
+import os
+import shutil
+
+from utils.checkpoint import Checkpoint
+from utils.constants import Checkpoints
+from utils.constants import Learning
+from utils.constants import Strategies
+from utils.constants import Trials
+
+'''
+Campaign keeps a TRIAL run's progress in a directory:
+    Settings: directory, whether to resume from its checkpoint, games between checkpoints
+    Files:
+        campaign.json: the run's settings, base seed, next game to play, aggregate statistics (see TrialStats),
+        progress since the last count file write, and the table snapshots taken with it
+        tables/NAME.GAME.ckpt: learning agents' tables as of the checkpoint at game GAME
+        quarantine.jsonl: the run's failed games (see TrialRun.quarantine)
+Functionalities:
+    Checkpoints: table snapshots are copied first, then campaign.json is replaced atomically to point at them,
+    so a crash at any point leaves the last whole checkpoint (older snapshots are deleted after)
+    Resuming: restores the statistics and puts the snapshotted tables back, so the run continues from the next
+    game exactly as if it hadn't stopped (game i is always played with seed + i, so no generator state is lost);
+    games failed after the checkpoint are dropped from the quarantine, as they'll be played again
+    Settings which change a game's outcome (names in order, overrides, card range, lives, tries, decks) must match
+    to resume
+'''
+class Campaign:
+
+    STATE = "campaign.json"
+    TABLES = "tables"
+
+    def __init__(self, directory, resume = False, every = Trials.CHECKPOINT_EVERY):
+        self.directory = directory
+        self.resume = resume
+        self.every = every
+        self.tables = {}
+        os.makedirs(os.path.join(directory, Campaign.TABLES), exist_ok = True)
+        if not resume and os.path.exists(self.path(Campaign.STATE)):
+            raise ValueError("{} already holds a campaign, resume it with --resume!".format(directory))
+        if resume and not os.path.exists(self.path(Campaign.STATE)):
+            raise ValueError("{} holds no campaign to resume!".format(directory))
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def learners(self, names):
+        return [name for name in names if Strategies.Q_LEARN in name or Strategies.Q_APPROXIMATE in name]
+
+    def settings(self, trial):
+        return {"names": trial.names, "overrides": trial.overrides, "cardRange": trial.cardRange, "numLives": trial.numLives,
+            "powerTries": trial.powerTries, "numDecks": trial.numDecks}
+
+    def copy(self, source, target):
+        # copied beside the target and renamed over it, so the target is never partial
+        shutil.copyfile(source, target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+    def save(self, trial):
+        tables = {}
+        for name in self.learners(trial.names):
+            if os.path.exists(Checkpoint.path(name)):
+                tables[name] = os.path.join(Campaign.TABLES, "{}.{}{}".format(name, trial.next, Checkpoints.SUFFIX))
+                self.copy(Checkpoint.path(name), self.path(tables[name]))
+        state = {
+            "settings": self.settings(trial), "numTrials": trial.numTrials, "seed": trial.seed, "next": trial.next,
+            "played": trial.played, "stats": trial.stats.getState(), "recent": trial.recent, "tables": tables,
+        }
+        with open(self.path(Campaign.STATE + ".tmp"), "w") as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(self.path(Campaign.STATE + ".tmp"), self.path(Campaign.STATE))
+        for (name, table) in self.tables.items():
+            if tables.get(name) != table and os.path.exists(self.path(table)):
+                os.remove(self.path(table))
+        self.tables = tables
+
+    def restore(self, trial):
+        with open(self.path(Campaign.STATE)) as file:
+            state = json.load(file)
+        if state["settings"] != self.settings(trial):
+            raise ValueError("Campaign was run with {}, not {}!".format(state["settings"], self.settings(trial)))
+        trial.seed = state["seed"]
+        trial.next = state["next"]
+        trial.played = state["played"]
+        trial.stats.setState(state["stats"])
+        trial.recent = state["recent"]
+        self.tables = state["tables"]
+        os.makedirs(Learning.Q_DIREC, exist_ok = True)
+        for (name, table) in self.tables.items():
+            self.copy(self.path(table), Checkpoint.path(name))
+        # tables saved after the checkpoint, by games which will now be replayed, are dropped
+        for name in self.learners(trial.names):
+            if name not in self.tables and os.path.exists(Checkpoint.path(name)):
+                os.remove(Checkpoint.path(name))
+        if os.path.exists(self.path(Trials.QUARANTINE_FILE)):
+            with open(self.path(Trials.QUARANTINE_FILE)) as file:
+                failures = [line for line in file if json.loads(line)["game"] < trial.next]
+            with open(self.path(Trials.QUARANTINE_FILE), "w") as file:
+                file.writelines(failures)
+
+    def due(self, previous, current):
+        # whether a checkpoint boundary was crossed going from game previous to game current
+        return current // self.every > previous // self.every
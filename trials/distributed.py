@@ -0,0 +1,204 @@
+'''
+File for distributing TRIAL games across machines (Coordinator and Worker classes).
+'''
+
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import socket
+import time
+from collections import deque
+
+from trials.runner import tryTask
+from utils.constants import Distribution
+from utils.protocol import Protocol
+
+'''
+Coordinator hands a trial run's games out to workers over TCP and collects the results:
+    Settings: address to listen on (port 0 picks a free one), games per chunk, lease time, local workers to spawn
+    State: chunks waiting to be handed out, chunks leased (to which connection, until when), chunks done but not
+    yet recorded, workers connected (and the most at once, for the report)
+    Workers ask for work, are sent a chunk of the run's tasks (game i with seed + i, see TrialRun.task) and
+    reply with each game's standings or error
+Functionalities:
+    Results are recorded into the trial in game order, holding back chunks which finish early, so statistics,
+    count file, quarantine, stopping rule and campaign checkpoints all behave as in a serial run
+    A worker's chunks go back on the queue when it disconnects, and a chunk out on lease for too long (a worker
+    on a machine which went away without closing the connection) is handed to the next idle worker as well;
+    whichever copy finishes first is recorded and later copies are ignored
+    Once the run is done (or the stopping rule is satisfied), waiting workers are told to stop and the rest
+    are disconnected
+'''
+class Coordinator:
+
+    def __init__(self, host = Distribution.HOST, port = Distribution.PORT, chunk = Distribution.CHUNK,
+            lease = Distribution.LEASE, spawn = 0):
+        self.host = host
+        self.port = port
+        self.chunk = chunk
+        self.lease = lease
+        self.spawn = spawn
+        self.workers = 0
+        self.peak = 0
+
+    def run(self, trial):
+        asyncio.run(self.serve(trial))
+
+    async def serve(self, trial):
+        self.trial = trial
+        self.queue = deque([(start, min(start + self.chunk, trial.numTrials))
+            for start in range(trial.next, trial.numTrials, self.chunk)])
+        self.leases = {}
+        self.completed = {}
+        self.connections = set()
+        self.changed = asyncio.Condition()
+        self.done = not self.queue
+
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        port = server.sockets[0].getsockname()[1]
+        processes = [multiprocessing.Process(target = Worker("localhost", port).run) for _ in range(self.spawn)]
+        for process in processes:
+            process.start()
+        try:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.done)
+        finally:
+            server.close()
+            for writer in list(self.connections):
+                writer.close()
+            await server.wait_closed()
+            for process in processes:
+                process.join()
+
+    async def handle(self, reader, writer):
+        self.workers += 1
+        self.peak = max(self.peak, self.workers)
+        self.connections.add(writer)
+        held = set()
+        try:
+            while True:
+                message = await Protocol.read(reader)
+                if message is None:
+                    break
+                if message["type"] == Protocol.DONE:
+                    held.discard(message["start"])
+                    await self.complete(message["start"], message["results"])
+                elif message["type"] != Protocol.READY:
+                    raise ValueError("Unknown message type {}!".format(message["type"]))
+                chunk = await self.lend(writer)
+                if chunk is None:
+                    await Protocol.write(writer, {"type": Protocol.STOP})
+                    break
+                held.add(chunk[0])
+                await Protocol.write(writer, {"type": Protocol.WORK, "start": chunk[0],
+                    "tasks": [self.trial.task(i) for i in range(*chunk)]})
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.workers -= 1
+            self.connections.discard(writer)
+            writer.close()
+            await self.release(writer, held)
+
+    async def lend(self, writer):
+        # the next chunk for an idle worker: a queued one, else one whose lease ran out, else wait for either
+        async with self.changed:
+            while not self.done:
+                if self.queue:
+                    chunk = self.queue.popleft()
+                else:
+                    now = time.monotonic()
+                    expired = [start for (start, (_, _, until)) in self.leases.items() if until <= now]
+                    if not expired:
+                        with contextlib.suppress(asyncio.TimeoutError):
+                            await asyncio.wait_for(self.changed.wait(), Distribution.POLL)
+                        continue
+                    start = min(expired)
+                    chunk = (start, self.leases[start][0])
+                self.leases[chunk[0]] = (chunk[1], writer, time.monotonic() + self.lease)
+                return chunk
+            return None
+
+    async def release(self, writer, held):
+        # chunks a disconnected worker was still playing go back to the front of the queue
+        async with self.changed:
+            for start in sorted(held, reverse = True):
+                lease = self.leases.get(start)
+                if lease is not None and lease[1] is writer:
+                    del self.leases[start]
+                    self.queue.appendleft((start, lease[0]))
+            self.changed.notify_all()
+
+    async def complete(self, start, results):
+        async with self.changed:
+            if start < self.trial.next or start in self.completed or self.done:
+                return
+            self.leases.pop(start, None)
+            self.queue = deque([chunk for chunk in self.queue if chunk[0] != start])
+            self.completed[start] = results
+            while self.trial.next in self.completed and not self.done:
+                first = self.trial.next
+                results = self.completed.pop(first)
+                for (i, (standings, error)) in enumerate(results):
+                    self.trial.record(standings, error, self.trial.task(first + i), first + i)
+                    if self.trial.finished():
+                        self.done = True
+                        break
+                self.trial.advance(first + len(results))
+                self.done = self.done or self.trial.next >= self.trial.numTrials
+            self.changed.notify_all()
+
+'''
+Worker plays chunks of games for a coordinator, one at a time:
+    Settings: coordinator's address, local processes to run (each with its own connection)
+Functionalities:
+    Asks for work, plays every task in it quietly (see tryTask, failures are sent back rather than raised) and
+    sends the results with the next request, until told to stop or disconnected
+    Retries connecting for a while, so workers can be started before their coordinator
+Learning agents' tables are read and written in the worker's own directory, as in a process pool.
+'''
+class Worker:
+
+    def __init__(self, host, port, processes = 1):
+        self.host = host
+        self.port = port
+        self.processes = processes
+
+    def connect(self):
+        for attempt in range(Distribution.CONNECT_TRIES):
+            try:
+                return socket.create_connection((self.host, self.port))
+            except ConnectionRefusedError:
+                if attempt == Distribution.CONNECT_TRIES - 1:
+                    raise
+                time.sleep(Distribution.POLL)
+
+    def run(self):
+        if self.processes > 1:
+            processes = [multiprocessing.Process(target = Worker(self.host, self.port).run) for _ in range(self.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            return
+        with contextlib.closing(self.connect()) as connection, connection.makefile("rwb") as stream, \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            reply = {"type": Protocol.READY}
+            while True:
+                try:
+                    stream.write(Protocol.encode(reply))
+                    stream.flush()
+                    line = stream.readline()
+                except ConnectionError:
+                    return
+                if not line:
+                    return
+                message = Protocol.decode(line)
+                if message["type"] != Protocol.WORK:
+                    return
+                results = []
+                for task in message["tasks"]:
+                    _, standings, error = tryTask(tuple(task))
+                    results.append((standings, error))
+                reply = {"type": Protocol.DONE, "start": message["start"], "results": results}
@@ -0,0 +1,95 @@
+'''
+File for Duplicate class (duplicate-deal evaluation).
+'''
+
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from trials.runner import parseAgent
+from trials.runner import playTask
+from utils.constants import Tournaments
+
+'''
+Duplicate evaluates a lineup the way duplicate bridge does:
+    Settings:
+        Agent specs, game settings (card range, lives, power tries, decks), number of deals, whether to use every
+        seat permutation (rather than just rotations), worker count, base seed
+    Each deal is a deal seed: the deck gets its own generator, so every round's deal and power draws
+    are the same however the game goes. Each deal is replayed once per seating of the lineup, and
+    players also share their seed across seatings, so the luck of the cards is shared by every agent.
+Functionalities:
+    Runs deals x seatings games across a process pool
+    Scores each agent per deal (mean finish over the seatings), then averages over deals
+    Reports each agent's mean finish and win rate with duplicate standard errors, paired differences
+    between agents, and the variance reduction against treating the same games as independent
+'''
+class Duplicate:
+
+    def __init__(self, specs, cardRange, numLives, powerTries, numDeals, permute = False,
+            workers = Tournaments.WORKERS, seed = 0, numDecks = 1):
+        parsed = [parseAgent(spec) for spec in specs]
+        self.names = [name for (name, _) in parsed]
+        self.overrides = {name: overrides for (name, overrides) in parsed if overrides}
+        self.cardRange = cardRange
+        self.numLives = numLives
+        self.powerTries = powerTries
+        self.numDecks = numDecks
+        self.numDeals = numDeals
+        self.workers = workers
+        self.seed = seed
+        if permute:
+            self.seatings = list(itertools.permutations(self.names))
+        else:
+            self.seatings = [tuple(self.names[shift:] + self.names[:shift]) for shift in range(len(self.names))]
+        # finishes[name][deal, seating] is the place the agent finished in that game
+        self.finishes = {name: np.zeros((numDeals, len(self.seatings))) for name in self.names}
+
+    def tasks(self):
+        for deal in range(self.numDeals):
+            for seating in self.seatings:
+                yield (
+                    seating, self.cardRange, self.numLives, self.powerTries, self.seed + deal,
+                    {name: self.overrides[name] for name in seating if name in self.overrides}, self.seed + deal,
+                    self.numDecks
+                )
+
+    def run(self):
+        with multiprocessing.Pool(self.workers) as pool:
+            for (task, standings) in pool.imap_unordered(playTask, self.tasks()):
+                deal = task[6] - self.seed
+                seating = self.seatings.index(task[0])
+                for (place, name) in enumerate(standings):
+                    self.finishes[name][deal, seating] = place + 1
+        return self.report()
+
+    def summary(self, name):
+        finishes = self.finishes[name]
+        dealMeans = finishes.mean(axis = 1)
+        dealWins = (finishes == 1).mean(axis = 1)
+        games = finishes.size
+        duplicateError = dealMeans.std(ddof = 1) / np.sqrt(self.numDeals)
+        independentError = finishes.std(ddof = 1) / np.sqrt(games)
+        return {
+            "finish": dealMeans.mean(), "finishError": duplicateError,
+            "wins": dealWins.mean(), "winsError": dealWins.std(ddof = 1) / np.sqrt(self.numDeals),
+            "reduction": (independentError / duplicateError) ** 2 if duplicateError else float("inf"),
+        }
+
+    def report(self):
+        lines = ["Deals: {}, seatings per deal: {}, games: {}".format(
+            self.numDeals, len(self.seatings), self.numDeals * len(self.seatings)
+        )]
+        for name in sorted(self.names, key = lambda name: self.finishes[name].mean()):
+            summary = self.summary(name)
+            lines.append("\t{}: finish {:.3f} +/- {:.3f}, wins {:.3f} +/- {:.3f}, variance reduction x{:.1f}".format(
+                name, summary["finish"], summary["finishError"], summary["wins"], summary["winsError"], summary["reduction"]
+            ))
+        lines.append("Paired finish differences (per deal):")
+        for (first, second) in itertools.combinations(self.names, 2):
+            diffs = self.finishes[first].mean(axis = 1) - self.finishes[second].mean(axis = 1)
+            lines.append("\t{} - {}: {:.3f} +/- {:.3f}".format(
+                first, second, diffs.mean(), diffs.std(ddof = 1) / np.sqrt(self.numDeals)
+            ))
+        return "\n".join(lines)
@@ -0,0 +1,155 @@
+'''
+File for incremental rating systems (Elo and TrueSkill) over multi-player game standings.
+'''
+
+import math
+
+import numpy as np
+
+from utils.constants import Ratings
+
+'''
+Abstract class for ratings.
+A game's standings are a ranking of every player at the table, so each system treats a game as
+the set of pairwise results it implies. Ratings are kept per agent name and updated game by game.
+Functionalities:
+    update: take the standings of one game (first place first) and update every rating
+    interval: (low, high) confidence interval for an agent's rating at a given z
+    separated: whether two agents' intervals no longer overlap
+'''
+class Rating:
+
+    def __init__(self, names):
+        self.games = {name: 0 for name in names}
+
+    def update(self, standings):
+        pass
+
+    def estimate(self, name):
+        pass
+
+    def error(self, name):
+        pass
+
+    def interval(self, name, z):
+        return (self.estimate(name) - z * self.error(name), self.estimate(name) + z * self.error(name))
+
+    def separated(self, first, second, z):
+        firstLow, firstHigh = self.interval(first, z)
+        secondLow, secondHigh = self.interval(second, z)
+        return firstLow > secondHigh or secondLow > firstHigh
+
+    def ranking(self):
+        return sorted(self.games, key = self.estimate, reverse = True)
+
+'''
+Multi-player Elo: every ordered pair in the standings is scored as a win for the higher finisher.
+Ratings are the Bradley-Terry fit of every pairwise result so far, on the Elo scale (a 400 point gap is 10:1 odds)
+and centred on the base rating, rather than fixed-K online updates, which never settle (each game moves a rating by
+about K * sqrt(p(1 - p))), so their spread can't be told from the games alone:
+    Refit lazily (only when asked for after new games) by Newton's method, from the last fit
+    A Gaussian prior (Ratings.ELO_PRIOR points) keeps an agent which has never lost (or won) finite
+    Errors come from the inverse of the fit's information matrix, centred as the ratings are, so they account
+    for the uncertainty of the opponents' ratings too; the pairs of one game are treated as independent results
+'''
+class Elo(Rating):
+
+    def __init__(self, names, base = Ratings.ELO_BASE, prior = Ratings.ELO_PRIOR):
+        Rating.__init__(self, names)
+        self.base = base
+        self.index = {name: i for (i, name) in enumerate(names)}
+        # the fit is in natural units (log odds), converted to points on the way out
+        self.scale = 400 / math.log(10)
+        self.precision = (self.scale / prior) ** 2
+        self.wins = np.zeros((len(names), len(names)))
+        self.strengths = np.zeros(len(names))
+        self.errors = np.full(len(names), prior)
+        self.fitted = True
+
+    def update(self, standings):
+        for i in range(len(standings)):
+            for j in range(i + 1, len(standings)):
+                self.wins[self.index[standings[i]], self.index[standings[j]]] += 1
+        for name in standings:
+            self.games[name] += 1
+        self.fitted = False
+
+    def derivatives(self, strengths, played, scores):
+        # the information matrix (negative Hessian of the log posterior) and gradient at the given strengths
+        expected = 1 / (1 + np.exp(strengths[None, :] - strengths[:, None]))
+        weights = played * expected * (1 - expected)
+        information = np.diag(weights.sum(axis = 1)) - weights + self.precision * np.eye(len(strengths))
+        return information, scores - (played * expected).sum(axis = 1) - self.precision * strengths
+
+    def fit(self):
+        if self.fitted:
+            return
+        played = self.wins + self.wins.T
+        scores = self.wins.sum(axis = 1)
+        for _ in range(Ratings.ELO_ITERATIONS):
+            information, gradient = self.derivatives(self.strengths, played, scores)
+            step = np.linalg.solve(information, gradient)
+            self.strengths = self.strengths + step
+            if np.abs(step).max() < 1e-9:
+                break
+        # ratings are centred on the base, so only their differences carry uncertainty
+        information, _ = self.derivatives(self.strengths, played, scores)
+        centre = np.eye(len(self.strengths)) - 1 / len(self.strengths)
+        self.errors = self.scale * np.sqrt(np.diag(centre @ np.linalg.inv(information) @ centre))
+        self.fitted = True
+
+    def estimate(self, name):
+        self.fit()
+        return self.base + self.scale * float(self.strengths[self.index[name]] - self.strengths.mean())
+
+    def error(self, name):
+        self.fit()
+        return float(self.errors[self.index[name]])
+
+'''
+TrueSkill with the standings decomposed into adjacent pairs (first vs second, second vs third...),
+the usual approximation to the full factor graph for free-for-all games. No draws are possible.
+Each agent is a Gaussian (mu, sigma): the estimate is mu and the error is sigma.
+'''
+class TrueSkill(Rating):
+
+    def __init__(self, names, mu = Ratings.MU, sigma = Ratings.SIGMA, beta = Ratings.BETA, tau = Ratings.TAU):
+        Rating.__init__(self, names)
+        self.beta = beta
+        self.tau = tau
+        self.mus = {name: mu for name in names}
+        self.sigmas = {name: sigma for name in names}
+
+    def update(self, standings):
+        for name in standings:
+            self.sigmas[name] = math.sqrt(self.sigmas[name] ** 2 + self.tau ** 2)
+            self.games[name] += 1
+        for i in range(len(standings) - 1):
+            winner, loser = standings[i], standings[i + 1]
+            c = math.sqrt(2 * self.beta ** 2 + self.sigmas[winner] ** 2 + self.sigmas[loser] ** 2)
+            t = (self.mus[winner] - self.mus[loser]) / c
+            # v and w are the truncated Gaussian mean and variance corrections
+            pdf = math.exp(-t * t / 2) / math.sqrt(2 * math.pi)
+            cdf = (1 + math.erf(t / math.sqrt(2))) / 2
+            v = pdf / max(cdf, 1e-12)
+            w = v * (v + t)
+            for (name, sign) in ((winner, 1), (loser, -1)):
+                variance = self.sigmas[name] ** 2
+                self.mus[name] += sign * variance / c * v
+                self.sigmas[name] = math.sqrt(variance * max(1 - variance / c ** 2 * w, 1e-6))
+
+    def estimate(self, name):
+        return self.mus[name]
+
+    def error(self, name):
+        return self.sigmas[name]
+
+'''
+Method for choosing a rating system by its name in Ratings.
+'''
+def chooseRating(system, names):
+    if system == Ratings.ELO:
+        return Elo(names)
+    elif system == Ratings.TRUESKILL:
+        return TrueSkill(names)
+    raise ValueError("Unknown rating system {}!".format(system))
@@ -0,0 +1,121 @@
+'''
+File for running individual seeded games, shared by trial, tournament and evaluation modes.
+'''
+
+import ast
+import contextlib
+import json
+import os
+import random
+import traceback
+
+import numpy as np
+
+from logic.core import CoreRound
+from logic.decision import Decider
+from logic.game import Game
+from logic.round import Round
+from utils.cache import DecisionCache
+
+'''
+Splits an agent spec into its name and attribute overrides.
+Specs look like NAME or NAME:attr=value,attr=value, e.g. Q_LEARN_fast:alpha=0.3,epsilon=0.5,
+so that variants of one strategy (different Learning hyperparameters) can share a table.
+'''
+def parseAgent(spec):
+    if ":" not in spec:
+        return spec, {}
+    name, settings = spec.split(":", 1)
+    overrides = {}
+    for setting in settings.split(","):
+        attr, value = setting.split("=", 1)
+        overrides[attr] = ast.literal_eval(value)
+    return name, overrides
+
+'''
+Plays a single game whose randomness is fully determined by the seed.
+Both the random module and numpy's global state are seeded, since players draw from both.
+Overrides map player names to attributes set on the player once the game has created it.
+A deal seed gives the deck its own generator, so the deals and power draws are identical for every
+game sharing that seed whatever the players do (used for duplicate evaluation).
+The deck can be several decks shuffled together (see Game).
+Returns the final standings, first place first.
+'''
+def playTrial(names, cardRange, numLives, powerTries, seed, overrides = {}, quiet = True, dealSeed = None, numDecks = 1):
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        dealRng = random.Random(dealSeed) if dealSeed is not None else None
+        # quiet games have no output to give, so play on the silent core
+        game = Game(list(names), cardRange, numLives, powerTries, dealRng = dealRng, roundType = CoreRound if quiet else Round,
+            numDecks = numDecks
+        )
+        applyOverrides(game, overrides)
+        game.playGame()
+    return game.standings
+
+'''
+Sets each player's attribute overrides (see parseAgent) once the game has created them.
+'''
+def applyOverrides(game, overrides):
+    for player in game.players:
+        for (attr, value) in overrides.get(player.name, {}).items():
+            if not hasattr(player, attr):
+                raise AttributeError("{} has no setting {}!".format(player.name, attr))
+            setattr(player, attr, value)
+
+'''
+Pool-friendly wrapper around playTrial: takes a single task tuple, returns (task, standings).
+Tasks are (names, card range, lives, power tries, seed, overrides, deal seed, decks).
+'''
+def playTask(task):
+    names, cardRange, numLives, powerTries, seed, overrides, dealSeed, numDecks = task
+    return task, playTrial(names, cardRange, numLives, powerTries, seed, overrides, dealSeed = dealSeed, numDecks = numDecks)
+
+'''
+Like playTask, but failures are returned instead of raised, so one bad game can't end a long run.
+Returns (task, standings, error) with exactly one of standings and error set.
+'''
+def tryTask(task):
+    try:
+        _, standings = playTask(task)
+        return task, standings, None
+    except Exception as e:
+        return task, None, "{}: {}".format(type(e).__name__, e)
+
+'''
+Like tryTask, but also returns the process's decision cache counters (see utils/cache.py) and decisions by strategy
+(see Decider.tally), which pool workers would otherwise keep to themselves.
+Returns (task, standings, error, process id, counters, decisions).
+'''
+def countTask(task):
+    task, standings, error = tryTask(task)
+    return task, standings, error, os.getpid(), DecisionCache.counts(), Decider.tally()
+
+'''
+Replays quarantined games (see TrialRun.quarantine) from a quarantine file, optionally only the given game,
+with their game output, so a failure can be reproduced and debugged.
+Returns a report line per game: the traceback if it still fails, otherwise that it no longer does.
+Games quarantined without a seed (concurrent runs) can't be replayed.
+'''
+def replayFailures(path, game = None):
+    lines = []
+    with open(path) as file:
+        failures = [json.loads(line) for line in file if line.strip()]
+    for failure in failures:
+        if game is not None and failure["game"] != game:
+            continue
+        lines.append("Game {} (seed {}), quarantined with {}:".format(failure["game"], failure["seed"], failure["error"]))
+        if failure["seed"] is None:
+            lines.append("\tNot seeded, can't be replayed")
+            continue
+        try:
+            playTrial(failure["names"], failure["cardRange"], failure["numLives"], failure["powerTries"], failure["seed"],
+                failure["overrides"], quiet = False, dealSeed = failure["dealSeed"], numDecks = failure.get("numDecks", 1)
+            )
+            lines.append("\tNo longer fails")
+        except Exception:
+            lines.append(traceback.format_exc())
+    return "\n".join(lines)
@@ -0,0 +1,83 @@
+'''
+File for streaming trial statistics and sequential stopping rules.
+'''
+
+import math
+
+'''
+Class for running trial statistics, updated one game at a time:
+    Per player: games played, wins, and mean / sum of squared deviations of finishing place (Welford)
+Functionalities:
+    Win rates with Wilson score half-widths, mean finishes with normal half-widths
+    Nothing is stored per game, so memory stays constant however long the run
+    The state is plain numbers keyed by name, so it can be saved with a campaign (see campaign.py)
+'''
+class TrialStats:
+
+    def __init__(self, names):
+        self.games = 0
+        self.counts = {name: 0 for name in names}
+        self.wins = {name: 0 for name in names}
+        self.means = {name: 0.0 for name in names}
+        self.squares = {name: 0.0 for name in names}
+
+    def record(self, standings):
+        self.games += 1
+        self.wins[standings[0]] += 1
+        for (place, name) in enumerate(standings):
+            self.counts[name] += 1
+            delta = (place + 1) - self.means[name]
+            self.means[name] += delta / self.counts[name]
+            self.squares[name] += delta * ((place + 1) - self.means[name])
+
+    def getState(self):
+        return {"games": self.games, "counts": self.counts, "wins": self.wins, "means": self.means, "squares": self.squares}
+
+    def setState(self, state):
+        vars(self).update(state)
+
+    def winRate(self, name):
+        if not self.counts[name]:
+            return 0.0
+        return self.wins[name] / self.counts[name]
+
+    def winBound(self, name, z):
+        n = self.counts[name]
+        if not n:
+            return float("inf")
+        p = self.winRate(name)
+        return z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+
+    def finish(self, name):
+        return self.means[name]
+
+    def finishBound(self, name, z):
+        n = self.counts[name]
+        if n < 2:
+            return float("inf")
+        return z * math.sqrt(self.squares[name] / (n - 1) / n)
+
+'''
+Class for the sequential stopping rule used by adaptive trial runs:
+    Settings: target precision, confidence z, minimum number of games, how often to check
+Stops once every player's win rate is known to within the precision (Wilson half-width) and their
+mean finish to within precision * (players - 1), i.e. the same precision relative to the range of
+places. Checking only every few games keeps the repeated looks from stopping on a lucky streak.
+'''
+class SequentialStop:
+
+    def __init__(self, precision, z, minGames, every):
+        self.precision = precision
+        self.z = z
+        self.minGames = minGames
+        self.every = every
+
+    def done(self, stats):
+        if stats.games < self.minGames or stats.games % self.every:
+            return False
+        names = list(stats.counts)
+        finishPrecision = self.precision * (len(names) - 1)
+        return all([
+            stats.winBound(name, self.z) <= self.precision and stats.finishBound(name, self.z) <= finishPrecision
+            for name in names
+        ])
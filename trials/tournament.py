@@ -0,0 +1,134 @@
+'''
+File for Tournament class.
+'''
+
+import itertools
+import json
+import multiprocessing
+
+from trials.ratings import chooseRating
+from trials.runner import parseAgent
+from trials.runner import tryTask
+from utils.constants import Tournaments
+from utils.constants import Trials
+
+'''
+Tournament ranks many agents against each other with incremental ratings:
+    Settings:
+        Agent specs (see runner.parseAgent), table size, format (round robin or Swiss), rating system
+        Game settings (card range, lives, power tries, decks), worker count, game budget, confidence z
+    State:
+        Ratings, games played and failed, next seed (game i is played with seed + i)
+Functionalities:
+    Scheduling, in batches:
+        Round robin: every lineup of tableSize agents which still contains an undecided pair
+        Swiss: agents sorted by rating and cut into neighbouring tables, offset each batch
+        Every scheduled lineup is played in all of its seat rotations, so no agent keeps a seat
+    Running: games are spread over a process pool and results are rated in scheduling order, since incremental
+    ratings depend on order, so a seeded run gives the same ratings with any number of workers
+    Failures: a game that raises is skipped and quarantined (see TrialRun.quarantine), so REPLAY can reproduce it
+    Stopping: once every pair of agents adjacent in the ranking has separated confidence
+    intervals (or the game budget is spent), since further games can't change the ranking
+'''
+class Tournament:
+
+    def __init__(self, specs, tableSize, cardRange, numLives, powerTries, system, form = Tournaments.ROUND_ROBIN,
+            workers = Tournaments.WORKERS, maxGames = Tournaments.MAX_GAMES, z = Tournaments.Z, seed = 0, numDecks = 1):
+        parsed = [parseAgent(spec) for spec in specs]
+        self.names = [name for (name, _) in parsed]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Tournament agents must have distinct names!")
+        if tableSize > len(self.names):
+            raise ValueError("Table size can't exceed the number of agents!")
+        self.overrides = {name: overrides for (name, overrides) in parsed if overrides}
+        self.tableSize = tableSize
+        self.cardRange = cardRange
+        self.numLives = numLives
+        self.powerTries = powerTries
+        self.numDecks = numDecks
+        self.form = form
+        self.workers = workers
+        self.maxGames = maxGames
+        self.z = z
+        self.seed = seed
+        self.rating = chooseRating(system, self.names)
+        self.played = 0
+        self.failed = 0
+        self.batches = 0
+
+    def undecided(self):
+        ranking = self.rating.ranking()
+        return set([
+            frozenset((ranking[i], ranking[i + 1])) for i in range(len(ranking) - 1)
+            if not self.rating.separated(ranking[i], ranking[i + 1], self.z)
+        ])
+
+    def finished(self):
+        return self.played >= self.maxGames or not self.undecided()
+
+    def schedule(self):
+        undecided = self.undecided()
+        if self.form == Tournaments.SWISS:
+            ranking = self.rating.ranking()
+            offset = self.batches % self.tableSize
+            ordered = ranking[offset:] + ranking[:offset]
+            lineups = [
+                tuple(ordered[i:i + self.tableSize]) for i in range(0, len(ordered) - self.tableSize + 1, self.tableSize)
+            ]
+        else:
+            lineups = list(itertools.combinations(self.names, self.tableSize))
+        # only spend games on tables where some pair is still undecided
+        lineups = [
+            lineup for lineup in lineups
+            if any([frozenset(pair) in undecided for pair in itertools.combinations(lineup, 2)])
+        ]
+        self.batches += 1
+        tasks = []
+        for lineup in lineups:
+            for _ in range(Tournaments.BATCH):
+                for shift in range(self.tableSize):
+                    seated = lineup[shift:] + lineup[:shift]
+                    tasks.append((
+                        seated, self.cardRange, self.numLives, self.powerTries, self.seed + self.played + len(tasks),
+                        {name: self.overrides[name] for name in seated if name in self.overrides}, None, self.numDecks
+                    ))
+        return tasks[:self.maxGames - self.played]
+
+    def run(self):
+        with multiprocessing.Pool(self.workers) as pool:
+            while not self.finished():
+                tasks = self.schedule()
+                if not tasks:
+                    break
+                for (task, standings, error) in pool.imap(tryTask, tasks):
+                    if error is None:
+                        self.rating.update(standings)
+                    else:
+                        self.quarantine(task, error)
+                    self.played += 1
+        return self.report()
+
+    def quarantine(self, task, error):
+        names, cardRange, numLives, powerTries, seed, overrides, dealSeed, numDecks = task
+        self.failed += 1
+        with open(Trials.QUARANTINE_FILE, "a") as file:
+            file.write(json.dumps({
+                "game": self.played, "seed": seed, "names": list(names), "cardRange": cardRange, "numLives": numLives,
+                "powerTries": powerTries, "overrides": overrides, "dealSeed": dealSeed, "numDecks": numDecks, "error": error,
+            }) + "\n")
+
+    def report(self):
+        lines = ["Games played: {}".format(self.played)]
+        if self.failed:
+            lines.append("Failed games: {}, quarantined in {} (see REPLAY in play.py)".format(
+                self.failed, Trials.QUARANTINE_FILE
+            ))
+        for (place, name) in enumerate(self.rating.ranking()):
+            low, high = self.rating.interval(name, self.z)
+            lines.append("\t{}) {}: {:.2f} [{:.2f}, {:.2f}] over {} games".format(
+                place + 1, name, self.rating.estimate(name), low, high, self.rating.games[name]
+            ))
+        undecided = self.undecided()
+        if undecided:
+            lines.append("Undecided: {}".format(", ".join([" vs ".join(sorted(pair)) for pair in undecided])))
+        return "\n".join(lines)
@@ -0,0 +1,281 @@
+'''
+File for TrialRun class, which runs TRIAL mode.
+'''
+
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import threading
+
+from numpy import mean
+
+from logic.core import CoreRound
+from logic.decision import BatchDecider
+from logic.decision import Decider
+from logic.game import Game
+from players.batch import PolicyServer
+from trials.runner import applyOverrides
+from trials.runner import countTask
+from trials.runner import parseAgent
+from trials.runner import playTrial
+from trials.sequential import TrialStats
+from utils.cache import DecisionCache
+from utils.constants import Trials
+
+'''
+TrialRun plays many games between a fixed set of players (seats shuffled every game):
+    Settings passed down from play.py:
+        Agent specs (see runner.parseAgent, i.e. CFR:strategy='path'), card range, lives, power tries, number of trials, write step, number of decks
+        Workers (1 plays in this process with game output, more use a quiet process pool)
+        Concurrent games (more than 1 plays that many quiet games at once in threads of this process, sharing
+        a policy server so model-based decisions are batched across games, see players/batch.py)
+        Optional stopping rule (see sequential.py), base seed (game i uses seed + i, drawn at random if not given)
+        Optional campaign (see campaign.py), which checkpoints the run so it can be resumed
+        Optional coordinator (see distributed.py), which plays the games on workers elsewhere in place of workers here
+    State: streaming statistics, finishes since the last progress write, games attempted, next game to play,
+    latest decision cache counters and decisions by strategy of each pool worker (see utils/cache.py and
+    Decider.tally), games handed to the pool and not yet back
+Functionalities:
+    Writes progress (and failed games) to the count file every write step, as TRIAL always has
+    Quarantines failed games: one JSON line each (game, seed, seating, settings, error) in the quarantine file,
+    in the campaign's directory if there is one, so they can be replayed (REPLAY in play.py)
+    Stops early once the stopping rule is satisfied, reporting how many games that saved
+    Collects its metrics for the live endpoint (see MetricsServer in utils/metrics.py) from what it already keeps
+'''
+class TrialRun:
+
+    def __init__(self, specs, cardRange, numLives, powerTries, numTrials, writeStep, workers = 1, stop = None, seed = None,
+            concurrent = 1, campaign = None, coordinator = None, numDecks = 1):
+        parsed = [parseAgent(spec) for spec in specs]
+        self.names = [name for (name, _) in parsed]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Trial players must have distinct names!")
+        self.overrides = {name: overrides for (name, overrides) in parsed if overrides}
+        self.cardRange = cardRange
+        self.numLives = numLives
+        self.powerTries = powerTries
+        self.numTrials = numTrials
+        self.writeStep = writeStep
+        self.workers = workers
+        self.stop = stop
+        self.seed = seed
+        self.concurrent = concurrent
+        self.campaign = campaign
+        self.coordinator = coordinator
+        self.numDecks = numDecks
+        self.server = None
+        self.stats = TrialStats(self.names)
+        self.recent = {name: [] for name in self.names}
+        self.played = 0
+        self.next = 0
+        self.caches = {}
+        self.decisions = {}
+        self.queued = 0
+
+    def log(self, text):
+        with open(Trials.COUNT_FILE, "a") as f:
+            f.write(text)
+
+    def progress(self):
+        self.log("Iteration: {}\n Wins by Player: {}\n Average Finish (last {}): {}\n"
+            .format(self.played, self.stats.wins, self.writeStep, {name: mean(stand) for (name, stand) in self.recent.items() if stand}))
+        self.recent = {name: [] for name in self.names}
+
+    def record(self, standings, error, task, index):
+        if self.played != 0 and self.played % self.writeStep == 0:
+            self.progress()
+        if error is None:
+            self.stats.record(standings)
+            for (place, name) in enumerate(standings):
+                self.recent[name].append(place + 1)
+        else:
+            self.log("Iteration {}: {}\n".format(self.played, error))
+            self.quarantine(task, index, error)
+        self.played += 1
+
+    def quarantine(self, task, index, error):
+        names, cardRange, numLives, powerTries, seed, overrides, dealSeed, numDecks = task
+        with open(self.quarantinePath(), "a") as file:
+            file.write(json.dumps({
+                "game": index, "seed": seed, "names": list(names), "cardRange": cardRange, "numLives": numLives,
+                "powerTries": powerTries, "overrides": overrides, "dealSeed": dealSeed, "numDecks": numDecks, "error": error,
+            }) + "\n")
+
+    def quarantinePath(self):
+        return Trials.QUARANTINE_FILE if self.campaign is None else self.campaign.path(Trials.QUARANTINE_FILE)
+
+    def advance(self, next):
+        # every game before next has been recorded, which is when a checkpoint is consistent
+        previous, self.next = self.next, next
+        if self.campaign is not None and self.campaign.due(previous, next):
+            self.campaign.save(self)
+
+    def task(self, i):
+        names = list(self.names)
+        random.Random(self.seed + i).shuffle(names)
+        return (names, self.cardRange, self.numLives, self.powerTries, self.seed + i, self.overrides, None, self.numDecks)
+
+    def finished(self):
+        return self.stop is not None and self.stop.done(self.stats)
+
+    def run(self):
+        # every game is seeded, so a failed game can be replayed and a campaign resumed from its next game
+        if self.seed is None:
+            self.seed = random.randrange(2 ** 31)
+        if self.campaign is not None:
+            if self.concurrent > 1:
+                raise ValueError("Concurrent games aren't reproducible, so can't be resumed as a campaign!")
+            if self.campaign.resume:
+                self.campaign.restore(self)
+            else:
+                self.campaign.save(self)
+        if self.coordinator is not None:
+            self.coordinator.run(self)
+        elif self.workers > 1:
+            self.runParallel()
+        elif self.concurrent > 1:
+            self.runConcurrent()
+        else:
+            self.runSerial()
+        if self.campaign is not None:
+            self.campaign.save(self)
+        return self.report()
+
+    def runSerial(self):
+        for i in range(self.next, self.numTrials):
+            task = self.task(i)
+            try:
+                standings, error = playTrial(*task[:6], quiet = False, numDecks = self.numDecks), None
+            except Exception as e:
+                standings, error = None, "{}: {}".format(type(e).__name__, e)
+            self.record(standings, error, task, i)
+            self.advance(i + 1)
+            if self.finished():
+                break
+
+    def runParallel(self):
+        # games are handed out a write step at a time, and a stop lets the batch in flight finish: results arrive
+        # out of order, so only once all of a batch is recorded can the next game to play (and a checkpoint) move
+        # past it, and a resumed campaign neither skips nor replays its games
+        with multiprocessing.Pool(self.workers) as pool:
+            for start in range(self.next, self.numTrials, self.writeStep):
+                end = min(start + self.writeStep, self.numTrials)
+                tasks = [self.task(i) for i in range(start, end)]
+                self.queued = len(tasks)
+                for (task, standings, error, pid, counts, decisions) in pool.imap_unordered(countTask, tasks):
+                    self.caches[pid] = counts
+                    self.decisions[pid] = decisions
+                    self.queued -= 1
+                    self.record(standings, error, task, task[4] - self.seed)
+                self.advance(end)
+                if self.finished():
+                    return
+
+    def runConcurrent(self):
+        # games interleave (and share the random module), so seeds don't replay them
+        self.server = PolicyServer()
+        decider = BatchDecider(self.server)
+        lock = threading.Lock()
+        games = iter(range(self.numTrials))
+        threads = [threading.Thread(target = self.playConcurrent, args = (decider, lock, games)) for _ in range(self.concurrent)]
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    def playConcurrent(self, decider, lock, games):
+        names = list(self.names)
+        self.server.join()
+        try:
+            while True:
+                with lock:
+                    i = None if self.finished() else next(games, None)
+                if i is None:
+                    return
+                random.shuffle(names)
+                try:
+                    game = Game(names.copy(), self.cardRange, self.numLives, self.powerTries, decider = decider,
+                        roundType = CoreRound, numDecks = self.numDecks
+                    )
+                    applyOverrides(game, self.overrides)
+                    game.playGame()
+                    standings, error = game.standings, None
+                except Exception as e:
+                    standings, error = None, "{}: {}".format(type(e).__name__, e)
+                with lock:
+                    # concurrent games aren't seeded, so only the seating can be quarantined
+                    self.record(standings, error,
+                        (names.copy(), self.cardRange, self.numLives, self.powerTries, None, self.overrides, None, self.numDecks), i
+                    )
+        finally:
+            self.server.leave()
+
+    def metrics(self):
+        # read from the endpoint's thread while games are recorded, so every dict is copied before it's walked
+        queues = {}
+        if self.workers > 1 and self.coordinator is None:
+            queues["pool"] = self.queued
+        if self.server is not None:
+            queues["policy_server"] = len(self.server.pending)
+        if self.coordinator is not None and hasattr(self.coordinator, "leases"):
+            queues["coordinator_chunks"] = len(self.coordinator.queue)
+            queues["coordinator_leases"] = len(self.coordinator.leases)
+        caches = DecisionCache.combine(list(self.caches.values()) + [DecisionCache.counts()])
+        wins = dict(self.stats.wins)
+        metrics = [
+            ("fodinha_games_total", "counter", "Games played (failed ones included)", None, self.played),
+            ("fodinha_games_remaining", "gauge", "Games left to play", None, self.numTrials - self.played),
+            ("fodinha_decisions_total", "counter", "Decisions by strategy (pool workers as of their last game, not "
+                "counted on distributed workers)", "strategy", Decider.combine(list(self.decisions.values()) + [Decider.tally()])),
+            ("fodinha_queue_depth", "gauge", "Games (or chunks) waiting on workers", "queue", queues),
+            ("fodinha_wins_total", "counter", "Games won by player", "player", wins),
+            ("fodinha_win_rate", "gauge", "Win rate estimate by player", "player",
+                {name: self.stats.winRate(name) for name in wins}),
+            ("fodinha_mean_finish", "gauge", "Mean finishing place by player", "player",
+                {name: self.stats.finish(name) for name in wins}),
+            ("fodinha_decision_cache_hits_total", "counter", "Decision cache hits", "cache",
+                {name: values[0] for (name, values) in caches.items()}),
+            ("fodinha_decision_cache_misses_total", "counter", "Decision cache misses", "cache",
+                {name: values[1] for (name, values) in caches.items()}),
+        ]
+        if self.stop is not None:
+            metrics.append(("fodinha_win_rate_bound", "gauge", "Half-width of the win rate interval by player", "player",
+                {name: self.stats.winBound(name, self.stop.z) for name in wins}))
+        return metrics
+
+    def report(self):
+        lines = ["Trials: {}".format(self.played)]
+        if self.coordinator is not None:
+            lines.append("Distributed to {} workers".format(self.coordinator.peak))
+        if self.played < self.numTrials:
+            lines.append("Stopped early at the target precision, saving {} of {} games.".format(
+                self.numTrials - self.played, self.numTrials
+            ))
+        if self.server is not None and self.server.batches:
+            lines.append("Batched decisions: {} in {} batches ({:.1f} per batch)".format(
+                self.server.decisions, self.server.batches, self.server.decisions / self.server.batches
+            ))
+        # failed games are played but never recorded in the statistics (which campaigns keep, so this survives a resume)
+        failed = self.played - self.stats.games
+        if failed:
+            lines.append("Failed games: {} of {}, quarantined in {} (see REPLAY in play.py)".format(
+                failed, self.played, self.quarantinePath()
+            ))
+        lines += DecisionCache.report(DecisionCache.combine(list(self.caches.values()) + [DecisionCache.counts()]))
+        lines.append("Wins by player: {}".format(self.stats.wins))
+        # players with no recorded games have no finishes to average
+        recorded = [name for name in self.names if self.stats.counts[name]]
+        lines.append("Average finish by player: {}".format({name: self.stats.finish(name) for name in recorded}))
+        if self.stop is not None:
+            lines.append("Win rate by player: {}".format({
+                name: "{:.3f} +/- {:.3f}".format(self.stats.winRate(name), self.stats.winBound(name, self.stop.z))
+                for name in recorded
+            }))
+            lines.append("Finish by player: {}".format({
+                name: "{:.3f} +/- {:.3f}".format(self.stats.finish(name), self.stats.finishBound(name, self.stop.z))
+                for name in recorded
+            }))
+        return "\n".join(lines)
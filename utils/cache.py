@@ -0,0 +1,77 @@
+'''
+Util file for memoizing player decisions.
+'''
+
+import threading
+from collections import OrderedDict
+
+'''
+Class for a size-bounded least recently used cache of decisions:
+    Settings: name (for reports), most entries held
+    State: entries (key to decision, least recently used first), hits, misses, evictions
+    Every cache is registered by name, so their counters can be collected and reported together
+Functionalities:
+    Keys are canonical states (tuples of ints), so situations which play alike share an entry however the
+    cards are suited or ordered; callers build them (see Easy.makeCall and Hard.chooseCard in prob.py)
+    Lookups return None on a miss, so decisions are stored as anything but None
+    Guarded by a lock, as concurrent trials (see trial.py) decide from several threads
+    Counters are per process: pool workers send theirs back with each game (see runner.py)
+'''
+class DecisionCache:
+
+    caches = {}
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        DecisionCache.caches[name] = self
+
+    def get(self, key):
+        with self.lock:
+            decision = self.entries.get(key)
+            if decision is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return decision
+
+    def put(self, key, decision):
+        with self.lock:
+            self.entries[key] = decision
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last = False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def counts():
+        # this process's counters per cache: hits, misses, evictions, entries held
+        return {name: [cache.hits, cache.misses, cache.evictions, len(cache.entries)]
+            for (name, cache) in DecisionCache.caches.items()}
+
+    def combine(countsList):
+        # sums counters from several processes (see counts)
+        total = {}
+        for counts in countsList:
+            for (name, values) in counts.items():
+                total[name] = [a + b for (a, b) in zip(total.get(name, [0] * len(values)), values)]
+        return total
+
+    def report(counts):
+        lines = []
+        for (name, (hits, misses, evictions, entries)) in sorted(counts.items()):
+            if hits + misses:
+                lines.append("Decision cache {}: {} lookups, {:.1%} hits, {} entries held, {} evicted".format(
+                    name, hits + misses, hits / (hits + misses), entries, evictions
+                ))
+        return lines
@@ -2,24 +2,29 @@
 Util file for Card-related classes.
 '''
 
+import functools
 import itertools
 import random
 
+import numpy as np
+
+from utils.constants import Caching
 from utils.constants import Gameplay
 
 '''
 Class for data structure representing collection of cards, used for decks, player hands, and lists of shown cards
 CardCollection houses a list of Card objects, and provides methods for shuffling and dealing cards
+A deck holds one copy of every card per deck it's built from (identical copies are equal cards)
 '''
 class CardCollection:
 
-    def __init__(self, cardRange = None, cards = []):
+    def __init__(self, cardRange = None, cards = [], numDecks = 1):
         if cards:
             self.cards = cards
         elif cardRange:
             self.cards = [
-                Card(num, suit) for (num, suit) in 
-                list(itertools.product(range(cardRange), CardInfo.SUITS))
+                Card(num, suit) for (_, num, suit) in
+                list(itertools.product(range(numDecks), range(cardRange), CardInfo.SUITS))
             ]
         elif not cardRange and not cards:
             self.cards = []
@@ -29,8 +34,12 @@ class CardCollection:
             CardCollection(cards = self.cards[(i * numCards):((i + 1) * numCards)]) for i in range(numHands)
         ]
 
-    def shuffle(self):
-        random.shuffle(self.cards)
+    def shuffle(self, rng = None):
+        # a dedicated generator (i.e. random.Random(seed)) makes the sequence of deals replayable
+        if rng is None:
+            random.shuffle(self.cards)
+        else:
+            rng.shuffle(self.cards)
 
     def slice(self, start, end):
         return CardCollection(cards = self.cards[start:end])
@@ -58,14 +67,16 @@ class CardCollection:
 
 '''
 Class for representing cards
-Each card stores a number and a suit, as well as a string-translated rank
+Each card stores a number and a suit, as well as a string-translated rank and its index (num * 4 + suit rank)
+Copies of a card from different decks share their index
 '''
 class Card:
 
     def __init__(self, num, suit):
         self.num = num
         self.suit = suit
-        self.rank = CardInfo.RANKS[num]
+        self.rank = CardInfo.rankName(num)
+        self.index = num * len(CardInfo.SUITS) + CardInfo.SUIT_RANKS[suit]
 
     def __str__(self):
         return self.rank + " of " + self.suit
@@ -84,6 +95,7 @@ class Card:
 '''
 Static class for card information
 Stores information on suits, ranks, and comparison
+Card ranges past the named ranks (above K) are named by number, counting from A as 1
 '''
 class CardInfo:
 
@@ -100,11 +112,25 @@ class CardInfo:
         "7", "8", "9", "10", "J", "Q", "K"
     ]
 
+    def rankName(num):
+        if num < len(CardInfo.RANKS):
+            return CardInfo.RANKS[num]
+        return str(num + 1)
+
 '''
 Static class for card utils
 Stores methods for ranking cards and joining collections
+A rank table (an array of every card's rank by card index) ranks many cards in one lookup
 '''
 class CardUtils:
+
+    @functools.lru_cache(maxsize = Caching.RANK_TABLES)
+    def rankTable(power, cardRange):
+        ranks = np.arange(cardRange).repeat(len(CardInfo.SUITS))
+        ranks[power * len(CardInfo.SUITS):(power + 1) * len(CardInfo.SUITS)] = cardRange + np.arange(len(CardInfo.SUITS))
+        ranks.flags.writeable = False
+        return ranks
+
     def cardRankerGen(power, cardRange):
         def cardRanker(card):
             if not card:
@@ -0,0 +1,136 @@
+'''
+Util file for versioned Q-Value checkpoints.
+'''
+
+import json
+import os
+import struct
+from collections import defaultdict
+
+import numpy as np
+
+from utils.constants import Checkpoints
+from utils.constants import Learning
+from utils.table import HashedTable
+
+'''
+Static class for reading and writing checkpoints, one file per agent holding both of its tables:
+    Layout: magic bytes, format version and header length (little-endian uint32s), a JSON header, then every
+    array's raw bytes, each starting on an aligned offset so it can be mapped in place
+    Header: format version, agent name, step (bumped on every save, so readers can tell a newer checkpoint),
+    a description of each table and the dtype / shape / offset of each array
+Functionalities:
+    Saving writes to a file of the writer's own and renames it over the checkpoint, which is atomic, so a
+    crash mid-write or two agents saving under one name leaves a whole checkpoint (the last one renamed)
+    Loading maps the arrays copy-on-write rather than reading them, so only the pages used are read and
+    changes stay in memory until the next save; nothing in the file is executed, unlike a pickle
+    Stamps (modification time, size, inode) are cheap to check, so a reader can poll for a newer checkpoint
+Tables are packed as:
+    Hashed tables: their value array and decay
+    Dict tables: keys in the header (JSON, tuples as lists), float values in one array and array values
+    (QApproximate's weights) in one array each
+'''
+class Checkpoint:
+
+    MAGIC = b"OHCKPT\r\n"
+    PREFIX = struct.Struct("<II")
+
+    def path(name):
+        return Learning.Q_DIREC + name + Checkpoints.SUFFIX
+
+    def align(offset):
+        return -(-offset // Checkpoints.ALIGN) * Checkpoints.ALIGN
+
+    def save(path, header, arrays):
+        layout, offset = [], 0
+        for (name, array) in arrays.items():
+            array = np.ascontiguousarray(array)
+            arrays[name] = array
+            layout.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+            offset = Checkpoint.align(offset + array.nbytes)
+        header = dict(header, format = Checkpoints.FORMAT, arrays = layout)
+        encoded = json.dumps(header).encode()
+        start = Checkpoint.align(len(Checkpoint.MAGIC) + Checkpoint.PREFIX.size + len(encoded))
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        temp = "{}.{}.{}.tmp".format(path, os.getpid(), id(arrays))
+        try:
+            with open(temp, "wb") as file:
+                file.write(Checkpoint.MAGIC)
+                file.write(Checkpoint.PREFIX.pack(Checkpoints.FORMAT, len(encoded)))
+                file.write(encoded)
+                for entry in layout:
+                    file.seek(start + entry["offset"])
+                    file.write(arrays[entry["name"]].tobytes())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def load(path):
+        with open(path, "rb") as file:
+            if file.read(len(Checkpoint.MAGIC)) != Checkpoint.MAGIC:
+                raise ValueError("{} is not a checkpoint!".format(path))
+            version, length = Checkpoint.PREFIX.unpack(file.read(Checkpoint.PREFIX.size))
+            if version > Checkpoints.FORMAT:
+                raise ValueError("{} has checkpoint format {}, newer than {}!".format(path, version, Checkpoints.FORMAT))
+            header = json.loads(file.read(length).decode())
+        start = Checkpoint.align(len(Checkpoint.MAGIC) + Checkpoint.PREFIX.size + length)
+        # the file is mapped once and every array is a view of it, mapping each one costs more than small arrays do
+        mapped = np.memmap(path, dtype = np.uint8, mode = "c")
+        arrays = {}
+        for entry in header["arrays"]:
+            dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+            arrays[entry["name"]] = np.ndarray(shape, dtype = dtype, buffer = mapped, offset = start + entry["offset"])
+        return header, arrays
+
+    def stamp(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def encodeKey(key):
+        if isinstance(key, tuple):
+            return [Checkpoint.encodeKey(part) for part in key]
+        if isinstance(key, np.integer):
+            return int(key)
+        return key
+
+    def decodeKey(key):
+        if isinstance(key, list):
+            return tuple([Checkpoint.decodeKey(part) for part in key])
+        return key
+
+    def packTable(name, table):
+        # returns the table's header entry and its arrays, named under the table's name
+        if isinstance(table, HashedTable):
+            return {"kind": "hashed", "decay": table.decay}, {name + "/values": table.values}
+        scalars, weights, arrays = [], [], {}
+        for (key, value) in table.items():
+            if isinstance(value, np.ndarray):
+                arrays["{}/weights/{}".format(name, len(weights))] = value
+                weights.append(Checkpoint.encodeKey(key))
+            else:
+                scalars.append((key, value))
+        arrays[name + "/values"] = np.array([value for (_, value) in scalars], dtype = float)
+        return {"kind": "dict", "scalars": [Checkpoint.encodeKey(key) for (key, _) in scalars], "weights": weights}, arrays
+
+    def unpackTable(name, entry, arrays):
+        if entry["kind"] == "hashed":
+            table = HashedTable(0)
+            table.values = arrays[name + "/values"]
+            table.decay = entry["decay"]
+            return table
+        table = defaultdict(float)
+        for (key, value) in zip(entry["scalars"], arrays[name + "/values"].tolist()):
+            table[Checkpoint.decodeKey(key)] = value
+        for (i, key) in enumerate(entry["weights"]):
+            table[Checkpoint.decodeKey(key)] = arrays["{}/weights/{}".format(name, i)]
+        return table
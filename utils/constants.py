@@ -9,6 +9,15 @@ SLEEP_TIME = 0
 class Modes:
     PLAY = "PLAY"
     TRIAL = "TRIAL"
+    SERVE = "SERVE"
+    TOURNAMENT = "TOURNAMENT"
+    DUPLICATE = "DUPLICATE"
+    TRAIN = "TRAIN"
+    REPLAY = "REPLAY"
+    WORKER = "WORKER"
+    SOLVE = "SOLVE"
+    BOOK = "BOOK"
+    POWER = "POWER"
 
 # Game play strings
 class Gameplay:
@@ -27,6 +36,7 @@ class Strategies:
     SEARCH = "SEARCH"
     Q_LEARN = "Q_LEARN"
     Q_APPROXIMATE = "Q_APPROXIMATE"
+    CFR = "CFR"
 
 # For Q-Learning Agent
 class Learning:
@@ -41,3 +51,125 @@ class Learning:
     DECAY_INCREMENT = .0001
     USE_RANKS = False
     ALL_LESS = False
+    ABSTRACT = True
+    BUCKETS = 4
+    LESS_BUCKET = 10
+    CLIP = 2
+    TABLE_SIZE = 2 ** 18
+    N_STEP = None
+    TRACE_DECAY = None
+
+# For Q-Value checkpoint files
+class Checkpoints:
+    FORMAT = 1
+    SUFFIX = ".ckpt"
+    ALIGN = 64
+
+# For table server (MAX_TABLES open at once, None for no limit)
+class Serving:
+    MAX_TABLES = None
+    DECISION_WORKERS = 8
+    QUIET = True
+
+# Per-decision deadlines (seconds) for live tables, None for no deadline
+class Deadlines:
+    POWER = 15.0
+    CALL = 30.0
+    CARD = 30.0
+    TIMEOUTS = {"choosePower": POWER, "makeCall": CALL, "chooseCard": CARD}
+
+# For tournaments and trial runs
+class Tournaments:
+    ROUND_ROBIN = "ROUND_ROBIN"
+    SWISS = "SWISS"
+    WORKERS = 4
+    BATCH = 4
+    MAX_GAMES = 10000
+    Z = 1.96
+
+# For rating systems
+class Ratings:
+    ELO = "ELO"
+    TRUESKILL = "TRUESKILL"
+    ELO_BASE = 1500.0
+    ELO_PRIOR = 400.0
+    ELO_ITERATIONS = 50
+    MU = 25.0
+    SIGMA = 25.0 / 3
+    BETA = 25.0 / 6
+    TAU = 25.0 / 300
+
+# For adaptive trial runs
+class Sequential:
+    Z = 1.96
+    MIN_GAMES = 100
+    EVERY = 50
+
+# For trial runs
+class Trials:
+    COUNT_FILE = "count.txt"
+    QUARANTINE_FILE = "quarantine.jsonl"
+    CHECKPOINT_EVERY = 1000
+
+# For trial runs distributed across machines (lease and poll in seconds)
+class Distribution:
+    HOST = "0.0.0.0"
+    PORT = 7391
+    CHUNK = 50
+    LEASE = 600.0
+    POLL = 1.0
+    CONNECT_TRIES = 30
+
+# Cache sizes
+class Caching:
+    PROBABILITIES = 2 ** 16
+    RANK_TABLES = 256
+    CALL_DECISIONS = 2 ** 16
+    PLAY_DECISIONS = 2 ** 18
+
+# For opponent modeling and search
+class Modeling:
+    CALL_WEIGHT = 1.0
+    PLAY_TILT = .75
+    ROLLOUTS = 32
+    SAMPLES = 64
+
+# For search players: root-parallel workers, seconds a decision (None to run the set rollouts), table entries
+class Searching:
+    WORKERS = 1
+    DEADLINE = None
+    TABLE_SIZE = 2 ** 20
+    ZOBRIST_SEED = 20240229
+
+# For self-play training
+class Training:
+    ACTORS = 4
+    BATCH = 8
+    PUBLISH = 64
+
+# For the CFR solver and player
+class Solving:
+    STRATEGY = "players/strategies/cfr.ckpt"
+    TABLE_SIZE = 2 ** 20
+    MAX_CARDS = 4
+    WORKERS = 1
+    EPOCH = 200
+
+# For the opening book of calls (DIGIT is the bits per digit of a packed situation)
+class Books:
+    PATH = "players/books/calls_{}.ckpt"
+    MAX_CARDS = 4
+    DIGIT = 5
+
+# For the power card tables (one per card range, decks and power tries; MIN_ROUNDS played to decide a situation)
+class Powers:
+    PATH = "players/books/power_{}_{}_{}.ckpt"
+    SAMPLES = 2000
+    MIN_ROUNDS = 50
+    WORKERS = 1
+
+# For training metrics, and the live metrics endpoint of long runs
+class Metrics:
+    INTERVAL = 100
+    HOST = "127.0.0.1"
+    PORT = 9464
@@ -0,0 +1,145 @@
+'''
+Util file for training metrics, and the live metrics endpoint of long runs.
+'''
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from utils.constants import Metrics
+
+'''
+Class for a sink of training metrics:
+    Settings: file to append to (stdout if None), number of records between reports
+    State: per source (i.e. agent name), running sums of each metric since the last report and a total count
+Functionalities:
+    Learners record a dict of named values per update (i.e. per round); every interval records, the means since
+    the last report are written as one JSON line with the source, the total count and a timestamp
+    Nothing is formatted or written in between, so recording stays cheap inside training loops
+'''
+class MetricsSink:
+
+    def __init__(self, path = None, interval = Metrics.INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.sums = {}
+        self.counts = {}
+        self.totals = {}
+
+    def record(self, source, values):
+        sums = self.sums.setdefault(source, {})
+        for (metric, value) in values.items():
+            sums[metric] = sums.get(metric, 0.0) + value
+        self.counts[source] = self.counts.get(source, 0) + 1
+        self.totals[source] = self.totals.get(source, 0) + 1
+        if self.counts[source] >= self.interval:
+            self.flush(source)
+
+    def flush(self, source):
+        count = self.counts.get(source, 0)
+        if not count:
+            return
+        report = {"source": source, "count": self.totals[source], "time": round(time.time(), 3)}
+        report.update({metric: total / count for (metric, total) in self.sums[source].items()})
+        line = json.dumps(report) + "\n"
+        if self.path is None:
+            sys.stdout.write(line)
+        else:
+            with open(self.path, "a") as file:
+                file.write(line)
+        self.sums[source] = {}
+        self.counts[source] = 0
+
+    def close(self):
+        for source in list(self.counts):
+            self.flush(source)
+
+'''
+Class for the live metrics endpoint of long runs (TRIAL and TRAIN in play.py), in the Prometheus text format:
+    Settings: collector (a function returning the run's metrics, see TrialRun.metrics and SelfPlay.metrics),
+    address to listen on (port 0 picks a free port, see port)
+    Metrics are (name, type, help, label, values): values is a number, or a dict of label value to number
+    when label is given (i.e. decisions by strategy)
+    State: scrapes whose collection failed
+Functionalities:
+    Serves every GET from a daemon thread, collecting when scraped: runs only keep plain counters (games
+    played, wins, decisions counted by the Decider, queues), so the hot path pays next to nothing
+    Counters (named _total) are served as totals, and rates (games and decisions by strategy per second) are
+    left to the scraper, i.e. Prometheus's rate(), so several scrapers never disturb each other's windows
+    Adds the process's resident memory and uptime to every scrape
+'''
+class MetricsServer:
+
+    def __init__(self, collect, host = Metrics.HOST, port = Metrics.PORT):
+        self.collect = collect
+        self.start = time.time()
+        self.errors = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        threading.Thread(target = self.httpd.serve_forever, daemon = True).start()
+
+    def rss():
+        # resident memory in bytes, from /proc where there is one (the peak elsewhere)
+        try:
+            with open("/proc/self/statm") as file:
+                return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def scrape(self):
+        metrics = [
+            ("process_resident_memory_bytes", "gauge", "Resident memory of this process", None, MetricsServer.rss()),
+            ("fodinha_uptime_seconds", "gauge", "Seconds since the run started", None, time.time() - self.start),
+        ]
+        try:
+            metrics += self.collect()
+        except Exception:
+            # a scrape racing the run's own updates is left to the next scrape rather than failing the run
+            self.errors += 1
+        metrics.append(("fodinha_scrape_errors_total", "counter", "Scrapes whose collection failed", None, self.errors))
+        return metrics
+
+    def render(self):
+        lines = []
+        for (name, kind, help, label, values) in self.scrape():
+            lines.append("# HELP {} {}".format(name, help))
+            lines.append("# TYPE {} {}".format(name, kind))
+            if label is None:
+                lines.append("{} {}".format(name, MetricsServer.number(values)))
+                continue
+            for (key, value) in sorted(values.items()):
+                lines.append('{}{{{}="{}"}} {}'.format(name, label, str(key).replace('"', "'"), MetricsServer.number(value)))
+        return "\n".join(lines) + "\n"
+
+    def number(value):
+        if not isinstance(value, float):
+            return str(int(value))
+        if value != value:
+            return "NaN"
+        return {float("inf"): "+Inf", float("-inf"): "-Inf"}.get(value, repr(value))
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
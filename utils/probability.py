@@ -0,0 +1,131 @@
+'''
+Util file for card probability computations.
+'''
+
+import functools
+from math import comb
+
+import scipy.stats as sc
+
+from utils.card import CardInfo
+from utils.constants import Caching
+from utils.constants import Gameplay
+
+'''
+Static class for Easy's calls (see prob.py), which ignore cancellation:
+    A card wins if none of the other players' cards (drawn from the unseen cards, own hand included) is above it,
+    X ~ hypergeometric(g + l, l, p - 1) with g, l the unseen cards strictly below and above it, P(X = 0)
+    Cards are counted by slot (see CancelProbability), so with several decks each slot holds a copy per deck
+    Probabilities are cached per (g, l, players), as the same counts come up round after round
+    The call counts the cards more likely to win than not, moved by the average probability if illegal
+'''
+class CallProbability:
+
+    @functools.lru_cache(maxsize = Caching.PROBABILITIES)
+    def winProbability(great, less, numPlayers):
+        hypergeom = sc.hypergeom(great + less, less, numPlayers - 1)
+        return hypergeom.pmf(0)
+
+    def cardProbabilities(hand, shown, numPlayers, cardRange, numDecks = 1):
+        # hand and shown are slots, every slot's cards not shown are unseen
+        unseen = CancelProbability.capacity(cardRange, numDecks)
+        for slot in shown:
+            unseen[slot] -= 1
+        return [CallProbability.winProbability(sum(unseen[:slot]), sum(unseen[slot + 1:]), numPlayers) for slot in hand]
+
+    def chooseCall(probs, roundNum, illegal):
+        call = 0
+        total = 0
+        for prob in probs:
+            if prob > .5:
+                call += 1
+            total += prob
+        average = total / roundNum
+
+        # if call would be illegal, average probability informs + or -
+        # unless call would be over the total, in which case go down
+        # or if call would be negative, in which case go up
+        if call == illegal:
+            if call == roundNum:
+                call -= 1
+            elif call == 0:
+                call += 1
+            else:
+                call = call + (average > .5) - (average <= .5)
+        return call
+
+'''
+Static class for win probabilities which account for cancellation
+Cards are grouped into slots in rank order (as ranked by CardUtils.cardRankerGen):
+    One slot per non-power rank, holding up to one card per suit and deck
+    One slot per power card (by suit), holding one card per deck
+    Cards of a slot cancel in pairs (a power slot only holds more than one card with several decks)
+Assumes the players still to play each play a uniformly random unseen card (as Hard does), so
+the cards drawn after the player are a uniform sample of the unseen cards. A card in slot k wins iff:
+    It isn't cancelled on being played (no card of its slot is standing) or later (none drawn)
+    Every higher slot ends with an even number of cards played (standing + drawn), so that all of
+    them cancel (with one deck, a higher power card can't be standing or drawn at all)
+Counting the samples which satisfy this is a product of one polynomial per slot (x^j weighted by the
+ways of drawing j cards of that slot), times (1 + x)^m for the m unconstrained lower cards: the
+coefficient of x^after over C(unseen, after) is the probability. Results are cached per
+(slot, unseen counts, standing cards, players after), i.e. per shown / power state.
+'''
+class CancelProbability:
+
+    def numSlots(cardRange):
+        return cardRange - 1 + len(CardInfo.SUITS)
+
+    def capacity(cardRange, numDecks = 1):
+        return [len(CardInfo.SUITS) * numDecks] * (cardRange - 1) + [numDecks] * len(CardInfo.SUITS)
+
+    def slotOf(card, power, cardRange):
+        if card.num != power:
+            return card.num if card.num < power else card.num - 1
+        return cardRange - 1 + CardInfo.SUIT_RANKS[card.suit]
+
+    def unseenCounts(power, cardRange, hand, shown, numDecks = 1):
+        counts = CancelProbability.capacity(cardRange, numDecks)
+        for card in hand:
+            counts[CancelProbability.slotOf(card, power, cardRange)] -= 1
+        for card in shown:
+            counts[CancelProbability.slotOf(card, power, cardRange)] -= 1
+        return tuple(counts)
+
+    def standingSlots(plays, power, cardRange):
+        standing = [0] * CancelProbability.numSlots(cardRange)
+        for play in plays:
+            if play is None or play == Gameplay.CANCELLED:
+                continue
+            standing[CancelProbability.slotOf(play, power, cardRange)] = 1
+        return tuple(standing)
+
+    @functools.lru_cache(maxsize = Caching.PROBABILITIES)
+    def winProbability(slot, unseen, standing, after):
+        if standing[slot]:
+            return 0.0
+        total = sum(unseen)
+        if after > total:
+            return 0.0
+
+        # coefficients of the polynomial, truncated at degree after
+        poly = [1] + [0] * after
+        free = sum(unseen[:slot])
+        for higher in range(slot + 1, len(unseen)):
+            if not unseen[higher]:
+                # nothing left to cancel a standing card
+                if standing[higher]:
+                    return 0.0
+                continue
+            weights = [comb(unseen[higher], j) if (j + standing[higher]) % 2 == 0 else 0 for j in range(unseen[higher] + 1)]
+            product = [0] * (after + 1)
+            for (degree, coeff) in enumerate(poly):
+                if not coeff:
+                    continue
+                for (j, weight) in enumerate(weights):
+                    if degree + j > after:
+                        break
+                    product[degree + j] += coeff * weight
+            poly = product
+
+        ways = sum([poly[degree] * comb(free, after - degree) for degree in range(after + 1)])
+        return ways / comb(total, after)
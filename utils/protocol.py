@@ -0,0 +1,83 @@
+'''
+Util file for the line-delimited JSON protocol used by networked components.
+'''
+
+import json
+
+from utils.card import Card
+from utils.constants import Gameplay
+
+'''
+Static class for protocol helpers
+Every message is a single JSON object on its own line, carrying a "type" field
+Cards travel as {"num", "suit", "name"} objects so clients can both display and echo them
+'''
+class Protocol:
+
+    ENCODING = "utf-8"
+
+    # client -> server
+    CREATE = "create"
+    JOIN = "join"
+    LIST = "list"
+    REPLY = "reply"
+
+    # server -> client
+    CREATED = "created"
+    JOINED = "joined"
+    TABLES = "tables"
+    STARTED = "started"
+    REQUEST = "request"
+    RESULT = "result"
+    ERROR = "error"
+
+    # trial distribution (see trials/distributed.py), worker -> coordinator: ready, done, coordinator -> worker: work, stop
+    READY = "ready"
+    DONE = "done"
+    WORK = "work"
+    STOP = "stop"
+
+    # decision kinds carried by request / reply messages
+    POWER = "power"
+    CALL = "call"
+    CARD = "card"
+
+    def encode(message):
+        return (json.dumps(message, default = Protocol.encodeScalar) + "\n").encode(Protocol.ENCODING)
+
+    def encodeScalar(value):
+        # AI players can produce numpy scalars (e.g. calls), which json can't serialize itself
+        if hasattr(value, "item"):
+            return value.item()
+        raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+    def decode(line):
+        message = json.loads(line.decode(Protocol.ENCODING))
+        if not isinstance(message, dict) or "type" not in message:
+            raise ValueError("Messages must be JSON objects with a type field!")
+        return message
+
+    async def read(reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        return Protocol.decode(line)
+
+    async def write(writer, message):
+        writer.write(Protocol.encode(message))
+        await writer.drain()
+
+    def encodeCard(card):
+        if card is None:
+            return None
+        if card == Gameplay.CANCELLED:
+            return Gameplay.CANCELLED
+        return {"num": card.num, "suit": card.suit, "name": str(card)}
+
+    def decodeCard(data):
+        if data is None or data == Gameplay.CANCELLED:
+            return data
+        return Card(data["num"], data["suit"])
+
+    def encodeCards(cards):
+        return [Protocol.encodeCard(card) for card in cards]
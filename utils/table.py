@@ -0,0 +1,93 @@
+'''
+Util file for fixed-size Q-Value tables.
+'''
+
+import numpy as np
+
+from utils.constants import Learning
+
+'''
+Class for a Q-Value table of fixed size, used in place of a dict by QLearning:
+    Values for every (state, action) key are stored in one float array, at the key's hash modulo the size
+    Keys which collide share a value, the price of memory which stays bounded however many states are seen
+    The exploration decay, which the agent also keeps in its table, is stored on its own
+Indexing reads and writes like a defaultdict(float), so the agent's updates are unchanged.
+Keys are tuples of ints, whose hashes (unlike strings') are the same in every process, so saved tables stay valid.
+'''
+class HashedTable:
+
+    def __init__(self, size = Learning.TABLE_SIZE):
+        self.values = np.zeros(size)
+        self.decay = 1.0
+
+    def index(self, key):
+        return hash(key) % len(self.values)
+
+    def __getitem__(self, key):
+        if key == Learning.DECAY:
+            return self.decay
+        return self.values[self.index(key)]
+
+    def __setitem__(self, key, value):
+        if key == Learning.DECAY:
+            self.decay = value
+        else:
+            self.values[self.index(key)] = value
+
+    def __len__(self):
+        return int(np.count_nonzero(self.values))
+
+'''
+Static class for applying a round of Q-Value updates at once:
+    Each key moves a step of alpha towards its target, Q <- Q + alpha * (target - Q)
+    On a hashed table this is one gather and one scatter over the indices met once in a round; indices met more
+    than once (a key repeated, or keys which collide) step one after another, as they do on a dict table, where
+    it's a loop over the keys (summing their steps instead would move a key seen k times k times as far, and
+    diverge once k * alpha > 2)
+    Returns for a round's actions, which only pay out at the end of the round:
+        n-step: the discounted value of the state n actions ahead, or the discounted final reward if the round
+        ends first
+        TD(lambda): the lambda-weighted average of every n-step return
+'''
+class TableUpdates:
+
+    def lookup(table, keys):
+        if isinstance(table, HashedTable):
+            return table.values[[table.index(key) for key in keys]]
+        return np.array([table[key] for key in keys])
+
+    def apply(table, keys, targets, alpha):
+        # returns the errors (target - Q) the keys were updated with
+        if not keys:
+            return np.zeros(0)
+        if isinstance(table, HashedTable):
+            indices = np.array([table.index(key) for key in keys])
+            targets = np.array(targets, dtype = float)
+            errors = targets - table.values[indices]
+            _, inverse, counts = np.unique(indices, return_inverse = True, return_counts = True)
+            repeated = counts[inverse] > 1
+            once = ~repeated
+            table.values[indices[once]] += alpha * errors[once]
+            for position in np.flatnonzero(repeated).tolist():
+                index = indices[position]
+                errors[position] = targets[position] - table.values[index]
+                table.values[index] += alpha * errors[position]
+            return errors
+        errors = []
+        for (key, target) in zip(keys, targets):
+            errors.append(target - table[key])
+            table[key] = (1 - alpha) * table[key] + alpha * target
+        return np.array(errors)
+
+    def returns(reward, values, gamma, nStep = None, traceDecay = None):
+        # values[k - 1] is the value of the state reached by action k - 1, the reward comes after the last action
+        numActions = len(values) + 1
+        remaining = numActions - 1 - np.arange(numActions)
+        final = gamma ** remaining * reward
+        if traceDecay is not None:
+            ahead = np.arange(1, numActions)[None, :] - np.arange(numActions)[:, None]
+            weights = (1 - traceDecay) * traceDecay ** np.maximum(ahead - 1, 0) * gamma ** np.maximum(ahead, 0)
+            weights[ahead < 1] = 0
+            return weights @ values + traceDecay ** remaining * final
+        boot = np.concatenate([values, np.zeros(nStep)])[np.arange(numActions) + nStep - 1]
+        return np.where(remaining >= nStep, gamma ** nStep * boot, final)
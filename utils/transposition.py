@@ -0,0 +1,134 @@
+'''
+Util file for the transposition table shared by search workers, and the Zobrist hashing of its keys.
+'''
+
+import atexit
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.card import CardInfo
+from utils.constants import Searching
+
+'''
+Class for the Zobrist hashing of rollout states (see Simulation.rollout), for one table setting:
+    Settings: seats, card range, decks (the random numbers are drawn from a generator seeded by these and
+    Searching.ZOBRIST_SEED, so every process hashes alike)
+    One random 64-bit number per seat and copy of each card key in hand, per card key standing for each seat,
+    per seat's call and wins, per first seat, cards played and wins carried, and per searching seat
+    A state's hash is the XOR of the numbers of what it holds, so states which differ by a card played or a
+    win taken differ by a few XORs, and searches build their states' hashes from the root's
+    The cards shown and played so far only reach a rollout through the hands left and the cards standing,
+    so those (with calls and wins) are all a state needs
+Settings are cached per process, see get.
+'''
+class Zobrist:
+
+    settings = {}
+
+    def __init__(self, numSeats, cardRange, numDecks):
+        rng = np.random.default_rng([Searching.ZOBRIST_SEED, numSeats, cardRange, numDecks])
+        numKeys = cardRange + len(CardInfo.SUITS)
+        numCards = cardRange * len(CardInfo.SUITS) * numDecks
+        copies = len(CardInfo.SUITS) * numDecks
+        draw = lambda *shape: rng.integers(0, 2 ** 64, size = shape, dtype = np.uint64).tolist()
+        self.hands = draw(numSeats, numKeys, copies)
+        self.standing = draw(numKeys, numSeats)
+        self.calls = draw(numSeats, numCards + 1)
+        self.wins = draw(numSeats, numCards + 1)
+        self.first = draw(numSeats)
+        self.played = draw(numSeats + 1)
+        self.carry = draw(numCards + 1)
+        self.seats = draw(numSeats)
+
+    def get(numSeats, cardRange, numDecks):
+        settings = (numSeats, cardRange, numDecks)
+        if settings not in Zobrist.settings:
+            Zobrist.settings[settings] = Zobrist(numSeats, cardRange, numDecks)
+        return Zobrist.settings[settings]
+
+    def hand(self, seat, keys):
+        # copies of a key are hashed in order, so a hand hashes alike however it's ordered
+        value = 0
+        held = {}
+        for key in keys:
+            copy = held.get(key, 0)
+            value ^= self.hands[seat][key][copy]
+            held[key] = copy + 1
+        return value
+
+    def card(self, seat, key, copy):
+        return self.hands[seat][key][copy]
+
+    def stand(self, standing):
+        value = 0
+        for (key, seat) in standing.items():
+            value ^= self.standing[key][seat]
+        return value
+
+    def round(self, seat, first, played, carry, calls, wins):
+        value = self.seats[seat] ^ self.first[first] ^ self.played[played] ^ self.carry[carry]
+        for (other, (call, won)) in enumerate(zip(calls, wins)):
+            value ^= self.calls[other][call] ^ self.wins[other][won]
+        return value
+
+'''
+Class for a fixed-size transposition table in shared memory, from which search workers share rollout results:
+    Settings: entries (rounded to a power of two), the name of the block to attach to (None creates it, and
+    the creator unlinks it on closing, at exit at the latest), and whether it's shared at all (a search in one
+    process keeps its table in its own memory)
+    Entries are two unsigned 64-bit words, the result and the key XOR the result, at the key's low bits; entries
+    are always replaced
+Functionalities:
+    Lock-free: readers check the key against the stored pair, so an entry torn by a concurrent write (one word
+    old, one new) reads as a miss rather than a wrong result
+    Counts its own hits and misses (per process, workers send theirs back with their results)
+Workers attach by name and leave the block to its creator (pool workers share their parent's resource tracker,
+which holds the block once however many processes attach).
+'''
+class TranspositionTable:
+
+    def __init__(self, size = Searching.TABLE_SIZE, name = None, shared = True):
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.owner = name is None
+        self.memory = None
+        if not shared:
+            buffer = memoryview(bytearray(16 * self.size))
+        elif self.owner:
+            self.memory = shared_memory.SharedMemory(create = True, size = 16 * self.size)
+            self.memory.buf[:] = bytes(16 * self.size)
+            atexit.register(self.close)
+            buffer = self.memory.buf
+        else:
+            self.memory = shared_memory.SharedMemory(name = name)
+            buffer = self.memory.buf
+        self.name = self.memory.name if self.memory is not None else None
+        # a view of unsigned 64-bit words reads and writes plain ints, faster than numpy's scalars one at a time
+        self.words = buffer.cast("Q")
+        self.mask = self.size - 1
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        index = (key & self.mask) << 1
+        result = self.words[index]
+        if self.words[index + 1] ^ result == key:
+            self.hits += 1
+            return result
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        index = (key & self.mask) << 1
+        self.words[index] = result
+        self.words[index + 1] = key ^ result
+
+    def close(self):
+        if self.words is None:
+            return
+        self.words.release()
+        self.words = None
+        if self.memory is not None:
+            self.memory.close()
+            if self.owner:
+                self.memory.unlink()